@@ -6,23 +6,44 @@
 @date       2022-11-28
 """
 
-
 import json
+import os
 import sys
 
-import matplotlib.pyplot as plt
-from colorhash import ColorHash
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from lazy_pyplot import import_pyplot
 
 
 class ApplicationModelInterface:
-    def __init__(self, model_name) -> None:
+    # Bump when a change to the model changes its event timeline, so that
+    # cached timelines of older versions are not reused.
+    VERSION = "0.0.1"
+
+    # Task labels are only drawn on intervals at least this fraction of the
+    # timeline wide, and at most this many of them.
+    MIN_LABEL_WIDTH = 0.01
+    MAX_LABELS = 1000
+
+    def __init__(
+        self, model_name, headless=False, max_time=None, max_events=None, cache=None
+    ) -> None:
         self._devices = {}
         self._event_timeline = []
-        self._fig, self._ax = plt.subplots()
-        self._fig.suptitle("Event Timeline")
-        self._ax.set_xlabel("Time (cycle)")
-        self._ax.set_ylabel("CPU")
-        plt.get_current_fig_manager().set_window_title(model_name)
+        self._model_name = model_name
+        self._headless = headless
+        self._fig, self._ax = None, None
+        # Optional simulation budget, and why the last run stopped early.
+        self._max_time = max_time
+        self._max_events = max_events
+        self._stall_report = None
+        # Hyperperiods that were skipped instead of stored, see
+        # get_hyperperiod().
+        self._hyperperiod = None
+        # Optional ResultCache of event timelines.
+        self._cache = cache
+        self._cache_key = None
 
     def add_device(self, device_name, device) -> bool:
         if device_name in self._devices:
@@ -33,52 +54,372 @@ class ApplicationModelInterface:
     def get_devices(self) -> dict:
         return self._devices
 
+    def _load_event_timeline(self) -> bool:
+        """_summary_
+        Looks the event timeline of the current devices up in the result
+        cache. Only the device fields the application models read are part of
+        the key.
+
+        Returns:
+            bool: True if the event timeline and stall report were loaded.
+        """
+        if self._cache is None:
+            return False
+        devices = {
+            device_id: {
+                "cores": device["cores"],
+                "schedule": device["schedule"],
+                "cache": device.get("cache", []),
+            }
+            for device_id, device in self._devices.items()
+        }
+        self._cache_key = self._cache.get_key(
+            type(self).__name__,
+            self.VERSION,
+            self._get_cache_options(),
+            devices,
+        )
+        cached = self._cache.get(self._cache_key)
+        if cached is None:
+            return False
+        self._event_timeline, self._stall_report, self._hyperperiod = cached
+        return True
+
+    def _get_cache_options(self) -> list:
+        # Model options that change the event timeline.
+        return [self._max_time, self._max_events]
+
+    def _store_event_timeline(self) -> None:
+        if self._cache is not None:
+            self._cache.put(
+                self._cache_key,
+                (self._event_timeline, self._stall_report, self._hyperperiod),
+            )
+
+    def get_cores(self) -> list:
+        """_summary_
+        Lists every scheduled core, in device and schedule order. This is the
+        row order of `core_utilization`.
+
+        Returns:
+            list((str, str)): (device id, core id) of each core.
+        """
+        return [
+            (device_id, core_id)
+            for device_id, device in self._devices.items()
+            for core_id in device["schedule"].keys()
+        ]
+
     def generate_event_timeline(self) -> dict:
-        # Generate y components.
-        cores = []
+        self._close_plot()
+        cores = self.get_cores()
+        busy_time, start, end = self._get_core_busy_time(cores)
         for device_id, device in self._devices.items():
             device["core_utilization"] = {}
-            for core_id in device["schedule"].keys():
-                device["core_utilization"][core_id] = [0, 0]
-                cores.append((f"{device_id}_{core_id}", device_id, core_id))
+        for (device_id, core_id), busy in zip(cores, busy_time.tolist()):
+            self._devices[device_id]["core_utilization"][core_id] = [busy, end - start]
+
+        return self._event_timeline
+
+    def _get_timeline_span(self) -> (float, float):
+        if len(self._event_timeline) == 0:
+            return 0.0, 0.0
+        if hasattr(self._event_timeline, "symbols"):
+            timestamp = self._event_timeline.timestamp
+            start = float(np.min(timestamp))
+            end = float(np.max(timestamp + self._event_timeline.duration))
+        else:
+            start, end = float("inf"), float("-inf")
+            for event in self._event_timeline:
+                start = min(start, event["timestamp"])
+                end = max(end, event["timestamp"] + event["duration"])
+        # The run can stop right after the skipped repeats, before storing
+        # any entry that ends after them.
+        if self._hyperperiod is not None:
+            hyperperiod = self._hyperperiod
+            cycle_start = self._event_timeline[hyperperiod["start"]]["timestamp"]
+            end = max(
+                end,
+                cycle_start + (1 + hyperperiod["repeats"]) * hyperperiod["duration"],
+            )
+        return float(start), float(end)
+
+    def get_hyperperiod(self) -> dict:
+        """_summary_
+        Returns:
+            dict: Steady state cycle that was repeated without being stored,
+                None if the whole timeline is stored:
+                {
+                    "start": 10,        <- first timeline entry of the cycle
+                    "end": 16,          <- entry after the cycle
+                    "iterations": 1,    <- iterations of the periods per cycle
+                    "duration": 12.0,   <- length of the cycle
+                    "repeats": 998,     <- times it was repeated after "end"
+                }
+                The repeats take place between the entries at "end" - 1 and
+                "end", whose timestamps already account for them.
+        """
+        return self._hyperperiod
+
+    def get_makespan(self) -> float:
+        """_summary_
+        Returns:
+            float: End of the last timeline entry, 0 for an empty timeline.
+        """
+        return self._get_timeline_span()[1]
+
+    def _get_core_busy_time(self, cores, start=None, end=None) -> tuple:
+        span_start, span_end = self._get_timeline_span()
+        start = span_start if start is None else start
+        end = span_end if end is None else end
+
+        # Clip every task occurrence to the window and sum them up per core.
+        occ_start, occ_duration, row, _, _ = self._get_core_intervals(cores)
+        overlap = np.minimum(occ_start + occ_duration, end) - np.maximum(
+            occ_start, start
+        )
+        busy_time = np.bincount(
+            row, weights=np.maximum(overlap, 0.0), minlength=len(cores)
+        )
+        if self._hyperperiod is not None:
+            busy_time += self._get_hyperperiod_busy_time(cores, start, end)
+        return busy_time, start, end
+
+    def _get_hyperperiod_busy_time(self, cores, start, end) -> np.ndarray:
+        # The k-th repeat is the stored cycle shifted by (k + 1) cycle
+        # durations. Repeats inside the window count whole; the (at most two)
+        # that cross its bounds are clipped.
+        hyperperiod = self._hyperperiod
+        cycle = hyperperiod["duration"]
+        steps = range(hyperperiod["start"], hyperperiod["end"])
+        cycle_start = self.get_event_timeline_step(steps[0])[1]["timestamp"]
+        first = max(0, int((start - cycle_start) // cycle) - 1)
+        last = min(hyperperiod["repeats"], int((end - cycle_start) // cycle))
+        if last <= first:
+            return np.zeros(len(cores))
+
+        rows = {core: row for row, core in enumerate(cores)}
+        occ_start, occ_duration, row = [], [], []
+        for step in steps:
+            event = self.get_event_timeline_step(step)[1]
+            for device_id, device in event["devices"].items():
+                for core_id in device["cores"]:
+                    if (device_id, core_id) in rows:
+                        occ_start.append(event["timestamp"])
+                        occ_duration.append(event["duration"])
+                        row.append(rows[(device_id, core_id)])
+        occ_start = np.array(occ_start, dtype=np.float64)
+        occ_duration = np.array(occ_duration, dtype=np.float64)
+        row = np.array(row, dtype=np.int64)
+
+        def get_busy_time(repeat):
+            shifted = occ_start + (repeat + 1) * cycle
+            overlap = np.minimum(shifted + occ_duration, end) - np.maximum(
+                shifted, start
+            )
+            return np.bincount(
+                row, weights=np.maximum(overlap, 0.0), minlength=len(cores)
+            )
+
+        busy_time = get_busy_time(first)
+        if last - first > 1:
+            busy_time += get_busy_time(last - 1)
+        if last - first > 2:
+            busy_time += (last - first - 2) * np.bincount(
+                row, weights=occ_duration, minlength=len(cores)
+            )
+        return busy_time
+
+    def core_utilization(self, start=None, end=None) -> np.ndarray:
+        """_summary_
+        Computes the fraction of time each core spends running a task, weighted
+        by the duration of each timeline entry.
+
+        Args:
+            start (float, optional): Start of the window. Defaults to the start
+                of the event timeline.
+            end (float, optional): End of the window. Defaults to the end of the
+                event timeline (the makespan).
+
+        Returns:
+            np.ndarray: Busy time divided by the window length for each core,
+                in the order returned by `get_cores`. All zeros if the window
+                is empty.
+        """
+        cores = self.get_cores()
+        busy_time, start, end = self._get_core_busy_time(cores, start, end)
+        if end <= start:
+            return np.zeros(len(cores))
+        return busy_time / (end - start)
+
+    def _get_core_intervals(self, cores) -> tuple:
+        """_summary_
+        Collects every task occurrence in the event timeline as parallel
+        arrays. Columnar timelines are read from their arrays directly.
+
+        Args:
+            cores (list((str, str))): (device id, core id) of each row.
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray, np.ndarray, list(str)): Start
+                time, duration, row and task of each occurrence, and the task
+                names indexed by task. Occurrences on cores that are not in
+                `cores` are dropped.
+        """
+        rows = {core: row for row, core in enumerate(cores)}
+
+        if hasattr(self._event_timeline, "symbols"):
+            timeline = self._event_timeline
+            symbols = timeline.symbols
+            entries = timeline.task_entry
+            start = timeline.timestamp[entries]
+            duration = timeline.duration[entries]
+            tasks = timeline.task
+            task_names = symbols.names
+
+            # Resolve each distinct (device, core) symbol pair to its row once.
+            pairs = timeline.task_device.astype(np.int64) * len(symbols)
+            pairs += timeline.task_core
+            unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+            unique_rows = np.array(
+                [
+                    rows.get(
+                        (symbols[pair // len(symbols)], symbols[pair % len(symbols)]),
+                        -1,
+                    )
+                    for pair in unique_pairs.tolist()
+                ],
+                dtype=np.int64,
+            )
+            row = unique_rows[inverse.reshape(-1)]
+        else:
+            start, duration, row, tasks = [], [], [], []
+            task_names, task_ids = [], {}
+            for event in self._event_timeline:
+                for device_id, device in event["devices"].items():
+                    for core_id, task_name in device["cores"].items():
+                        if task_name not in task_ids:
+                            task_ids[task_name] = len(task_names)
+                            task_names.append(task_name)
+                        start.append(event["timestamp"])
+                        duration.append(event["duration"])
+                        row.append(rows.get((device_id, core_id), -1))
+                        tasks.append(task_ids[task_name])
+            start = np.array(start, dtype=np.float64)
+            duration = np.array(duration, dtype=np.float64)
+            row = np.array(row, dtype=np.int64)
+            tasks = np.array(tasks, dtype=np.int64)
+
+        known = row >= 0
+        return start[known], duration[known], row[known], tasks[known], task_names
+
+    def _close_plot(self) -> None:
+        # The figure is only drawn once; drop it when the timeline changes so
+        # that it is drawn again from the new timeline.
+        if self._fig is not None:
+            import_pyplot(self._headless).close(self._fig)
+            self._fig, self._ax = None, None
+
+    def _plot_event_timeline(self, labels=True) -> None:
+        if self._fig is not None:
+            return
+
+        plt = import_pyplot(self._headless)
+        from colorhash import ColorHash
+
+        self._fig, self._ax = plt.subplots()
+        self._fig.suptitle("Event Timeline")
+        self._ax.set_xlabel("Time (cycle)")
+        self._ax.set_ylabel("CPU")
+        plt.get_current_fig_manager().set_window_title(self._model_name)
+
+        # Generate y components.
+        cores = [
+            (f"{device_id}_{core_id}", device_id, core_id)
+            for device_id, core_id in self.get_cores()
+        ]
         cores.reverse()
         self._ax.set_ylim(0, len(cores) * 10)
         self._ax.set_yticks([i * 10 + 5 for i in range(len(cores))])
         self._ax.set_yticklabels([label for label, _, _ in cores])
 
-        # Plot events onto the timeline.
-        for event in self._event_timeline:
-            timestamp = event["timestamp"]
-            duration = event["duration"]
-            for device_id, device in self._devices.items():
-                for core_id in device["cores"].keys():
-                    if (
-                        device_id in event["devices"]
-                        and core_id in event["devices"][device_id]["cores"]
-                    ):
-                        task_name = event["devices"][device_id]["cores"][core_id]
-                        idx = 0
-                        for idx_, core_ in enumerate(cores):
-                            if device_id == core_[1] and core_id == core_[2]:
-                                idx = idx_
-                        c = ColorHash(task_name).rgb
-                        self._ax.broken_barh(
-                            [(timestamp, duration)],
-                            (idx * 10 + 2, 6),
-                            color=(c[0] / 255, c[1] / 255, c[2] / 255),
-                        )
-                        self._ax.text(
-                            x=timestamp + (duration / 2),
-                            y=idx * 10 + 9,
-                            s=task_name,
-                            ha="center",
-                            va="center",
-                            color="black",
-                        )
-                        self._devices[device_id]["core_utilization"][core_id][0] += 1
-                    self._devices[device_id]["core_utilization"][core_id][1] += 1
+        start, duration, row, tasks, task_names = self._get_core_intervals(
+            [(device_id, core_id) for _, device_id, core_id in cores]
+        )
+        if len(start) == 0:
+            return
 
-        return self._event_timeline
+        # One color per task name, looked up by task index.
+        used_tasks = np.unique(tasks)
+        colors = np.zeros((len(task_names), 3))
+        for task in used_tasks.tolist():
+            c = ColorHash(task_names[task]).rgb
+            colors[task] = (c[0] / 255, c[1] / 255, c[2] / 255)
+
+        # Plot all intervals of a core with a single artist.
+        order = np.argsort(row, kind="stable")
+        bounds = np.searchsorted(row[order], np.arange(len(cores) + 1))
+        for idx in range(len(cores)):
+            selected = order[bounds[idx] : bounds[idx + 1]]
+            if len(selected) == 0:
+                continue
+            self._ax.broken_barh(
+                np.column_stack((start[selected], duration[selected])),
+                (idx * 10 + 2, 6),
+                facecolors=colors[tasks[selected]],
+            )
+
+        # Only label intervals that are wide enough to read.
+        if not labels:
+            return
+        span = np.max(start + duration) - np.min(start)
+        wide = np.flatnonzero(duration >= span * self.MIN_LABEL_WIDTH)
+        for occurrence in wide[: self.MAX_LABELS].tolist():
+            self._ax.text(
+                x=start[occurrence] + (duration[occurrence] / 2),
+                y=row[occurrence] * 10 + 9,
+                s=task_names[tasks[occurrence]],
+                ha="center",
+                va="center",
+                color="black",
+            )
+
+    def iter_event_timeline(self):
+        """_summary_
+        Yields the entries of the event timeline one at a time, as soon as each
+        entry is final, without storing them. Consumers such as the energy and
+        network models accept this iterator in place of a full timeline.
+
+        Models that can only generate the whole timeline at once yield its
+        entries once it is generated.
+        """
+        yield from self.generate_event_timeline()
+
+    def _get_exceeded_budget(self, timestamp, events) -> str:
+        """_summary_
+        Checks whether the next timeline entry may still be generated.
+
+        Args:
+            timestamp (float): Start of the next timeline entry.
+            events (int): Number of timeline entries generated so far.
+
+        Returns:
+            str: "max_events" or "max_time" if that budget is used up, None
+                otherwise.
+        """
+        if self._max_events is not None and events >= self._max_events:
+            return "max_events"
+        if self._max_time is not None and timestamp >= self._max_time:
+            return "max_time"
+        return None
+
+    def get_stall_report(self) -> dict:
+        """_summary_
+        Returns:
+            dict: Diagnostic report of the last run if it stopped before every
+                scheduled task ran, None otherwise. See WaitForGraph.report.
+        """
+        return self._stall_report
 
     def get_event_timeline_step(self, step) -> (bool, dict):
         if step < 0 or step >= len(self._event_timeline):
@@ -98,22 +439,51 @@ class ApplicationModelInterface:
         print(f"CPU_UTILIZATION:")
         for device_id, device in self._devices.items():
             for core_id, core_utilization in device["core_utilization"].items():
+                busy_time, makespan = core_utilization
+                utilization = busy_time / makespan if makespan > 0 else 0.0
+                print(f"{device_id}_{core_id}: {utilization}")
+
+        if self._stall_report is not None:
+            report = self._stall_report
+            print()
+            print(
+                f"STOPPED ({report['reason']}) at {report['timestamp']} after "
+                f"{report['events']} events, {report['pending_tasks']} tasks pending:"
+            )
+            for core in report["blocked"]:
                 print(
-                    f"{device_id}_{core_id}: {core_utilization[0] / core_utilization[1]}"
+                    f"\t{core['device_id']}_{core['core_id']} {core['task_name']} "
+                    f"missing {core['missing']}, waits on {core['waits_on']}"
                 )
+            print(f"Never produced: {report['unproduced']}")
+            print(f"Cycles: {report['cycles']}")
 
-    def visualize_event_timeline(self) -> None:
+    def visualize_event_timeline(self, labels=True) -> None:
+        # Nothing can be shown without a GUI.
+        if self._headless:
+            return
+        self._plot_event_timeline(labels)
+        plt = import_pyplot(self._headless)
+        plt.figure(self._fig.number)
         plt.tight_layout()
         plt.show()
 
-    def save_outputs(self):
-        plt.tight_layout()
-        plt.savefig("output_event_timeline.jpg")
+    def save_outputs(self, labels=True):
+        self._plot_event_timeline(labels)
+        self._fig.tight_layout()
+        self._fig.savefig("output_event_timeline.jpg")
+        # Write one entry at a time so that compact timelines are never fully
+        # expanded into dicts.
         with open("output_event_timeline.json", "w") as fp:
-            json.dump(self._event_timeline, fp)
+            fp.write("[")
+            for step, event in enumerate(self._event_timeline):
+                if step > 0:
+                    fp.write(", ")
+                json.dump(event, fp)
+            fp.write("]")
 
 
-def get_application_model(name, cwd):
+def get_application_model(name, cwd, **kwargs):
     try:
         sys.path.append(cwd + "src/application_model/")
         from application_model_v0_0 import ApplicationModel_V0_0
@@ -123,8 +493,8 @@ def get_application_model(name, cwd):
 
     match name:
         case "ApplicationModel_V0_0":
-            return ApplicationModel_V0_0()
+            return ApplicationModel_V0_0(**kwargs)
         case "ApplicationModel_V0_1":
-            return ApplicationModel_V0_1()
+            return ApplicationModel_V0_1(**kwargs)
         case _:
             raise Exception("No application model specified.")
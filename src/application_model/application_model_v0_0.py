@@ -6,10 +6,12 @@
 @date       2022-11-28
 """
 
-import copy
 import sys
 
 from application_model_interface import ApplicationModelInterface
+from dependency_cache import DependencyCache
+from event_timeline import EventTimeline
+from wait_for_graph import WaitForGraph
 
 
 class ApplicationModel_V0_0(ApplicationModelInterface):
@@ -18,10 +20,19 @@ class ApplicationModel_V0_0(ApplicationModelInterface):
     has the following characteristics:
     - timing is event driven and the model evaluates devices and device tasks
       when an event starts or finishes.
+
+    If no task can start anymore, or the optional max_time (cycles) or
+    max_events budget runs out, the timeline stops early and the reason is
+    available from get_stall_report().
     """
 
-    def __init__(self) -> None:
-        super().__init__("V0_0 Application Model")
+    def __init__(
+        self, headless=False, max_time=None, max_events=None, cache=None
+    ) -> None:
+        super().__init__(
+            "V0_0 Application Model", headless, max_time, max_events, cache
+        )
+        self._event_timeline = EventTimeline()
 
     def add_device(self, device_name, device) -> bool:
         """_summary_
@@ -60,13 +71,44 @@ class ApplicationModel_V0_0(ApplicationModelInterface):
             "device_1: { ... }
         }
         """
+        if not self._load_event_timeline():
+            for timeline_entry in self.iter_event_timeline():
+                self._event_timeline.append(timeline_entry)
+            self._store_event_timeline()
+        return super().generate_event_timeline()
+
+    def iter_event_timeline(self):
+        """_summary_
+        Yields each timeline entry as soon as it is final. Entries are not
+        stored by the model.
+        """
+        devices = self._devices
+        self._stall_report = None
 
-        devices = copy.deepcopy(self._devices)
+        # Outputs available on each device, and the cores that may be able to
+        # run. A core blocked on its dependencies is only re-evaluated when one
+        # of the outputs it waits on arrives. The schedules themselves are
+        # never modified; each core keeps a cursor to its next task instead.
+        caches = {}
+        ready = {}
+        cursors = {}
+        for device_id, device in devices.items():
+            caches[device_id] = DependencyCache(device.get("cache"))
+            ready[device_id] = set(device["schedule"].keys())
+            cursors[device_id] = {core_id: 0 for core_id in device["schedule"]}
 
         # While we still have tasks available for each device schedule
         timestamp = 0
         while True:
+            reason = self._get_exceeded_budget(timestamp, timestamp)
+            if reason is not None:
+                self._stall_report = WaitForGraph(devices, cursors, caches).report(
+                    reason, timestamp, timestamp
+                )
+                return
+
             timeline_complete = True
+            timeline_progress = False
             timeline_entry = {
                 "timestamp": timestamp,
                 "duration": 1,
@@ -83,23 +125,16 @@ class ApplicationModel_V0_0(ApplicationModelInterface):
                     "cores": {},
                     "hw": [],
                 }
+                cache = caches[device_id]
+                cursor = cursors[device_id]
 
                 for core_id, core in device["schedule"].items():
-                    if len(core) > 0:
-                        task = core[0]
+                    if cursor[core_id] < len(core) and core_id in ready[device_id]:
+                        task = core[cursor[core_id]]
 
-                        deps_fulfilled = True
-                        if len(task["dependencies"]) > 0:
-                            for dependency in task["dependencies"]:
-                                if "cache" not in device:
-                                    device["cache"] = []
-                                if dependency not in device["cache"]:
-                                    deps_fulfilled = False
-
-                        if deps_fulfilled:
+                        if cache.fulfills(task["dependencies"]):
                             # Consume dependencies and post to event timeline.
-                            for dependency in task["dependencies"]:
-                                device["cache"].remove(dependency)
+                            cache.consume(task["dependencies"])
 
                             timeline_entry["devices"][device_id]["cores"][
                                 core_id
@@ -108,10 +143,14 @@ class ApplicationModel_V0_0(ApplicationModelInterface):
                                 task["hw"]
                             )
                             timeline_entry["cache"].append(task["outputs"])
-                            del core[0]
+                            cursor[core_id] += 1
+                            timeline_progress = True
+                        else:
+                            cache.wait(core_id, task["dependencies"])
+                            ready[device_id].discard(core_id)
 
-                    # Check if we've removed everything from this device core's schedule
-                    if len(core) > 0:
+                    # Check if we've run everything in this device core's schedule
+                    if cursor[core_id] < len(core):
                         timeline_complete = False
 
             # Now that all outputs have been posted to the entry, stash back
@@ -119,18 +158,23 @@ class ApplicationModel_V0_0(ApplicationModelInterface):
             for output_dict in timeline_entry["cache"]:
                 for output_id, output_targets in output_dict.items():
                     for output_target in output_targets:
-                        if "cache" not in devices[output_target]:
-                            devices[output_target]["cache"] = [output_id]
-                        else:
-                            devices[output_target]["cache"].append(output_id)
+                        ready[output_target].update(
+                            caches[output_target].add(output_id)
+                        )
 
-            self._event_timeline.append(timeline_entry)
+            # No task could start, so no output will ever arrive: the
+            # remaining tasks are stalled for good.
+            if not timeline_complete and not timeline_progress:
+                self._stall_report = WaitForGraph(devices, cursors, caches).report(
+                    "deadlock", timestamp, timestamp
+                )
+                return
+
+            yield timeline_entry
             timestamp += 1
             if timeline_complete:
                 break
 
-        return super().generate_event_timeline()
-
 
 if __name__ == "__main__":
     if sys.version_info[0] < 3:
@@ -6,10 +6,34 @@
 @date       2022-11-28
 """
 
+import concurrent.futures
 import copy
+import gc
+import gzip
+import math
+import os
+import pickle
 import sys
+from array import array
+
+import numpy as np
 
 from application_model_interface import ApplicationModelInterface
+from calendar_queue import CalendarQueue
+from dependency_cache import DependencyCache
+from device_components import get_boundary_device, get_components, merge_timelines
+from device_records import compile_device, validate_device
+from event_timeline import EventTimeline, SymbolTable
+from schedule_graph import ScheduleGraph
+from wait_for_graph import WaitForGraph
+
+# Relative slack within which two finish times are the same. Finish times that
+# are added up in a different order differ by their rounding errors.
+KEY_TOLERANCE = 1e-9
+
+# Id of the device that marks the entry boundaries of other components in the
+# run of the coupled ones. Device ids are strings, so it cannot clash.
+BOUNDARY_DEVICE = ("boundaries",)
 
 
 class ApplicationModel_V0_1(ApplicationModelInterface):
@@ -20,10 +44,114 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
     - device tasks can take more than one cycle to execute.
     - device cores have a core frequency that affect execution time.
     - the model evaluates devices at each time step.
+
+    The model supports two engines that produce the same event timeline:
+    - "step" rescans every device and core at each timeline entry.
+    - "heap" only re-evaluates the cores affected by each completion.
+
+    A third engine, "calendar", keeps time as an integer number of ticks: by
+    default 1 / LCM(core frequencies), so that every duration / frequency is
+    a whole number of ticks, or a given tick that durations are rounded to.
+    Completions are bucketed by tick in a CalendarQueue, so simultaneous
+    completions always end the same entry. Running tasks also advance by the
+    cycles they run rather than by the elapsed time, so each task takes
+    exactly duration / frequency. With every frequency at 1 its timeline
+    matches the other engines.
+
+    If nothing is left running while tasks are still blocked, or the optional
+    max_time (seconds) or max_events budget runs out, the timeline stops early
+    and the reason is available from get_stall_report().
+
+    With a snapshot_interval, the step engine keeps a copy of its state every
+    snapshot_interval entries, so that update_event_timeline() can re-simulate
+    only the part of the timeline that a schedule edit affects.
+
+    The step engine can also be paused at a simulated time, saved to a
+    checkpoint file together with the devices and the timeline so far, and
+    resumed from that file by any number of models, e.g. to branch what-if
+    scenarios off a shared warm-up.
+
+    Cores may be given a PeriodicSchedule instead of a task list. With a
+    hyperperiod_search, the step engine then looks for a repeated state of
+    all devices (shifted by whole iterations of the periods). Once found, the
+    cycle between the two states is repeated as many times as the iterations
+    allow without storing it, and only the tail of the run is simulated. See
+    get_hyperperiod() for how the skipped cycles are accounted for.
+
+    Fleets made of independent groups of devices, which never send outputs to
+    each other, can be simulated with components=True: each connected
+    component of the output graph runs in a process pool and the timelines
+    are merged by timestamp into the timeline of a single run. Entries of the
+    merged timeline end whenever an entry of any component ends. A component
+    is coupled to the others if one of its devices schedules tasks on several
+    cores, since a busy device drops the tasks its other cores start at every
+    entry. The coupled components run together, along with a device that ends
+    an entry wherever one of the others does. The step and heap engines take
+    the elapsed time of each entry off the remaining cycles of a task, which
+    ties every component to the entries of the others unless all frequencies
+    are 1 and all durations whole; the fleet then runs as a single run. On
+    one CPU, the components entry of the benchmark suite takes 1.0 s for
+    40000 tasks in clusters, as much as the calendar engine, of which 0.13 s
+    merge the timelines in this process and the rest is spread over the pool.
     """
 
-    def __init__(self) -> None:
-        super().__init__("V0_1 Application Model")
+    ENGINES = ["step", "heap", "calendar"]
+
+    def __init__(
+        self,
+        engine="step",
+        headless=False,
+        max_time=None,
+        max_events=None,
+        cache=None,
+        snapshot_interval=None,
+        hyperperiod_search=None,
+        tick=None,
+        components=False,
+        processes=None,
+    ) -> None:
+        super().__init__(
+            "V0_1 Application Model", headless, max_time, max_events, cache
+        )
+        if engine not in self.ENGINES:
+            raise Exception(f"Unknown application engine {engine}.")
+        if snapshot_interval is not None and engine != "step":
+            raise Exception("Snapshots are only supported by the step engine.")
+        if hyperperiod_search is not None and engine != "step":
+            raise Exception("Hyperperiods are only supported by the step engine.")
+        if snapshot_interval is not None and hyperperiod_search is not None:
+            raise Exception("Snapshots cannot be combined with hyperperiods.")
+        if tick is not None and engine != "calendar":
+            raise Exception("A tick is only used by the calendar engine.")
+        if components and (
+            snapshot_interval is not None or hyperperiod_search is not None
+        ):
+            raise Exception(
+                "Components cannot be combined with snapshots or hyperperiods."
+            )
+        if components and max_events is not None:
+            # Each component would count its own events.
+            raise Exception("Components cannot be combined with max_events.")
+        self._engine = engine
+        self._event_timeline = EventTimeline()
+        self._snapshot_interval = snapshot_interval
+        self._snapshots = []
+        # State of the step engine while a run is paused, see until.
+        self._state = None
+        # Iterations of the periodic schedules to look for a steady state in.
+        self._hyperperiod_search = hyperperiod_search
+        # Time base of the calendar engine, None for 1 / LCM(frequencies).
+        self._tick = tick
+        # Simulate independent groups of devices in a pool of processes (None
+        # for the number of CPUs, 1 for this process).
+        self._components = components
+        self._processes = processes
+        # Compiled devices the engines run on (see device_records), rebuilt
+        # from the device dicts at the start of every run, and the output ids
+        # they refer to. Output indices stay valid for the life of the model,
+        # as snapshots and checkpoints hold them.
+        self._records = {}
+        self._symbols = SymbolTable()
 
     def add_device(self, device_name, device) -> bool:
         """_summary_
@@ -36,6 +164,12 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
             - specifies the input dependencies and output results.
             - has a fixed duration in cycles
 
+        The device is checked here, and again when it is compiled into the
+        records the engines read, at the start of every run. Schedules edited
+        in place in between take effect, as in V0_0. While a run is paused,
+        they take effect when it is resumed, or through
+        update_event_timeline().
+
         Args:
             device_name (_type_): _description_
             device (_type_): _description_
@@ -43,10 +177,21 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
         Returns:
             bool: _description_
         """
+        validate_device(device_name, device)
         return super().add_device(device_name, device)
 
-    def generate_event_timeline(self) -> dict:
+    def generate_event_timeline(self, until=None) -> dict:
         """_summary_
+        Generates the event timeline. A run that was paused, or restored from
+        a checkpoint, is resumed instead of started over.
+
+        Args:
+            until (float, optional): Pause the run before the first timeline
+                entry that starts at or after this simulated time. Entries
+                that start earlier are complete, and tasks still running at
+                that time are carried over. Only supported by the step engine.
+                Defaults to None, which runs to the end.
+
         {
             "device_0": {
                 "cores": {
@@ -69,13 +214,405 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
             "device_1: { ... }
         }
         """
+        if until is not None and (self._engine != "step" or self._components):
+            raise Exception("Pausing is only supported by the step engine.")
+
+        if self._state is not None:
+            state, self._state = self._state, None
+            self._compile_devices()
+            for timeline_entry in self._iter_event_timeline_step(state, until):
+                self._event_timeline.append(timeline_entry)
+        elif until is not None:
+            self._stall_report = None
+            self._hyperperiod = None
+            self._snapshots = []
+            self._compile_devices()
+            for timeline_entry in self._iter_event_timeline_step(None, until):
+                self._event_timeline.append(timeline_entry)
+        elif not self._load_event_timeline():
+            if self._components:
+                self._generate_components(self._event_timeline)
+            else:
+                for timeline_entry in self.iter_event_timeline():
+                    self._event_timeline.append(timeline_entry)
+            self._store_event_timeline()
+        return super().generate_event_timeline()
+
+    def is_paused(self) -> bool:
+        """_summary_
+        Returns:
+            bool: True if the last run was paused by until, or restored from a
+                checkpoint, and has not been resumed yet.
+        """
+        return self._state is not None
+
+    def get_schedule_graph(self) -> ScheduleGraph:
+        """_summary_
+        Analyzes the schedules without simulating them, e.g. to screen
+        candidate partitions before generating their event timelines.
+
+        Returns:
+            ScheduleGraph: Makespan, critical path and slack of each task.
+        """
+        return ScheduleGraph(self._devices)
+
+    def save_checkpoint(self, path) -> None:
+        """_summary_
+        Saves a paused run to a compressed file: the devices (schedules
+        included), the engine state (cursors, device caches, running tasks)
+        and the timeline so far.
+
+        Args:
+            path (str): Path of the checkpoint file.
+        """
+        if self._state is None:
+            raise Exception("Only a paused run can be checkpointed.")
+        checkpoint = {
+            "version": self.VERSION,
+            "devices": self._devices,
+            "symbols": self._symbols,
+            "state": self._state,
+            "event_timeline": self._event_timeline,
+        }
+        with gzip.open(path, "wb", compresslevel=1) as fp:
+            pickle.dump(checkpoint, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load_checkpoint(self, path) -> None:
+        """_summary_
+        Restores a paused run saved by save_checkpoint(), replacing the
+        devices and timeline of this model. The next generate_event_timeline()
+        resumes it and produces the same timeline as an uninterrupted run.
+        Tasks that have not started yet may be edited before resuming.
+
+        Args:
+            path (str): Path of the checkpoint file.
+        """
+        if self._engine != "step":
+            raise Exception("Checkpoints are only supported by the step engine.")
+        # Without collections in between, loading takes about half as long.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with gzip.open(path, "rb") as fp:
+                checkpoint = pickle.load(fp)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if checkpoint["version"] != self.VERSION:
+            raise Exception(
+                f"Checkpoint of version {checkpoint['version']} cannot be loaded "
+                f"by version {self.VERSION}."
+            )
+        if "symbols" not in checkpoint:
+            raise Exception("Checkpoint predates compiled devices.")
+        self._devices = checkpoint["devices"]
+        self._symbols = checkpoint["symbols"]
+        # Compiled again on resume, with the edits made in between.
+        self._records = {}
+        self._state = checkpoint["state"]
+        self._event_timeline = checkpoint["event_timeline"]
+        self._stall_report = None
+        self._snapshots = []
+
+    def iter_event_timeline(self):
+        """_summary_
+        Yields each timeline entry as soon as it is final. Entries are not
+        stored by the model.
+        """
+        self._stall_report = None
+        self._hyperperiod = None
+        self._snapshots = []
+        self._state = None
+        if self._components:
+            # Each component compiles its own devices.
+            return self._iter_event_timeline_components()
+        self._compile_devices()
+        return self._iter_event_timeline_engine()
+
+    def _iter_event_timeline_engine(self):
+        if self._engine == "heap":
+            return self._iter_event_timeline_heap()
+        if self._engine == "calendar":
+            return self._iter_event_timeline_calendar()
+        return self._iter_event_timeline_step()
+
+    def update_event_timeline(self, edits) -> int:
+        """_summary_
+        Re-simulates the event timeline after tasks of the schedule were edited
+        in place (duration, dependencies, outputs, hw, or tasks inserted,
+        removed or moved to another core). The step engine only reads a task
+        once it reaches the head of its core, so the timeline up to the latest
+        snapshot in which no edited position was reached is kept, and only the
+        entries after it are generated again.
+
+        Args:
+            edits (list((str, str, int))): (device id, core id, task index) of
+                the first changed position of each edited core. A task moved
+                between cores changes a position on both cores.
+
+        Returns:
+            int: Index of the first timeline entry that was generated again.
+                Entries before it are unchanged.
+        """
+        if self._engine != "step" or self._components:
+            raise Exception(
+                "Incremental updates are only supported by the step engine."
+            )
+
+        # Snapshots are kept in timeline order.
+        idx = len(self._snapshots) - 1
+        while idx >= 0 and not self._is_before_edits(self._snapshots[idx], edits):
+            idx -= 1
+        del self._snapshots[idx + 1 :]
+
+        start = 0
+        state = None
+        if idx >= 0:
+            start = self._snapshots[idx]["events"]
+            state = copy.deepcopy(self._snapshots[idx])
+
+        self._stall_report = None
+        self._state = None
+        self._event_timeline.truncate(start)
+        self._compile_devices({device_id for device_id, _, _ in edits})
+        for timeline_entry in self._iter_event_timeline_step(state):
+            self._event_timeline.append(timeline_entry)
+        super().generate_event_timeline()
+        return start
+
+    def _is_before_edits(self, state, edits) -> bool:
+        for device_id, core_id, task_idx in edits:
+            if device_id not in state["cursors"]:
+                return False
+            cursor = state["cursors"][device_id].get(core_id)
+            if cursor is None:
+                return False
+            # The head task may already have been read, even by a core that is
+            # ready again: it may have blocked on its old dependencies and
+            # been woken since.
+            if cursor >= task_idx:
+                return False
+        return True
+
+    def _compile_devices(self, device_ids=None) -> None:
+        """_summary_
+        Checks the devices and compiles them into the records the engines
+        read.
+
+        Args:
+            device_ids (iterable(str), optional): Devices whose schedules
+                were edited since they were compiled. Defaults to None, to
+                compile every device again.
+        """
+        if device_ids is None:
+            self._records = {}
+            device_ids = self._devices.keys()
+        for device_id in device_ids:
+            validate_device(device_id, self._devices[device_id])
+            self._records[device_id] = compile_device(
+                self._devices[device_id], self._symbols
+            )
+
+    def _get_cache_options(self) -> list:
+        # Each engine, and each mode of running it, has its own timeline. The
+        # number of processes does not change it.
+        options = [self._engine, self._hyperperiod_search]
+        if self._engine == "calendar":
+            options += [self._tick]
+        if self._components:
+            options += ["components"]
+        return super()._get_cache_options() + options
+
+    def _get_hyperperiod_search(self, cursors):
+        # Periodic cores, with the length of their period and schedule.
+        cores = [
+            (device_id, core.id, len(core.tasks.period), len(core.tasks))
+            for device_id, device in self._records.items()
+            for core in device.cores
+            if len(getattr(core.tasks, "period", [])) > 0
+            and cursors[device_id][core.id] < len(core.tasks)
+        ]
+        if self._hyperperiod_search is None or len(cores) == 0:
+            return None
+        return {"cores": cores, "signatures": {}, "iteration": None}
+
+    def _search_hyperperiod(self, search, state, until) -> bool:
+        """_summary_
+        Records the state of the step engine each time the slowest periodic
+        core starts a new iteration. Once a state repeats, skips as many
+        repeats of the cycle in between as the schedules, max_time and until
+        allow, by moving the cursors and the timestamp ahead.
+
+        Returns:
+            bool: True once the search is over.
+        """
+        cursors = state["cursors"]
+        iteration = min(
+            cursors[device_id][core_id] // period
+            for device_id, core_id, period, _ in search["cores"]
+        )
+        if iteration == search["iteration"]:
+            return False
+        search["iteration"] = iteration
+
+        # Periodic cores are compared by their position relative to the
+        # iteration, everything else as is.
+        offsets = {
+            (device_id, core_id): iteration * period
+            for device_id, core_id, period, _ in search["cores"]
+        }
+        signature = (
+            tuple(
+                (device_id, core_id, cursor - offsets.get((device_id, core_id), 0))
+                for device_id, device_cursors in cursors.items()
+                for core_id, cursor in device_cursors.items()
+            ),
+            tuple(
+                (device_id, tuple(sorted(cores)))
+                for device_id, cores in state["ready"].items()
+            ),
+            tuple(
+                (device_id, cache.signature())
+                for device_id, cache in state["caches"].items()
+            ),
+            tuple(
+                (
+                    device_id,
+                    tuple(
+                        (
+                            core_id,
+                            core["task"],
+                            core["task_duration"],
+                            core["core_freq"],
+                        )
+                        for core_id, core in device["cores"].items()
+                    ),
+                    tuple(device["hw"]),
+                )
+                for device_id, device in state["running_devices"].items()
+            ),
+        )
+        if signature not in search["signatures"]:
+            search["signatures"][signature] = (
+                state["events"],
+                state["timestamp"],
+                iteration,
+            )
+            return iteration >= self._hyperperiod_search
+
+        start, start_timestamp, start_iteration = search["signatures"][signature]
+        iterations = iteration - start_iteration
+        cycle = state["timestamp"] - start_timestamp
+        repeats = min(
+            (size - cursors[device_id][core_id]) // (iterations * period)
+            for device_id, core_id, period, size in search["cores"]
+        )
+        # Every skipped entry has to start before the run would stop.
+        for limit in [self._max_time, until]:
+            if limit is not None and cycle > 0:
+                repeats = min(repeats, int((limit - state["timestamp"]) // cycle))
+        entries = state["events"] - start
+        if self._max_events is not None and entries > 0:
+            repeats = min(repeats, (self._max_events - state["events"]) // entries)
+        if repeats <= 0:
+            return True
+
+        for device_id, core_id, period, _ in search["cores"]:
+            cursors[device_id][core_id] += repeats * iterations * period
+        state["timestamp"] += repeats * cycle
+        self._hyperperiod = {
+            "start": start,
+            "end": state["events"],
+            "iterations": iterations,
+            "duration": cycle,
+            "repeats": repeats,
+        }
+        return True
+
+    def _get_skipped_events(self) -> int:
+        # Timeline entries that were skipped as repeats of the hyperperiod.
+        if self._hyperperiod is None:
+            return 0
+        hyperperiod = self._hyperperiod
+        return hyperperiod["repeats"] * (hyperperiod["end"] - hyperperiod["start"])
+
+    def _stop(self, reason, timestamp, events, cursors, caches) -> None:
+        # Running out of tasks to start is only a stall if some are left. The
+        # report names the outputs the caches count by index.
+        caches = {
+            device_id: DependencyCache(
+                [self._symbols[output_id] for output_id in cache.to_list()]
+            )
+            for device_id, cache in caches.items()
+        }
+        graph = WaitForGraph(self._devices, cursors, caches)
+        if reason != "deadlock" or graph.pending_tasks > 0:
+            self._stall_report = graph.report(reason, timestamp, events)
+
+    def _get_initial_state(self) -> dict:
+        """_summary_
+        Returns:
+            dict: State of the step engine before the first timeline entry.
+        """
+        # Outputs available on each device, and the cores that may be able to
+        # run. A core blocked on its dependencies is only re-evaluated when one
+        # of the outputs it waits on arrives. The schedules themselves are
+        # never modified; each core keeps a cursor to its next task instead.
+        state = {
+            "timestamp": 0,
+            "events": 0,
+            "caches": {},
+            "ready": {},
+            "cursors": {},
+            "running_devices": {},
+        }
+        for device_id, device in self._records.items():
+            state["caches"][device_id] = DependencyCache(device.cache)
+            state["ready"][device_id] = {core.id for core in device.cores}
+            state["cursors"][device_id] = {core.id: 0 for core in device.cores}
+        return state
 
-        devices = copy.deepcopy(self._devices)
+    def _iter_event_timeline_step(self, state=None, until=None):
+        """_summary_
+        Runs the step engine from the given state, or from the start. The state
+        is updated in place between timeline entries, and a copy of it is kept
+        every snapshot_interval entries. If the run reaches until, it stops and
+        keeps its state to be resumed.
+        """
+        devices = self._records
+        if state is None:
+            state = self._get_initial_state()
+        caches = state["caches"]
+        ready = state["ready"]
+        cursors = state["cursors"]
 
         # TODO: I hate this, please clean up future me
-        running_devices = {}
-        timestamp = 0
+        running_devices = state["running_devices"]
+        timestamp = state["timestamp"]
+        events = state["events"]
+        search = self._get_hyperperiod_search(cursors)
+        # Entries of a skipped hyperperiod count towards max_events.
+        skipped = self._get_skipped_events()
         while True:
+            state["running_devices"] = running_devices
+            state["timestamp"] = timestamp
+            state["events"] = events
+            if (
+                self._snapshot_interval is not None
+                and events % self._snapshot_interval == 0
+                and (
+                    len(self._snapshots) == 0 or self._snapshots[-1]["events"] < events
+                )
+            ):
+                self._snapshots.append(copy.deepcopy(state))
+            if until is not None and timestamp >= until:
+                self._state = state
+                return
+            if search is not None and self._search_hyperperiod(search, state, until):
+                timestamp = state["timestamp"]
+                skipped = self._get_skipped_events()
+                search = None
+
             timeline_entry = {
                 "timestamp": timestamp,
                 "duration": 0,
@@ -92,7 +629,8 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
                 device_entry = {"cores": {}, "hw": []}
 
                 # For each core, check to see if there are any available tasks
-                for core_id, core in device["schedule"].items():
+                for core in device.cores:
+                    core_id = core.id
                     # If core is currently running something else
                     if (
                         device_id in timeline_entry["devices"]
@@ -100,39 +638,40 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
                     ):
                         continue
                     # Core has tasks available for us
-                    elif len(core) > 0:
-                        task = core[0]
-
-                        # Am I waiting on any dependencies?
-                        deps_fulfilled = True
-                        if len(task["dependencies"]) > 0:
-                            for dependency in task["dependencies"]:
-                                if "cache" not in device:
-                                    device["cache"] = []
-                                if dependency not in device["cache"]:
-                                    deps_fulfilled = False
+                    elif (
+                        cursors[device_id][core_id] < len(core.tasks)
+                        and core_id in ready[device_id]
+                    ):
+                        task = core.tasks[cursors[device_id][core_id]]
+
+                        # Am I waiting on any dependencies? If so, sleep until
+                        # one of them arrives.
+                        if not caches[device_id].fulfills_counts(task.needs):
+                            caches[device_id].wait_counts(core_id, task.needs)
+                            ready[device_id].discard(core_id)
 
                         # If not, post the core to the event timeline.
                         # "Start execution".
-                        if deps_fulfilled:
+                        else:
                             # Consume the task dependencies.
-                            for dependency in task["dependencies"]:
-                                device["cache"].remove(dependency)
+                            caches[device_id].consume(task.dependencies)
 
-                            # Generate the device entry.
+                            # Generate the device entry. The running task is
+                            # tracked by this record until it finishes.
                             device_entry["cores"][core_id] = {
-                                "core_freq": device["cores"][core_id]["frequency"],
-                                "task": task["task_name"],
-                                "task_duration": task["duration"],
-                                "cache": task["outputs"],
+                                "core_freq": core.frequency,
+                                "task": task.name,
+                                "task_duration": task.duration,
+                                "cache": task.outputs,
+                                "sends": task.sends,
                             }
 
                             # Any HW used during this task execution, add to
                             # the device entry.
-                            device_entry["hw"].extend(task["hw"])
+                            device_entry["hw"].extend(task.hw)
 
-                            # Remove task from the device.
-                            del core[0]
+                            # Move on to the next task of the core.
+                            cursors[device_id][core_id] += 1
 
                     if device_id not in timeline_entry["devices"]:
                         timeline_entry["devices"][device_id] = device_entry
@@ -151,6 +690,10 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
                     tasks.append(task)
 
             if len(tasks) > 0:
+                reason = self._get_exceeded_budget(timestamp, events + skipped)
+                if reason is not None:
+                    self._stop(reason, timestamp, events + skipped, cursors, caches)
+                    return
 
                 def get_duration(elem):
                     return elem["duration"]
@@ -172,25 +715,23 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
                 for task in done_tasks:
                     device_id = task["device_id"]
                     core_id = task["core_id"]
-                    outputs = timeline_entry["devices"][device_id]["cores"][core_id][
-                        "cache"
-                    ]
+                    core = timeline_entry["devices"][device_id]["cores"][core_id]
 
                     # Output to main cache.
-                    timeline_entry["cache"].append(outputs)
+                    timeline_entry["cache"].append(core["cache"])
 
                     # Update individual device cache.
-                    for output_id, output_targets in outputs.items():
-                        for output_target in output_targets:
-                            if "cache" not in devices[output_target]:
-                                devices[output_target]["cache"] = [output_id]
-                            else:
-                                devices[output_target]["cache"].append(output_id)
+                    for output_target, output_id in core["sends"]:
+                        ready[output_target].update(
+                            caches[output_target].add(output_id)
+                        )
 
                 # Advance time by the duration of the shortest tasks.
                 timestamp += duration
 
-                # Propagate remaining tasks to the next timeline_entry.
+                # Propagate remaining tasks to the next timeline_entry. The
+                # task records are carried over as is; only the containers are
+                # new, since this entry's are rewritten below.
                 running_devices = {}
                 for task in remaining_tasks:
                     device_id = task["device_id"]
@@ -198,33 +739,639 @@ class ApplicationModel_V0_1(ApplicationModelInterface):
                     core = timeline_entry["devices"][device_id]["cores"][core_id]
                     core["task_duration"] -= duration
 
-                    if device_id in running_devices:
-                        running_devices[device_id]["cores"][core_id] = copy.deepcopy(
-                            core
-                        )
-                        running_devices[device_id]["hw"] = copy.deepcopy(
-                            timeline_entry["devices"][device_id]["hw"]
-                        )
-                    else:
+                    if device_id not in running_devices:
                         running_devices[device_id] = {
-                            "cores": {core_id: copy.deepcopy(core)},
-                            "hw": copy.deepcopy(
-                                timeline_entry["devices"][device_id]["hw"]
-                            ),
+                            "cores": {},
+                            "hw": list(timeline_entry["devices"][device_id]["hw"]),
                         }
+                    running_devices[device_id]["cores"][core_id] = core
 
                 # Reformat each core entry to just contain the task name.
                 for device_id, device in timeline_entry["devices"].items():
                     for core_id, core in device["cores"].items():
-                        timeline_entry["devices"][device_id]["cores"][
-                            core_id
-                        ] = timeline_entry["devices"][device_id]["cores"][core_id][
-                            "task"
-                        ]
+                        timeline_entry["devices"][device_id]["cores"][core_id] = (
+                            timeline_entry["devices"][device_id]["cores"][core_id][
+                                "task"
+                            ]
+                        )
 
-                self._event_timeline.append(timeline_entry)
+                yield timeline_entry
+                events += 1
             else:
-                return super().generate_event_timeline()
+                self._stop("deadlock", timestamp, events + skipped, cursors, caches)
+                return
+
+    def _iter_event_timeline_heap(self):
+        """_summary_
+        Discrete event version of the step engine. Only cores that may have
+        become ready are re-evaluated at each entry: cores that just finished,
+        cores waiting on an output that just arrived, and cores that picked up
+        a task while their device was still busy. The step engine discards
+        such a task (it is consumed but never posted), and the core then tries
+        its next task at the next entry; this engine reproduces that behavior
+        so that both timelines match.
+
+        Running tasks are timed exactly as in the step engine: each keeps its
+        remaining cycles, the entry lasts the shortest remaining cycles over
+        frequency, and that duration is taken off the remaining cycles of the
+        others. Keeping finish times in a priority queue instead rounds them
+        differently, which splits or merges entries for frequencies that are
+        not powers of two. Each entry lists every running task anyway, so the
+        work per entry stays bounded by the size of the entry.
+        """
+        devices = self._records
+        caches = {
+            device_id: DependencyCache(device.cache)
+            for device_id, device in devices.items()
+        }
+        cursors = {
+            device_id: {core.id: 0 for core in device.cores}
+            for device_id, device in devices.items()
+        }
+        device_ids = [
+            device_id for device_id, device in devices.items() if len(device.cores)
+        ]
+        order = {device_id: idx for idx, device_id in enumerate(device_ids)}
+
+        # Cores to re-evaluate at the next timeline entry, for each device that
+        # has any.
+        awake = {
+            device_id: {core.id for core in devices[device_id].cores}
+            for device_id in device_ids
+        }
+        # Tasks carried over from the last entry, grouped by device in the order
+        # the step engine would list them, and the hw their devices froze with.
+        running_devices = {}
+        running_hw = {}
+
+        timestamp = 0
+        events = 0
+        while True:
+            timeline_entry = {
+                "timestamp": timestamp,
+                "duration": 0,
+                "devices": {},
+                "cache": [],
+            }
+            entry_devices = timeline_entry["devices"]
+
+            # Carried devices come first; each record remembers its position
+            # in the entry so that simultaneous completions keep entry order.
+            running = []
+            for device_id, records in running_devices.items():
+                entry_devices[device_id] = {
+                    "cores": {record["core_id"]: record["task"] for record in records},
+                    "hw": list(running_hw[device_id]),
+                }
+                running.extend(records)
+            for device_id in device_ids:
+                if device_id not in running_devices:
+                    entry_devices[device_id] = {"cores": {}, "hw": []}
+
+            woken, awake = awake, {}
+            for device_id in sorted(woken, key=order.__getitem__):
+                busy = device_id in running_devices
+                device_entry = entry_devices[device_id]
+                cores = woken[device_id]
+                cursor = cursors[device_id]
+                cache = caches[device_id]
+                for core in devices[device_id].cores:
+                    core_id = core.id
+                    if core_id not in cores or cursor[core_id] == len(core.tasks):
+                        continue
+                    if busy and core_id in device_entry["cores"]:
+                        continue
+
+                    task = core.tasks[cursor[core_id]]
+                    if not cache.fulfills_counts(task.needs):
+                        cache.wait_counts(core_id, task.needs)
+                        continue
+
+                    cache.consume(task.dependencies)
+                    cursor[core_id] += 1
+
+                    if busy:
+                        # Dropped, like the step engine; try again next entry.
+                        awake.setdefault(device_id, set()).add(core_id)
+                        continue
+
+                    record = {
+                        "device_id": device_id,
+                        "core_id": core_id,
+                        "core_freq": core.frequency,
+                        "task": task.name,
+                        "remaining": task.duration,
+                        "cache": task.outputs,
+                        "sends": task.sends,
+                    }
+                    running.append(record)
+                    device_entry["cores"][core_id] = task.name
+                    device_entry["hw"].extend(task.hw)
+
+            # Nothing is running: the timeline is complete, unless tasks are
+            # still blocked.
+            if len(running) == 0:
+                self._stop("deadlock", timestamp, events, cursors, caches)
+                return
+            reason = self._get_exceeded_budget(timestamp, events)
+            if reason is not None:
+                self._stop(reason, timestamp, events, cursors, caches)
+                return
+
+            # The shortest remaining task sets the duration of this entry, and
+            # every task that takes exactly as long completes with it.
+            durations = [
+                record["remaining"] / record["core_freq"] for record in running
+            ]
+            duration = min(durations)
+            timeline_entry["duration"] = duration
+
+            # For the tasks that have "executed", send outputs to cache, in
+            # entry order.
+            remaining = []
+            for record, record_duration in zip(running, durations):
+                if record_duration != duration:
+                    record["remaining"] -= duration
+                    remaining.append((record_duration, record))
+                    continue
+                timeline_entry["cache"].append(record["cache"])
+                for output_target, output_id in record["sends"]:
+                    cores = caches[output_target].add(output_id)
+                    if len(cores) > 0:
+                        awake.setdefault(output_target, set()).update(cores)
+                awake.setdefault(record["device_id"], set()).add(record["core_id"])
+
+            # Order the remaining tasks as the step engine would: by remaining
+            # time, then by position in this entry, which the sort keeps.
+            remaining.sort(key=lambda item: item[0])
+            next_running_devices = {}
+            for _, record in remaining:
+                device_id = record["device_id"]
+                if device_id not in next_running_devices:
+                    next_running_devices[device_id] = []
+                    running_hw[device_id] = entry_devices[device_id]["hw"]
+                next_running_devices[device_id].append(record)
+            running_devices = next_running_devices
+
+            timestamp += duration
+            yield timeline_entry
+            events += 1
+
+    def _get_time_base(self):
+        """_summary_
+        Returns:
+            (function, function): Converts a task duration and core frequency
+                to ticks; converts ticks to time.
+        """
+        if self._tick is not None:
+            tick = self._tick
+            return (
+                lambda duration, frequency: round(duration / frequency / tick),
+                lambda ticks: ticks * tick,
+            )
+
+        frequencies = self._get_frequencies()
+        if not all(float(frequency).is_integer() for frequency in frequencies):
+            raise Exception(
+                "The calendar engine needs a tick for non-integer frequencies."
+            )
+        rate = math.lcm(*[int(frequency) for frequency in frequencies])
+        return (
+            lambda duration, frequency: round(duration * rate / frequency),
+            lambda ticks: ticks / rate,
+        )
+
+    def _get_frequencies(self) -> set:
+        return {
+            core["frequency"]
+            for device in self._devices.values()
+            for core in device["cores"].values()
+        }
+
+    def _iter_event_timeline_calendar(self):
+        """_summary_
+        Integer tick version of the heap engine. A running task is due at the
+        tick it started at plus its duration in ticks, and every task due at
+        the same tick completes in the same entry.
+        """
+        devices = self._records
+        get_ticks, get_time = self._get_time_base()
+        caches = {
+            device_id: DependencyCache(device.cache)
+            for device_id, device in devices.items()
+        }
+        cursors = {
+            device_id: {core.id: 0 for core in device.cores}
+            for device_id, device in devices.items()
+        }
+
+        # Cores to re-evaluate at the next timeline entry, per device.
+        awake = {
+            device_id: {core.id for core in device.cores}
+            for device_id, device in devices.items()
+        }
+        completions = CalendarQueue()
+        running = []
+        # Devices with tasks carried over from the last entry, in the order the
+        # step engine would list them, and the hw they froze with.
+        running_devices = {}
+        running_hw = {}
+
+        now = 0
+        timestamp = 0
+        events = 0
+        while True:
+            timeline_entry = {
+                "timestamp": timestamp,
+                "duration": 0,
+                "devices": {},
+                "cache": [],
+            }
+
+            # Carried devices come first; each record remembers its position
+            # in the entry so that simultaneous completions keep entry order.
+            position = 0
+            for device_id, cores in running_devices.items():
+                timeline_entry["devices"][device_id] = {
+                    "cores": {},
+                    "hw": list(running_hw[device_id]),
+                }
+                for core_id, record in cores.items():
+                    timeline_entry["devices"][device_id]["cores"][core_id] = record[
+                        "task"
+                    ]
+                    record["position"] = position
+                    position += 1
+
+            for device_id, device in devices.items():
+                if len(device.cores) == 0:
+                    continue
+
+                busy = device_id in running_devices
+                if not busy:
+                    timeline_entry["devices"][device_id] = {"cores": {}, "hw": []}
+                device_entry = timeline_entry["devices"][device_id]
+
+                woken = awake[device_id]
+                if len(woken) == 0:
+                    continue
+                awake[device_id] = set()
+
+                cursor = cursors[device_id]
+                for core in device.cores:
+                    core_id = core.id
+                    if core_id not in woken or cursor[core_id] == len(core.tasks):
+                        continue
+                    if busy and core_id in running_devices[device_id]:
+                        continue
+
+                    task = core.tasks[cursor[core_id]]
+                    if not caches[device_id].fulfills_counts(task.needs):
+                        caches[device_id].wait_counts(core_id, task.needs)
+                        continue
+
+                    caches[device_id].consume(task.dependencies)
+                    cursor[core_id] += 1
+
+                    if busy:
+                        # Dropped, like the step engine; try again next entry.
+                        awake[device_id].add(core_id)
+                        continue
+
+                    record = {
+                        "device_id": device_id,
+                        "core_id": core_id,
+                        "task": task.name,
+                        "due": now + get_ticks(task.duration, core.frequency),
+                        "cache": task.outputs,
+                        "sends": task.sends,
+                        "position": position,
+                    }
+                    position += 1
+                    device_entry["cores"][core_id] = task.name
+                    device_entry["hw"].extend(task.hw)
+                    completions.push(record["due"], record)
+                    running.append(record)
+
+            # Nothing is running: the timeline is complete, unless tasks are
+            # still blocked.
+            if len(completions) == 0:
+                self._stop("deadlock", timestamp, events, cursors, caches)
+                return
+            reason = self._get_exceeded_budget(timestamp, events)
+            if reason is not None:
+                self._stop(reason, timestamp, events, cursors, caches)
+                return
+
+            due, done_tasks = completions.pop()
+            next_timestamp = get_time(due)
+            timeline_entry["duration"] = next_timestamp - timestamp
+            done_tasks.sort(key=lambda record: record["position"])
+
+            # For the tasks that have "executed", send outputs to cache.
+            for record in done_tasks:
+                timeline_entry["cache"].append(record["cache"])
+                for output_target, output_id in record["sends"]:
+                    awake[output_target].update(caches[output_target].add(output_id))
+                awake[record["device_id"]].add(record["core_id"])
+
+            # Order the remaining tasks as the step engine would: by remaining
+            # time, then by position in this entry.
+            running = [record for record in running if record["due"] > due]
+            remaining = {}
+            for record in running:
+                remaining.setdefault(record["device_id"], []).append(record)
+
+            def get_order(record):
+                return (record["due"], record["position"])
+
+            carried = []
+            for device_id, records in remaining.items():
+                records.sort(key=get_order)
+                carried.append((get_order(records[0]), device_id, records))
+            carried.sort(key=lambda device: device[0])
+
+            next_running_devices = {}
+            for _, device_id, records in carried:
+                next_running_devices[device_id] = {
+                    record["core_id"]: record for record in records
+                }
+                running_hw[device_id] = timeline_entry["devices"][device_id]["hw"]
+            running_devices = next_running_devices
+
+            now = due
+            timestamp = next_timestamp
+            yield timeline_entry
+            events += 1
+
+    def _iter_event_timeline_components(self):
+        # The merged timeline is built in bulk, then expanded entry by entry.
+        event_timeline = EventTimeline()
+        self._generate_components(event_timeline)
+        yield from event_timeline
+
+    def _generate_components(self, event_timeline) -> None:
+        """_summary_
+        Simulates each connected component of the fleet on its own, in a
+        process pool, and appends the merged timeline to event_timeline. The
+        components whose tasks depend on where the entries of the others end
+        are simulated together, along with a device that ends an entry at the
+        end of every entry of the others. With max_time, the components that
+        run past the first merged entry to reach it are simulated again up to
+        that entry. The stall report is built from the final state of every
+        component, as a single run would.
+        """
+        self._stall_report = None
+        components = get_components(self._devices)
+        coupled = self._get_coupled_components(components)
+        if len(coupled) == len(components):
+            self._compile_devices()
+            for timeline_entry in self._iter_event_timeline_engine():
+                event_timeline.append(timeline_entry)
+            return
+
+        model_kwargs = {
+            "engine": self._engine,
+            "headless": True,
+            "max_time": self._max_time,
+            "tick": self._tick,
+            "frequencies": self._get_frequencies(),
+        }
+        groups = [
+            component for idx, component in enumerate(components) if idx not in coupled
+        ]
+        results = self._simulate_components(
+            [(self._get_component(group), [], model_kwargs) for group in groups]
+        )
+        device_order = {device_id: idx for idx, device_id in enumerate(self._devices)}
+        if len(coupled) > 0:
+            group = [device_id for idx in coupled for device_id in components[idx]]
+            group.sort(key=device_order.get)
+            boundaries = np.unique(
+                np.concatenate([_get_ends(result) for result in results])
+            )
+            groups.append(group)
+            results += self._simulate_components(
+                [(self._get_component(group), boundaries.tolist(), model_kwargs)]
+            )
+
+        # A single run stops at the first entry that starts at or after
+        # max_time while a task is still running.
+        stops = [result[3] for result in results]
+        until = None
+        if self._max_time is not None:
+            for timestamp in sorted(
+                stop[1] for stop in stops if stop[1] >= self._max_time
+            ):
+                if any(
+                    timestamp < stop[1]
+                    or (timestamp == stop[1] and stop[0] == "max_time")
+                    for stop in stops
+                ):
+                    until = timestamp
+                    break
+        if until is not None:
+            rerun = [idx for idx, stop in enumerate(stops) if stop[1] > until]
+            for idx, result in zip(
+                rerun,
+                self._simulate_components(
+                    [
+                        (self._get_component(groups[idx]), [until], model_kwargs)
+                        for idx in rerun
+                    ]
+                ),
+            ):
+                results[idx] = result
+
+        length = len(event_timeline)
+        merge_timelines(
+            event_timeline,
+            [result[0] for result in results],
+            [_get_ends(result) for result in results],
+            [
+                (
+                    np.array([device_order[device_id] for device_id in group])[
+                        result[1]
+                    ],
+                    result[2],
+                )
+                for group, result in zip(groups, results)
+            ],
+            [
+                [
+                    device_id
+                    for device_id in group
+                    if len(self._devices[device_id]["schedule"]) > 0
+                ]
+                for group in groups
+            ],
+            len(groups) - 1 if len(coupled) > 0 else None,
+            until,
+        )
+
+        cursors = {}
+        caches = {}
+        for group, result in zip(groups, results):
+            for device_id in group:
+                cursors[device_id] = result[3][2][device_id]
+                caches[device_id] = DependencyCache(result[3][3][device_id])
+        graph = WaitForGraph(self._devices, cursors, caches)
+        reason = "max_time"
+        timestamp = until
+        if until is None:
+            reason = "deadlock"
+            timestamp = max([stop[1] for stop in stops], default=0)
+        if reason != "deadlock" or graph.pending_tasks > 0:
+            self._stall_report = graph.report(
+                reason, timestamp, len(event_timeline) - length
+            )
+
+    def _get_coupled_components(self, components) -> list:
+        """_summary_
+        Finds the components that cannot be simulated on their own, since the
+        tasks they run depend on where the entries of the others end:
+        - a device that is busy drops the tasks its idle cores start at each
+          entry, so a device with several scheduled cores couples its
+          component.
+        - the step and heap engines take the elapsed time of each entry off
+          the cycles left to a running task, which only adds up to the same
+          end as one entry at a frequency of 1 with whole durations. Otherwise
+          every component is coupled.
+        - tasks without duration add entries at the same time, which a single
+          run shares between components. Every component is then coupled.
+
+        Args:
+            components (list(list(str))): Device ids of each component.
+
+        Returns:
+            list(int): Indices of the coupled components.
+        """
+        if self._engine == "calendar":
+            get_ticks = self._get_time_base()[0]
+        coupled = []
+        for idx, component in enumerate(components):
+            for device_id in component:
+                device = self._devices[device_id]
+                scheduled = 0
+                for core_id, tasks in device["schedule"].items():
+                    frequency = device["cores"][core_id]["frequency"]
+                    scheduled += int(len(tasks) > 0)
+                    for task in getattr(tasks, "period", tasks):
+                        if self._engine == "calendar":
+                            whole = get_ticks(task["duration"], frequency) > 0
+                        else:
+                            whole = (
+                                frequency == 1
+                                and task["duration"] > 0
+                                and float(task["duration"]).is_integer()
+                            )
+                        if not whole:
+                            return list(range(len(components)))
+                if scheduled > 1 and idx not in coupled:
+                    coupled.append(idx)
+        return coupled
+
+    def _get_component(self, component) -> dict:
+        return {device_id: self._devices[device_id] for device_id in component}
+
+    def _simulate_components(self, jobs) -> list:
+        """_summary_
+        Runs _simulate_component on each job, in a pool of processes unless
+        there is only one job or one process.
+        """
+        processes = self._processes
+        if processes is None:
+            processes = os.cpu_count()
+        if processes == 1 or len(jobs) <= 1:
+            return [_simulate_component(job) for job in jobs]
+        with concurrent.futures.ProcessPoolExecutor(
+            min(processes, len(jobs))
+        ) as executor:
+            # Small components are sent to the workers in batches.
+            chunksize = max(1, len(jobs) // (4 * processes))
+            return list(executor.map(_simulate_component, jobs, chunksize=chunksize))
+
+
+class _ComponentModel(ApplicationModel_V0_1):
+    """_summary_
+    Runs one component for _generate_components. Each compiled task gets a
+    copy of its outputs, so that the outputs in an entry cache tell which core
+    completed a task, and the final state of the run is kept for the stall
+    report of the fleet.
+    """
+
+    def __init__(self, frequencies, **kwargs) -> None:
+        super().__init__(**kwargs)
+        # Core frequencies of the fleet, so that the calendar engine counts in
+        # the ticks of a single run.
+        self._frequencies = frequencies
+
+    def _get_frequencies(self) -> set:
+        return self._frequencies
+
+    def _compile_devices(self, device_ids=None) -> None:
+        super()._compile_devices(device_ids)
+        self.owners = {}
+        for device_id, device in self._records.items():
+            for core in device.cores:
+                for task in getattr(core.tasks, "period", core.tasks):
+                    task.outputs = dict(task.outputs)
+                    self.owners[id(task.outputs)] = (device_id, core.id)
+
+    def _stop(self, reason, timestamp, events, cursors, caches) -> None:
+        caches = {
+            device_id: [self._symbols[output_id] for output_id in cache.to_list()]
+            for device_id, cache in caches.items()
+        }
+        self.stop = (reason, timestamp, cursors, caches)
+
+
+def _simulate_component(job) -> tuple:
+    # Runs in the workers of _generate_components. Returns the timeline of
+    # the component, the device (index in the component) and start time of
+    # the task behind each output group, and the final state of the run.
+    devices, boundaries, model_kwargs = job
+    model = _ComponentModel(**model_kwargs)
+    for device_id, device in devices.items():
+        model.add_device(device_id, device)
+    if len(boundaries) > 0:
+        model.add_device(BOUNDARY_DEVICE, get_boundary_device(boundaries))
+
+    event_timeline = EventTimeline()
+    device_order = {device_id: idx for idx, device_id in enumerate(devices)}
+    done_devices = array("i")
+    done_starts = array("d")
+    starts = {}
+    for timeline_entry in model.iter_event_timeline():
+        timeline_entry["devices"].pop(BOUNDARY_DEVICE, None)
+        for device_id, device in timeline_entry["devices"].items():
+            for core_id in device["cores"]:
+                starts.setdefault((device_id, core_id), timeline_entry["timestamp"])
+        cache = []
+        for outputs in timeline_entry["cache"]:
+            device_id, core_id = model.owners[id(outputs)]
+            if device_id == BOUNDARY_DEVICE:
+                continue
+            done_devices.append(device_order[device_id])
+            done_starts.append(starts.pop((device_id, core_id)))
+            cache.append(outputs)
+        timeline_entry["cache"] = cache
+        event_timeline.append(timeline_entry)
+    return (
+        event_timeline,
+        np.array(done_devices, dtype=np.int64),
+        np.array(done_starts, dtype=np.float64),
+        model.stop,
+    )
+
+
+def _get_ends(result) -> np.ndarray:
+    # End of each entry of a component: the start of the next one, or where
+    # the run stopped.
+    timestamps = result[0].timestamp
+    if len(timestamps) == 0:
+        return timestamps
+    return np.append(timestamps[1:], result[3][1])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""_summary_
+@file       calendar_queue.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Priority queue of events keyed by integer tick.
+@version    0.0.0
+@date       2022-12-16
+"""
+
+
+class CalendarQueue:
+    """_summary_
+    CalendarQueue is a calendar queue (R. Brown, 1988) of events keyed by an
+    integer tick. Ticks are hashed into a ring of buckets ("days") of `width`
+    ticks each; the ring covers one "year". Events due at the same tick share
+    one entry and are popped together.
+
+    Popping scans the days forward from the last popped tick, so with a width
+    close to the average gap between ticks, push and pop take O(1) amortized.
+    The ring is resized, and the width re-estimated, whenever the number of
+    distinct ticks doubles or halves.
+
+    Events may not be pushed earlier than the last popped tick.
+    """
+
+    MIN_BUCKETS = 2
+
+    def __init__(self, width=1) -> None:
+        self._width = width
+        self._buckets = [{} for _ in range(self.MIN_BUCKETS)]
+        self._ticks = 0
+        self._size = 0
+        self._last = 0
+
+    def push(self, tick, item) -> None:
+        bucket = self._buckets[(tick // self._width) % len(self._buckets)]
+        items = bucket.get(tick)
+        if items is None:
+            bucket[tick] = [item]
+            self._ticks += 1
+            if self._ticks > 2 * len(self._buckets):
+                self._resize(2 * len(self._buckets))
+        else:
+            items.append(item)
+        self._size += 1
+
+    def pop(self) -> (int, list):
+        """_summary_
+        Returns:
+            (int, list): The earliest tick and every event due at it, in push
+                order.
+        """
+        if self._ticks == 0:
+            raise IndexError("pop from an empty calendar queue")
+
+        buckets = self._buckets
+        width = self._width
+        day = self._last // width
+        for _ in range(len(buckets)):
+            bucket = buckets[day % len(buckets)]
+            day += 1
+            if len(bucket) == 0:
+                continue
+            # Ticks of later years hash to the same day; skip them.
+            earliest = min(bucket)
+            if earliest < day * width:
+                return self._pop_tick(earliest)
+
+        # Nothing within a year of the last tick: look the earliest one up.
+        return self._pop_tick(min(tick for bucket in self._buckets for tick in bucket))
+
+    def _pop_tick(self, tick) -> (int, list):
+        items = self._buckets[(tick // self._width) % len(self._buckets)].pop(tick)
+        self._last = tick
+        self._ticks -= 1
+        self._size -= len(items)
+        num_buckets = len(self._buckets)
+        if num_buckets > self.MIN_BUCKETS and self._ticks < num_buckets // 2:
+            self._resize(num_buckets // 2)
+        return tick, items
+
+    def _resize(self, num_buckets) -> None:
+        entries = [entry for bucket in self._buckets for entry in bucket.items()]
+        if len(entries) > 1:
+            # Spread the pending ticks about one per day.
+            ticks = [tick for tick, _ in entries]
+            self._width = max(1, (max(ticks) - min(ticks)) // len(entries))
+        self._buckets = [{} for _ in range(max(self.MIN_BUCKETS, num_buckets))]
+        for tick, items in entries:
+            self._buckets[(tick // self._width) % len(self._buckets)][tick] = items
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,135 @@
+"""_summary_
+@file       dependency_cache.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Tracks the outputs available on a device and the tasks waiting on
+            them.
+@version    0.0.0
+@date       2022-12-04
+"""
+
+from collections import Counter
+
+
+class DependencyCache:
+    """_summary_
+    DependencyCache replaces the plain list used as a device cache. Outputs
+    are kept as a counted multiset so that checking and consuming a task's
+    dependencies does not scan the cache. Cores whose head-of-queue task is
+    blocked are indexed by the outputs they are missing, so that an output
+    arriving on the device only wakes the cores that consume it.
+    """
+
+    def __init__(self, outputs=None) -> None:
+        self._outputs = Counter(outputs if outputs is not None else [])
+        self._waiting = {}
+
+    def fulfills(self, dependencies) -> bool:
+        """_summary_
+        Checks whether every dependency of a task is available in the cache.
+
+        Args:
+            dependencies (list(str)): Output ids the task consumes.
+
+        Returns:
+            bool: True if the task can run.
+        """
+        if len(dependencies) == 0:
+            return True
+        return self.fulfills_counts(Counter(dependencies).items())
+
+    def fulfills_counts(self, counts) -> bool:
+        """_summary_
+        Same as fulfills(), for dependencies that were counted ahead, e.g. by
+        a compiled Task.
+
+        Args:
+            counts (iterable((str, int))): Output ids the task consumes, and
+                how many of each.
+
+        Returns:
+            bool: True if the task can run.
+        """
+        for dependency, count in counts:
+            if self._outputs[dependency] < count:
+                return False
+        return True
+
+    def missing(self, dependencies) -> list:
+        """_summary_
+        Lists the dependencies of a task that are not available in the cache.
+
+        Args:
+            dependencies (list(str)): Output ids the task consumes.
+
+        Returns:
+            list(str): Output ids that are short, each listed once.
+        """
+        return [
+            dependency
+            for dependency, count in Counter(dependencies).items()
+            if self._outputs[dependency] < count
+        ]
+
+    def consume(self, dependencies) -> None:
+        for dependency in dependencies:
+            self._outputs[dependency] -= 1
+            if self._outputs[dependency] == 0:
+                del self._outputs[dependency]
+
+    def wait(self, core_id, dependencies) -> None:
+        """_summary_
+        Registers a core whose head-of-queue task is blocked under each of the
+        dependencies it is missing.
+
+        Args:
+            core_id (str): Core that is blocked.
+            dependencies (list(str)): Output ids its head task consumes.
+        """
+        self.wait_counts(core_id, Counter(dependencies).items())
+
+    def wait_counts(self, core_id, counts) -> None:
+        """_summary_
+        Same as wait(), for dependencies that were counted ahead.
+
+        Args:
+            core_id (str): Core that is blocked.
+            counts (iterable((str, int))): Output ids its head task consumes,
+                and how many of each.
+        """
+        for dependency, count in counts:
+            if self._outputs[dependency] < count:
+                self._waiting.setdefault(dependency, set()).add(core_id)
+
+    def add(self, output_id) -> set:
+        """_summary_
+        Adds an output to the cache.
+
+        Args:
+            output_id (str): Output that arrived on the device.
+
+        Returns:
+            set: Cores that were waiting on this output and should be
+                re-evaluated.
+        """
+        self._outputs[output_id] += 1
+        return self._waiting.pop(output_id, set())
+
+    def signature(self) -> tuple:
+        """_summary_
+        Returns:
+            tuple: Hashable summary of the outputs and waiting cores. Caches
+                with equal signatures behave the same from then on.
+        """
+        return (
+            tuple(sorted(self._outputs.items())),
+            tuple(
+                (output_id, tuple(sorted(cores)))
+                for output_id, cores in sorted(self._waiting.items())
+            ),
+        )
+
+    def to_list(self) -> list:
+        return list(self._outputs.elements())
+
+    def __len__(self) -> int:
+        return sum(self._outputs.values())
@@ -0,0 +1,248 @@
+"""_summary_
+@file       device_components.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Splits a fleet into independent groups of devices and merges their
+            event timelines.
+@version    0.0.0
+@date       2022-12-17
+"""
+
+import bisect
+
+import numpy as np
+
+from event_timeline import get_ranges
+
+
+def get_components(devices) -> list:
+    """_summary_
+    Partitions the devices into the connected components of the output graph:
+    two devices are connected if a task of one sends an output to the other.
+    Devices of different components never exchange outputs, so each component
+    can be simulated on its own.
+
+    Args:
+        devices (dict): Devices of the application model.
+
+    Returns:
+        list(list(str)): Device ids of each component, in device order. The
+            components are ordered by their first device.
+    """
+    parents = {device_id: device_id for device_id in devices}
+
+    def find(device_id):
+        while parents[device_id] != device_id:
+            parents[device_id] = parents[parents[device_id]]
+            device_id = parents[device_id]
+        return device_id
+
+    for device_id, device in devices.items():
+        for core in device["schedule"].values():
+            # Tasks of a periodic schedule are shared by all of its iterations.
+            for task in getattr(core, "period", core):
+                for output_targets in task["outputs"].values():
+                    for output_target in output_targets:
+                        # Unknown targets are left for the engine to report.
+                        if output_target in parents:
+                            parents[find(output_target)] = find(device_id)
+
+    components = {}
+    for device_id in devices:
+        components.setdefault(find(device_id), []).append(device_id)
+    return list(components.values())
+
+
+def get_boundary_device(boundaries) -> dict:
+    """_summary_
+    Builds a device whose one core runs a task from each boundary to the next,
+    so that a timeline simulated along with it ends an entry at every
+    boundary. The tasks take whole ticks of the calendar engine, and exact
+    times at a frequency of 1 if the boundaries are whole numbers.
+
+    Args:
+        boundaries (list(float)): Increasing times after 0.
+
+    Returns:
+        dict: The device, with no outputs and no hardware.
+    """
+    schedule = []
+    previous = 0
+    for idx, boundary in enumerate(boundaries):
+        schedule.append(
+            {
+                "task_name": f"boundary_{idx}",
+                "duration": boundary - previous,
+                "dependencies": [],
+                "outputs": {},
+                "hw": [],
+            }
+        )
+        previous = boundary
+    return {"cores": {"core_0": {"frequency": 1}}, "schedule": {"core_0": schedule}}
+
+
+def merge_timelines(
+    event_timeline, timelines, ends, done, idle_devices, coupled=None, until=None
+) -> None:
+    """_summary_
+    Merges the event timelines of independent components by timestamp and
+    appends the result to event_timeline. Every timeline starts at 0 and its
+    entries are contiguous; an entry of the merged timeline ends whenever an
+    entry of any component ends, so an entry of a component may be split over
+    several merged entries. Each merged entry lists the devices of every
+    component, and the outputs of the component entries that end with it.
+
+    Outputs are listed in the order a single run completes their tasks. For
+    devices that run one task at a time, that is by the time the task started,
+    then by device. A device running several tasks at once is listed earlier
+    if one of them ended since both devices were busy, which only the coupled
+    component may have.
+
+    Args:
+        event_timeline (EventTimeline): Timeline to append the entries to.
+        timelines (list(EventTimeline)): Event timeline of each component. An
+            entry listing its idle devices is appended to each.
+        ends (list(np.ndarray)): End of each entry of each timeline.
+        done (list((np.ndarray, np.ndarray))): Device (index in device order)
+            and start time of the task behind each output group of each
+            timeline.
+        idle_devices (list(list(str))): Devices of each component to list as
+            idle once its timeline has ended.
+        coupled (int, optional): Component whose timeline also ends an entry
+            wherever another timeline does, since it was simulated along with
+            their boundaries. Defaults to None.
+        until (float, optional): Drop the merged entries that end after this
+            time. Defaults to None.
+    """
+    times = [timeline.entry_times() for timeline in timelines]
+    if coupled is not None:
+        timestamps, durations = times[coupled]
+        stops = ends[coupled]
+    else:
+        stops = np.unique(np.concatenate(ends))
+        timestamps = np.concatenate([[0.0], stops[:-1]])[: len(stops)]
+        durations = (stops - timestamps).tolist()
+        timestamps = timestamps.tolist()
+        # Calendar ticks of a whole tick are kept as ints, as in a single run.
+        if all(
+            isinstance(duration, int) for _, entries in times for duration in entries
+        ):
+            timestamps = [int(timestamp) for timestamp in timestamps]
+            durations = [int(duration) for duration in durations]
+        if len(timestamps) > 0:
+            timestamps[0] = 0
+    length = len(stops)
+    if until is not None:
+        length = int(np.searchsorted(stops, until, side="right"))
+    stops = stops[:length]
+    timestamps = timestamps[:length]
+    durations = durations[:length]
+    starts = np.array(timestamps, dtype=np.float64)
+
+    for timeline, devices in zip(timelines, idle_devices):
+        timeline.append(
+            {
+                "timestamp": 0,
+                "duration": 0,
+                "devices": {
+                    device_id: {"cores": {}, "hw": []} for device_id in devices
+                },
+                "cache": [],
+            }
+        )
+
+    # Entry of each timeline listed by each merged entry, and the output groups
+    # of the entries that end with it.
+    steps = np.zeros((length, len(timelines)), dtype=np.int64)
+    groups = [[], [], [], [], []]
+    for idx, timeline in enumerate(timelines):
+        count = len(timeline) - 1
+        if count == 0:
+            continue
+        if idx == coupled:
+            step = np.arange(length)
+        else:
+            step = np.searchsorted(timeline.timestamp[:count], starts, side="right")
+            step = np.where(starts < ends[idx][-1], step - 1, count)
+        steps[:, idx] = step
+        entries = np.flatnonzero(
+            (step < count) & (ends[idx][np.minimum(step, count - 1)] == stops)
+        )
+        offsets = timeline.entry_group_offsets
+        firsts = offsets[step[entries]]
+        counts = offsets[step[entries] + 1] - firsts
+        rows = get_ranges(firsts, counts)
+        groups[0].append(np.repeat(entries, counts))
+        groups[1].append(np.full(len(rows), idx))
+        groups[2].append(rows)
+        groups[3].append(done[idx][0][rows])
+        groups[4].append(done[idx][1][rows])
+    group_entry, group_timeline, group, device, start = [
+        np.concatenate(column) if len(column) > 0 else np.zeros(0, np.int64)
+        for column in groups
+    ]
+    order = np.lexsort((np.arange(len(group)), device, start, group_entry))
+
+    if coupled is not None:
+        _order_coupled(
+            order, group_entry, group_timeline, device, start, starts, stops, coupled
+        )
+
+    event_timeline.extend(
+        timelines,
+        steps,
+        (timestamps, durations),
+        (group_entry[order], group_timeline[order], group[order]),
+    )
+
+
+def _order_coupled(
+    order, group_entry, group_timeline, device, start, starts, stops, coupled
+) -> None:
+    """_summary_
+    Reorders the output groups of the merged entries in which a device of the
+    coupled component completes a task after another of its tasks ended. Its
+    outputs keep the order of the coupled run, and are merged with the
+    outputs of the other components: a single run lists a device that is
+    still busy with earlier tasks first, at the first entry since both
+    devices were busy at which only one of them had finished a task.
+    """
+    # Ends of the tasks of each busy period of a coupled device.
+    rows = np.flatnonzero(group_timeline == coupled)
+    dues = {}
+    for row in rows.tolist():
+        key = (int(device[row]), float(start[row]))
+        dues.setdefault(key, []).append(float(stops[group_entry[row]]))
+    entries = sorted(
+        {
+            int(group_entry[row])
+            for row in rows.tolist()
+            if dues[(int(device[row]), float(start[row]))][0] < stops[group_entry[row]]
+        }
+    )
+
+    def is_first(row, other) -> bool:
+        # Whether the coupled row comes before the row of another component.
+        timestamp = starts[group_entry[row]]
+        busy = max(start[row], start[other])
+        ended = dues[(int(device[row]), float(start[row]))]
+        ended = ended[: bisect.bisect_right(ended, timestamp)]
+        if len(ended) > 0 and ended[-1] > busy:
+            if starts[np.searchsorted(starts, busy, side="right")] < ended[-1]:
+                return True
+        return (start[row], device[row]) < (start[other], device[other])
+
+    sorted_entry = group_entry[order]
+    for entry in entries:
+        first = np.searchsorted(sorted_entry, entry, side="left")
+        last = np.searchsorted(sorted_entry, entry, side="right")
+        block = order[first:last]
+        own = sorted(row for row in block.tolist() if group_timeline[row] == coupled)
+        others = [row for row in block.tolist() if group_timeline[row] != coupled]
+        merged = []
+        while len(own) > 0 and len(others) > 0:
+            if is_first(own[0], others[0]):
+                merged.append(own.pop(0))
+            else:
+                merged.append(others.pop(0))
+        order[first:last] = merged + own + others
@@ -0,0 +1,145 @@
+"""_summary_
+@file       device_records.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Validates device dicts and compiles them into records for the
+            application model engines.
+@version    0.0.0
+@date       2022-12-19
+"""
+
+from collections import Counter
+from numbers import Number
+
+from periodic_schedule import PeriodicSchedule
+
+TASK_FIELDS = ["task_name", "duration", "dependencies", "outputs", "hw"]
+
+
+class Task:
+    """_summary_
+    Task is the compiled form of a task dict. Outputs are referred to by their
+    index in the model's SymbolTable, and dependencies are pre-counted, so that
+    the engines never build or look up a dict for a task. The original outputs
+    dict and hw list are kept as is, since the event timeline lists them.
+
+    Records save lookups, not memory: the model keeps the device dicts for
+    get_devices(), schedule edits, stall reports and checkpoints, and a task
+    record adds about 300 bytes to the 650 or so of its dict.
+    """
+
+    __slots__ = (
+        "name",
+        "duration",
+        "dependencies",
+        "needs",
+        "sends",
+        "outputs",
+        "hw",
+    )
+
+    def __init__(self, task, symbols) -> None:
+        intern = symbols.intern
+        self.name = task["task_name"]
+        self.duration = task["duration"]
+        # Output indices in dependency order, and (output, count) pairs.
+        self.dependencies = tuple(map(intern, task["dependencies"]))
+        if len(self.dependencies) < 2:
+            self.needs = tuple((output, 1) for output in self.dependencies)
+        else:
+            self.needs = tuple(Counter(self.dependencies).items())
+        # (target device id, output) of each copy sent, in output order.
+        sends = []
+        for output_id, output_targets in task["outputs"].items():
+            output = intern(output_id)
+            for output_target in output_targets:
+                sends.append((output_target, output))
+        self.sends = tuple(sends)
+        self.outputs = task["outputs"]
+        self.hw = task["hw"]
+
+
+class Core:
+    """_summary_
+    Core is the compiled form of a scheduled core: its frequency and its
+    tasks, as a list of Task or a PeriodicSchedule of Task.
+    """
+
+    __slots__ = ("id", "frequency", "tasks")
+
+    def __init__(self, core_id, frequency, tasks) -> None:
+        self.id = core_id
+        self.frequency = frequency
+        self.tasks = tasks
+
+
+class Device:
+    """_summary_
+    Device is the compiled form of a device dict: its scheduled cores, in
+    schedule order, and the outputs in its cache from the start.
+    """
+
+    __slots__ = ("cores", "cache")
+
+    def __init__(self, cores, cache) -> None:
+        self.cores = cores
+        self.cache = cache
+
+
+def validate_device(device_name, device) -> None:
+    """_summary_
+    Checks that a device dict has the fields the application models read.
+
+    Args:
+        device_name (str): Name the device is added under.
+        device (dict): Device to check.
+    """
+    for field in ["cores", "schedule"]:
+        if not isinstance(device.get(field), dict):
+            raise Exception(f"Device {device_name} has no {field} dict.")
+    if not isinstance(device.get("cache", []), list):
+        raise Exception(f"The cache of device {device_name} is not a list.")
+
+    for core_id, core in device["schedule"].items():
+        frequency = device["cores"].get(core_id, {}).get("frequency")
+        if not isinstance(frequency, Number) or frequency <= 0:
+            raise Exception(
+                f"Core {core_id} of device {device_name} has no positive frequency."
+            )
+        for task in getattr(core, "period", core):
+            missing = [field for field in TASK_FIELDS if field not in task]
+            if len(missing) > 0:
+                raise Exception(
+                    f"A task of {device_name} {core_id} has no {', '.join(missing)}."
+                )
+            if not isinstance(task["duration"], Number) or task["duration"] < 0:
+                raise Exception(
+                    f"Task {task['task_name']} of {device_name} has a negative or "
+                    "non-numeric duration."
+                )
+            if not isinstance(task["outputs"], dict):
+                raise Exception(
+                    f"The outputs of task {task['task_name']} of {device_name} are "
+                    "not a dict."
+                )
+
+
+def compile_device(device, symbols) -> Device:
+    """_summary_
+    Args:
+        device (dict): Device to compile, validated by validate_device.
+        symbols (SymbolTable): Output ids of the model.
+
+    Returns:
+        Device: The compiled device.
+    """
+    cores = []
+    for core_id, core in device["schedule"].items():
+        # A periodic schedule is compiled once per period, not per iteration.
+        tasks = [Task(task, symbols) for task in getattr(core, "period", core)]
+        if hasattr(core, "period"):
+            tasks = PeriodicSchedule(tasks, core.iterations)
+        frequency = device["cores"][core_id]["frequency"]
+        cores.append(Core(core_id, frequency, tasks))
+
+    cache = [symbols.intern(output_id) for output_id in device.get("cache", [])]
+    return Device(cores, cache)
@@ -0,0 +1,560 @@
+"""_summary_
+@file       event_timeline.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Compact, columnar storage for application model event timelines.
+@version    0.0.0
+@date       2022-12-05
+"""
+
+import hashlib
+from array import array
+
+import numpy as np
+
+
+def get_ranges(firsts, counts) -> np.ndarray:
+    """_summary_
+    Concatenates range(first, first + count) for each first and count, e.g.
+    to gather the rows that several offsets delimit.
+
+    Args:
+        firsts (np.ndarray): First value of each range.
+        counts (np.ndarray): Length of each range.
+
+    Returns:
+        np.ndarray: Values of every range, in order.
+    """
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) > 0 else 0
+    return np.repeat(firsts - ends + counts, counts) + np.arange(total)
+
+
+def _extend_column(column, values) -> None:
+    column.frombytes(np.ascontiguousarray(values, dtype=column.typecode).tobytes())
+
+
+class SymbolTable:
+    """_summary_
+    Interns the device, core, task, hardware and output names used in a
+    timeline so that each name is stored once and referred to by index.
+    """
+
+    def __init__(self) -> None:
+        self.names = []
+        self._indices = {}
+
+    def intern(self, name) -> int:
+        idx = self._indices.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self._indices[name] = idx
+            self.names.append(name)
+        return idx
+
+    def index(self, name) -> int:
+        """_summary_
+        Looks up the index of a name without interning it.
+
+        Returns:
+            int: Index of the name, or -1 if it never appeared.
+        """
+        return self._indices.get(name, -1)
+
+    def __getitem__(self, idx) -> str:
+        return self.names[idx]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class EventTimeline:
+    """_summary_
+    EventTimeline stores the event timeline generated by an application model
+    as parallel arrays instead of a list of nested dicts. Timeline entries keep
+    their usual shape:
+    {
+        "timestamp": 0,
+        "duration": 1,
+        "devices": {
+            "device_0": {"cores": {"core_0": "task_A"}, "hw": ["adc_0"]}, ...
+        },
+        "cache": [{"output_0": ["device_0"]}, ... ],
+    }
+    and are rebuilt on demand when the timeline is indexed or iterated.
+
+    The arrays are grouped into row tables, each ordered by entry:
+    - entries: timestamp, duration.
+    - devices: one row per device listed in an entry (entry, device).
+    - tasks: one row per running core (entry, device, core, task).
+    - hw: one row per hardware use (entry, device, hw).
+    - outputs: one row per output in the entry cache (entry, output).
+    Every name is an index into `symbols`. The *_offsets arrays delimit the rows
+    that belong to each entry, device row or output row.
+    """
+
+    def __init__(self) -> None:
+        self.symbols = SymbolTable()
+
+        # Entries. Flags remember whether timestamp (bit 0) and duration
+        # (bit 1) were ints so that entries round trip unchanged.
+        self._timestamp = array("d")
+        self._duration = array("d")
+        self._flags = array("B")
+        self._entry_devices = array("q", [0])
+        self._entry_groups = array("q", [0])
+
+        # Devices listed in each entry.
+        self._device_entry = array("q")
+        self._device = array("i")
+        self._device_tasks = array("q", [0])
+        self._device_hw = array("q", [0])
+
+        # Cores running a task in each entry.
+        self._task_entry = array("q")
+        self._task_device = array("i")
+        self._task_core = array("i")
+        self._task = array("i")
+
+        # Hardware used in each entry.
+        self._hw_entry = array("q")
+        self._hw_device = array("i")
+        self._hw = array("i")
+
+        # Entry cache: a list of output groups, each mapping outputs to their
+        # target devices.
+        self._group_outputs = array("q", [0])
+        self._output_entry = array("q")
+        self._output = array("i")
+        self._output_targets = array("q", [0])
+        self._target = array("i")
+
+        # NumPy copies of the columns, made on first access.
+        self._arrays = {}
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_arrays"]
+        return state
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self._arrays = {}
+
+    def append(self, entry) -> None:
+        idx = len(self._timestamp)
+        self._arrays.clear()
+        intern = self.symbols.intern
+
+        self._timestamp.append(entry["timestamp"])
+        self._duration.append(entry["duration"])
+        self._flags.append(
+            int(isinstance(entry["timestamp"], int))
+            | int(isinstance(entry["duration"], int)) << 1
+        )
+
+        for device_id, device in entry["devices"].items():
+            device_idx = intern(device_id)
+            self._device_entry.append(idx)
+            self._device.append(device_idx)
+            for core_id, task_name in device["cores"].items():
+                self._task_entry.append(idx)
+                self._task_device.append(device_idx)
+                self._task_core.append(intern(core_id))
+                self._task.append(intern(task_name))
+            for hw_id in device["hw"]:
+                self._hw_entry.append(idx)
+                self._hw_device.append(device_idx)
+                self._hw.append(intern(hw_id))
+            self._device_tasks.append(len(self._task))
+            self._device_hw.append(len(self._hw))
+        self._entry_devices.append(len(self._device))
+
+        for outputs in entry["cache"]:
+            for output_id, output_targets in outputs.items():
+                self._output_entry.append(idx)
+                self._output.append(intern(output_id))
+                for output_target in output_targets:
+                    self._target.append(intern(output_target))
+                self._output_targets.append(len(self._target))
+            self._group_outputs.append(len(self._output))
+        self._entry_groups.append(len(self._group_outputs) - 1)
+
+    def extend(self, timelines, steps, times, groups) -> None:
+        """_summary_
+        Appends entries assembled from the rows of other event timelines, e.g.
+        to merge the timelines of groups of devices that were simulated on
+        their own. Each new entry lists the devices of one entry of every
+        timeline, then the output groups it is given.
+
+        Args:
+            timelines (list(EventTimeline)): Timelines to copy rows from.
+            steps (np.ndarray): Entry of each timeline whose devices each new
+                entry lists (new entries x timelines).
+            times ((list, list)): Timestamp and duration of each new entry,
+                as Python numbers.
+            groups ((np.ndarray, np.ndarray, np.ndarray)): New entry, timeline
+                and index in that timeline of each output group to copy,
+                ordered by new entry.
+        """
+        length = len(self)
+        entries = len(times[0])
+        self._arrays.clear()
+        symbols = [
+            np.array(
+                [self.symbols.intern(name) for name in timeline.symbols.names],
+                dtype=np.int32,
+            )
+            for timeline in timelines
+        ]
+
+        def concatenate(columns) -> np.ndarray:
+            return np.concatenate(columns) if len(columns) > 0 else np.zeros(0, int)
+
+        def get_bases(sizes) -> np.ndarray:
+            return np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+        # Rows of every timeline, one after the other. Offsets are split into
+        # the first row and the number of rows they delimit.
+        device_bases = get_bases([len(timeline._device) for timeline in timelines])
+        task_bases = get_bases([len(timeline._task) for timeline in timelines])
+        hw_bases = get_bases([len(timeline._hw) for timeline in timelines])
+        output_bases = get_bases([len(timeline._output) for timeline in timelines])
+        target_bases = get_bases([len(timeline._target) for timeline in timelines])
+        group_bases = get_bases(
+            [len(timeline._group_outputs) - 1 for timeline in timelines]
+        )
+        devices, device_tasks, device_hw = [], [], []
+        tasks, task_cores, hw = [], [], []
+        group_outputs, outputs, output_targets, targets = [], [], [], []
+        for idx, timeline in enumerate(timelines):
+            devices.append(symbols[idx][timeline.device])
+            device_tasks.append(timeline.device_task_offsets + task_bases[idx])
+            device_hw.append(timeline.device_hw_offsets + hw_bases[idx])
+            tasks.append(symbols[idx][timeline.task])
+            task_cores.append(symbols[idx][timeline.task_core])
+            hw.append(symbols[idx][timeline.hw])
+            group_outputs.append(timeline.group_output_offsets + output_bases[idx])
+            outputs.append(symbols[idx][timeline.output])
+            output_targets.append(timeline.output_target_offsets + target_bases[idx])
+            targets.append(symbols[idx][timeline.target])
+
+        def split(offsets) -> (np.ndarray, np.ndarray):
+            firsts = concatenate([column[:-1] for column in offsets])
+            counts = concatenate([np.diff(column) for column in offsets])
+            return firsts, counts
+
+        device_tasks = split(device_tasks)
+        device_hw = split(device_hw)
+        group_outputs = split(group_outputs)
+        output_targets = split(output_targets)
+
+        # Devices of the listed entry of each timeline, entry by entry.
+        firsts = np.zeros(steps.shape, dtype=np.int64)
+        counts = np.zeros(steps.shape, dtype=np.int64)
+        for idx, timeline in enumerate(timelines):
+            offsets = timeline.entry_device_offsets
+            firsts[:, idx] = offsets[steps[:, idx]] + device_bases[idx]
+            counts[:, idx] = offsets[steps[:, idx] + 1] - offsets[steps[:, idx]]
+        entry_devices = counts.sum(axis=1)
+        rows = get_ranges(firsts.ravel(), counts.ravel())
+        device_entry = np.repeat(np.arange(length, length + entries), entry_devices)
+        device = concatenate(devices)[rows]
+        task_counts = device_tasks[1][rows]
+        task_rows = get_ranges(device_tasks[0][rows], task_counts)
+        hw_counts = device_hw[1][rows]
+        hw_rows = get_ranges(device_hw[0][rows], hw_counts)
+
+        group_entry, group_timeline, group = groups
+        group = group_bases[group_timeline] + group
+        output_counts = group_outputs[1][group]
+        output_rows = get_ranges(group_outputs[0][group], output_counts)
+        target_counts = output_targets[1][output_rows]
+        target_rows = get_ranges(output_targets[0][output_rows], target_counts)
+
+        timestamps, durations = times
+        _extend_column(self._timestamp, timestamps)
+        _extend_column(self._duration, durations)
+        _extend_column(
+            self._flags,
+            [
+                int(isinstance(timestamp, int)) | int(isinstance(duration, int)) << 1
+                for timestamp, duration in zip(timestamps, durations)
+            ],
+        )
+        _extend_column(
+            self._entry_devices, len(self._device) + np.cumsum(entry_devices)
+        )
+        _extend_column(
+            self._entry_groups,
+            len(self._group_outputs)
+            - 1
+            + np.cumsum(np.bincount(group_entry, minlength=entries)),
+        )
+
+        _extend_column(self._device_tasks, len(self._task) + np.cumsum(task_counts))
+        _extend_column(self._device_hw, len(self._hw) + np.cumsum(hw_counts))
+        _extend_column(self._device_entry, device_entry)
+        _extend_column(self._device, device)
+
+        _extend_column(self._task_entry, np.repeat(device_entry, task_counts))
+        _extend_column(self._task_device, np.repeat(device, task_counts))
+        _extend_column(self._task_core, concatenate(task_cores)[task_rows])
+        _extend_column(self._task, concatenate(tasks)[task_rows])
+
+        _extend_column(self._hw_entry, np.repeat(device_entry, hw_counts))
+        _extend_column(self._hw_device, np.repeat(device, hw_counts))
+        _extend_column(self._hw, concatenate(hw)[hw_rows])
+
+        _extend_column(
+            self._group_outputs, len(self._output) + np.cumsum(output_counts)
+        )
+        _extend_column(
+            self._output_entry, np.repeat(group_entry + length, output_counts)
+        )
+        _extend_column(self._output, concatenate(outputs)[output_rows])
+        _extend_column(
+            self._output_targets, len(self._target) + np.cumsum(target_counts)
+        )
+        _extend_column(self._target, concatenate(targets)[target_rows])
+
+    def truncate(self, length) -> None:
+        """_summary_
+        Drops every entry from index length on. Names stay interned.
+
+        Args:
+            length (int): Number of entries to keep.
+        """
+        if length >= len(self):
+            return
+        self._arrays.clear()
+        devices = self._entry_devices[length]
+        groups = self._entry_groups[length]
+        outputs = self._group_outputs[groups]
+        tasks = self._device_tasks[devices]
+        hw = self._device_hw[devices]
+        targets = self._output_targets[outputs]
+
+        for column, size in [
+            (self._timestamp, length),
+            (self._duration, length),
+            (self._flags, length),
+            (self._entry_devices, length + 1),
+            (self._entry_groups, length + 1),
+            (self._device_entry, devices),
+            (self._device, devices),
+            (self._device_tasks, devices + 1),
+            (self._device_hw, devices + 1),
+            (self._task_entry, tasks),
+            (self._task_device, tasks),
+            (self._task_core, tasks),
+            (self._task, tasks),
+            (self._hw_entry, hw),
+            (self._hw_device, hw),
+            (self._hw, hw),
+            (self._group_outputs, groups + 1),
+            (self._output_entry, outputs),
+            (self._output, outputs),
+            (self._output_targets, outputs + 1),
+            (self._target, targets),
+        ]:
+            del column[size:]
+
+    def __len__(self) -> int:
+        return len(self._timestamp)
+
+    def __getitem__(self, step) -> dict:
+        if step < 0:
+            step += len(self)
+        if step < 0 or step >= len(self):
+            raise IndexError("event timeline index out of range")
+
+        names = self.symbols.names
+        flags = self._flags[step]
+        entry = {
+            "timestamp": self._timestamp[step],
+            "duration": self._duration[step],
+            "devices": {},
+            "cache": [],
+        }
+        if flags & 1:
+            entry["timestamp"] = int(entry["timestamp"])
+        if flags & 2:
+            entry["duration"] = int(entry["duration"])
+
+        for row in range(self._entry_devices[step], self._entry_devices[step + 1]):
+            cores = {}
+            for task_row in range(self._device_tasks[row], self._device_tasks[row + 1]):
+                cores[names[self._task_core[task_row]]] = names[self._task[task_row]]
+            entry["devices"][names[self._device[row]]] = {
+                "cores": cores,
+                "hw": [
+                    names[self._hw[hw_row]]
+                    for hw_row in range(self._device_hw[row], self._device_hw[row + 1])
+                ],
+            }
+
+        for group in range(self._entry_groups[step], self._entry_groups[step + 1]):
+            outputs = {}
+            for row in range(
+                self._group_outputs[group], self._group_outputs[group + 1]
+            ):
+                outputs[names[self._output[row]]] = [
+                    names[self._target[target_row]]
+                    for target_row in range(
+                        self._output_targets[row], self._output_targets[row + 1]
+                    )
+                ]
+            entry["cache"].append(outputs)
+
+        return entry
+
+    def __iter__(self):
+        for step in range(len(self)):
+            yield self[step]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (EventTimeline, list)):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def to_list(self) -> list:
+        return list(self)
+
+    def entry_times(self) -> (list, list):
+        """_summary_
+        Returns the entry timestamps and durations as Python numbers, with the
+        same int or float types as the original entries.
+        """
+        timestamps = self._timestamp.tolist()
+        durations = self._duration.tolist()
+        for step, flags in enumerate(self._flags):
+            if flags & 1:
+                timestamps[step] = int(timestamps[step])
+            if flags & 2:
+                durations[step] = int(durations[step])
+        return timestamps, durations
+
+    def digest(self) -> str:
+        """_summary_
+        Hashes the contents of the timeline without expanding its entries, e.g.
+        to key results derived from it.
+
+        Returns:
+            str: Hex digest of the columns and names.
+        """
+        digest = hashlib.sha256()
+        for column in [
+            self._timestamp,
+            self._duration,
+            self._flags,
+            self._entry_devices,
+            self._entry_groups,
+            self._device,
+            self._device_tasks,
+            self._device_hw,
+            self._task_core,
+            self._task,
+            self._hw,
+            self._group_outputs,
+            self._output,
+            self._output_targets,
+            self._target,
+        ]:
+            digest.update(column.tobytes())
+            digest.update(b"|")
+        digest.update(repr(self.symbols.names).encode())
+        return digest.hexdigest()
+
+    # NumPy views of the columns. The arrays cannot share memory with the
+    # columns, which could then no longer grow, so each column is copied once
+    # and the copy is kept, read only, until the timeline changes.
+
+    def _get_array(self, name, dtype) -> np.ndarray:
+        column = self._arrays.get(name)
+        if column is None:
+            column = np.array(getattr(self, name), dtype=dtype)
+            column.flags.writeable = False
+            self._arrays[name] = column
+        return column
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._get_array("_timestamp", np.float64)
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self._get_array("_duration", np.float64)
+
+    @property
+    def entry_device_offsets(self) -> np.ndarray:
+        return self._get_array("_entry_devices", np.int64)
+
+    @property
+    def entry_group_offsets(self) -> np.ndarray:
+        return self._get_array("_entry_groups", np.int64)
+
+    @property
+    def device_entry(self) -> np.ndarray:
+        return self._get_array("_device_entry", np.int64)
+
+    @property
+    def device(self) -> np.ndarray:
+        return self._get_array("_device", np.int32)
+
+    @property
+    def device_task_offsets(self) -> np.ndarray:
+        return self._get_array("_device_tasks", np.int64)
+
+    @property
+    def device_hw_offsets(self) -> np.ndarray:
+        return self._get_array("_device_hw", np.int64)
+
+    @property
+    def task_entry(self) -> np.ndarray:
+        return self._get_array("_task_entry", np.int64)
+
+    @property
+    def task_device(self) -> np.ndarray:
+        return self._get_array("_task_device", np.int32)
+
+    @property
+    def task_core(self) -> np.ndarray:
+        return self._get_array("_task_core", np.int32)
+
+    @property
+    def task(self) -> np.ndarray:
+        return self._get_array("_task", np.int32)
+
+    @property
+    def hw_entry(self) -> np.ndarray:
+        return self._get_array("_hw_entry", np.int64)
+
+    @property
+    def hw_device(self) -> np.ndarray:
+        return self._get_array("_hw_device", np.int32)
+
+    @property
+    def hw(self) -> np.ndarray:
+        return self._get_array("_hw", np.int32)
+
+    @property
+    def group_output_offsets(self) -> np.ndarray:
+        return self._get_array("_group_outputs", np.int64)
+
+    @property
+    def output_entry(self) -> np.ndarray:
+        return self._get_array("_output_entry", np.int64)
+
+    @property
+    def output(self) -> np.ndarray:
+        return self._get_array("_output", np.int32)
+
+    @property
+    def output_target_offsets(self) -> np.ndarray:
+        return self._get_array("_output_targets", np.int64)
+
+    @property
+    def target(self) -> np.ndarray:
+        return self._get_array("_target", np.int32)
@@ -0,0 +1,57 @@
+"""_summary_
+@file       periodic_schedule.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Core schedule that repeats the same task sequence.
+@version    0.0.0
+@date       2022-12-15
+"""
+
+import itertools
+
+
+class PeriodicSchedule:
+    """_summary_
+    PeriodicSchedule stands in for the task list of a core whose tasks repeat
+    the same sequence (the period) a number of times, without unrolling it:
+    device["schedule"]["core_0"] = PeriodicSchedule([task_A, task_B], 1000)
+
+    It reads like the unrolled list (len, indexing, slicing and iteration);
+    every iteration returns the same task dicts, so editing a task of the
+    period edits all of its iterations. Consumers that need to tell it apart
+    from a plain list look for the `period` attribute.
+    """
+
+    def __init__(self, period, iterations) -> None:
+        """_summary_
+        Args:
+            period (list(dict)): Tasks of one iteration, in order.
+            iterations (int): Number of times the period runs.
+        """
+        self.period = period
+        self.iterations = iterations
+
+    def __len__(self) -> int:
+        return len(self.period) * self.iterations
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError("schedule index out of range")
+        return self.period[idx % len(self.period)]
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(
+            itertools.repeat(self.period, self.iterations)
+        )
+
+    def __eq__(self, other) -> bool:
+        if not hasattr(other, "period"):
+            return NotImplemented
+        return self.period == other.period and self.iterations == other.iterations
+
+    def __repr__(self) -> str:
+        # Also the form result cache keys see.
+        return f"PeriodicSchedule({self.period!r}, {self.iterations})"
@@ -0,0 +1,168 @@
+"""_summary_
+@file       schedule_graph.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Estimates the makespan, critical path and slack of a schedule
+            without simulating it.
+@version    0.0.0
+@date       2022-12-14
+"""
+
+
+class ScheduleGraph:
+    """_summary_
+    ScheduleGraph compiles the device schedules into a DAG of tasks. A task
+    depends on the previous task of its core and on the tasks producing its
+    dependencies, and takes duration / frequency, as in ApplicationModel_V0_1.
+    Earliest start times, the makespan, latest start times and slack then
+    follow from one forward and one backward pass in topological order, in
+    time linear in the number of tasks and edges.
+
+    Each copy of an output sent to a device is consumed once. The n-th task of
+    a device that depends on an output (in core order, then schedule order)
+    consumes the n-th copy of it: first those of the initial device cache,
+    then those sent by producers, in the same order.
+
+    Every task starts as soon as its predecessors finish. This is what V0_1
+    does for devices with a single core; it discards tasks that start while
+    another core of the device is busy, which the graph does not model.
+    """
+
+    def __init__(self, devices) -> None:
+        """_summary_
+        Args:
+            devices (dict): Devices of the application model.
+        """
+        # Tasks are numbered in device, core and schedule order, so the next
+        # task of a core is the next node unless the core ends there.
+        self._tasks = []
+        durations = []
+        core_ends = {-1}
+        for device_id, device in devices.items():
+            for core_id, core in device["schedule"].items():
+                frequency = device["cores"][core_id]["frequency"]
+                # A PeriodicSchedule is compiled once per period and repeated.
+                period = getattr(core, "period", core)
+                repeats = len(core) // len(period) if len(period) > 0 else 0
+                self._tasks.extend(
+                    [(device_id, core_id, task) for task in period] * repeats
+                )
+                durations.extend(
+                    [task["duration"] / frequency for task in period] * repeats
+                )
+                core_ends.add(len(self._tasks) - 1)
+        num_tasks = len(self._tasks)
+
+        # Copies of each output sent to each device: None for the ones in the
+        # device cache from the start, else the producing task.
+        copies = {device_id: {} for device_id in devices}
+        for device_id, device in devices.items():
+            for output_id in device.get("cache", []):
+                copies[device_id].setdefault(output_id, []).append(None)
+        for node, (_, _, task) in enumerate(self._tasks):
+            for output_id, output_targets in task["outputs"].items():
+                for output_target in output_targets:
+                    copies[output_target].setdefault(output_id, []).append(node)
+        # Copies are consumed in order, from the end of the lists.
+        for device_copies in copies.values():
+            for producers in device_copies.values():
+                producers.reverse()
+
+        # Data edges, and the number of predecessors of each task.
+        successors = [[] for _ in range(num_tasks)]
+        predecessors = [0 if node - 1 in core_ends else 1 for node in range(num_tasks)]
+        for node, (device_id, _, task) in enumerate(self._tasks):
+            device_copies = copies[device_id]
+            for output_id in task["dependencies"]:
+                producers = device_copies.get(output_id)
+                if not producers:
+                    raise Exception(
+                        f"Task {task['task_name']} on {device_id} depends on "
+                        f"{output_id}, which is never sent to it."
+                    )
+                producer = producers.pop()
+                if producer is not None:
+                    successors[producer].append(node)
+                    predecessors[node] += 1
+
+        # Forward pass in topological order (Kahn): earliest start and finish,
+        # and the predecessor that finishes last.
+        self._start = [0.0] * num_tasks
+        self._finish = [0.0] * num_tasks
+        self._critical = [None] * num_tasks
+        order = [node for node in range(num_tasks) if predecessors[node] == 0]
+        for node in order:
+            finish = self._start[node] + durations[node]
+            self._finish[node] = finish
+            nodes = successors[node]
+            if node not in core_ends:
+                nodes = nodes + [node + 1]
+            for successor in nodes:
+                if self._critical[successor] is None or finish > self._start[successor]:
+                    self._start[successor] = finish
+                    self._critical[successor] = node
+                predecessors[successor] -= 1
+                if predecessors[successor] == 0:
+                    order.append(successor)
+        if len(order) < num_tasks:
+            raise Exception("The schedule deadlocks: its tasks wait on each other.")
+        self._makespan = max(self._finish, default=0.0)
+
+        # Backward pass: latest start that does not delay the makespan.
+        self._latest_start = [0.0] * num_tasks
+        for node in reversed(order):
+            latest_finish = self._makespan
+            if node not in core_ends:
+                latest_finish = self._latest_start[node + 1]
+            for successor in successors[node]:
+                latest_finish = min(latest_finish, self._latest_start[successor])
+            self._latest_start[node] = latest_finish - durations[node]
+
+    def _get_task(self, node) -> dict:
+        device_id, core_id, task = self._tasks[node]
+        return {
+            "device_id": device_id,
+            "core_id": core_id,
+            "task_name": task["task_name"],
+            "start": self._start[node],
+            "finish": self._finish[node],
+            "slack": self._latest_start[node] - self._start[node],
+        }
+
+    def get_makespan(self) -> float:
+        """_summary_
+        Returns:
+            float: Finish time of the last task, 0 for an empty schedule.
+        """
+        return self._makespan
+
+    def get_tasks(self) -> list:
+        """_summary_
+        Returns:
+            list(dict): Every task in device, core and schedule order:
+                {
+                    "device_id": "device_0",
+                    "core_id": "core_0",
+                    "task_name": "task_A",
+                    "start": 0.0,   <- earliest start
+                    "finish": 1.0,  <- earliest finish
+                    "slack": 0.0,   <- delay that does not change the makespan
+                }
+        """
+        return [self._get_task(node) for node in range(len(self._tasks))]
+
+    def get_critical_path(self) -> list:
+        """_summary_
+        Returns:
+            list(dict): Tasks of a longest chain, from the first task to the
+                one that finishes last, in the format of get_tasks(). Any
+                delay of one of them delays the makespan.
+        """
+        if len(self._tasks) == 0:
+            return []
+        node = self._finish.index(self._makespan)
+        path = []
+        while node is not None:
+            path.append(self._get_task(node))
+            node = self._critical[node]
+        path.reverse()
+        return path
@@ -0,0 +1,171 @@
+"""_summary_
+@file       wait_for_graph.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Explains why an application model stopped before finishing every
+            scheduled task.
+@version    0.0.0
+@date       2022-12-08
+"""
+
+
+class WaitForGraph:
+    """_summary_
+    WaitForGraph links every core whose head-of-queue task is blocked to the
+    cores that still have to produce the outputs it is missing. It is built
+    from the engine state in a single pass over the remaining tasks.
+
+    A blocked core can never run if one of its missing outputs has no
+    remaining producer (it is starved), or if it waits on itself through a
+    cycle of other blocked cores (it is deadlocked).
+    """
+
+    def __init__(self, devices, cursors, caches) -> None:
+        """_summary_
+        Args:
+            devices (dict): Devices of the application model.
+            cursors (dict): Index of the next task of each core, per device.
+            caches (dict(DependencyCache)): Outputs available on each device.
+        """
+        # Remaining producers of each (target device, output) pair.
+        producers = {}
+        self.pending_tasks = 0
+        for device_id, device in devices.items():
+            for core_id, core in device["schedule"].items():
+                cursor = cursors[device_id][core_id]
+                self.pending_tasks += len(core) - cursor
+                # While a full period of a PeriodicSchedule remains, the
+                # remaining tasks are those of the period.
+                tasks = getattr(core, "period", None)
+                if tasks is None or len(core) - cursor < len(tasks):
+                    tasks = core[cursor:]
+                for task in tasks:
+                    for output_id, output_targets in task["outputs"].items():
+                        for output_target in output_targets:
+                            producers.setdefault((output_target, output_id), set()).add(
+                                (device_id, core_id)
+                            )
+
+        # Blocked cores, the outputs they miss and the cores they wait on.
+        self.blocked = {}
+        self.edges = {}
+        self.unproduced = set()
+        for device_id, device in devices.items():
+            for core_id, core in device["schedule"].items():
+                cursor = cursors[device_id][core_id]
+                if cursor == len(core):
+                    continue
+                task = core[cursor]
+                missing = caches[device_id].missing(task["dependencies"])
+                if len(missing) == 0:
+                    continue
+
+                waits_on = set()
+                for output_id in missing:
+                    producing_cores = producers.get((device_id, output_id))
+                    if producing_cores is None:
+                        self.unproduced.add((device_id, output_id))
+                    else:
+                        waits_on.update(producing_cores)
+                self.blocked[(device_id, core_id)] = (task["task_name"], missing)
+                self.edges[(device_id, core_id)] = waits_on
+
+    def cycles(self) -> list:
+        """_summary_
+        Finds the groups of blocked cores that wait on each other, using
+        Tarjan's strongly connected components algorithm.
+
+        Returns:
+            list(list((str, str))): Cores of each cycle, including cores that
+                wait on a later task of their own schedule.
+        """
+        index, lowlink, on_stack = {}, {}, set()
+        stack, cycles = [], []
+
+        for root in self.edges:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.edges[root]))]
+            while len(work) > 0:
+                node, children = work[-1]
+                for child in children:
+                    if child not in self.edges:
+                        # Running or idle cores cannot be part of a cycle.
+                        continue
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.edges[child])))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if len(work) > 0:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.edges[node]:
+                            cycles.append(sorted(component))
+        return cycles
+
+    def report(self, reason, timestamp, events) -> dict:
+        """_summary_
+        Summarizes the graph as a diagnostic report.
+
+        Args:
+            reason (str): Why the engine stopped: "deadlock", "max_time" or
+                "max_events".
+            timestamp (float): Simulated time at which the engine stopped.
+            events (int): Number of timeline entries generated.
+
+        Returns:
+            dict: Report of the form
+            {
+                "reason": "deadlock",
+                "timestamp": 4,
+                "events": 4,
+                "pending_tasks": 3,
+                "blocked": [{
+                    "device_id": "device_0",
+                    "core_id": "core_0",
+                    "task_name": "task_A",
+                    "missing": ["output_0"],
+                    "waits_on": [["device_1", "core_0"]],
+                }, ... ],
+                "unproduced": [["device_0", "output_0"], ... ],
+                "cycles": [[["device_0", "core_0"], ["device_1", "core_0"]], ... ],
+            }
+        """
+        blocked = []
+        for (device_id, core_id), (task_name, missing) in self.blocked.items():
+            blocked.append(
+                {
+                    "device_id": device_id,
+                    "core_id": core_id,
+                    "task_name": task_name,
+                    "missing": missing,
+                    "waits_on": [
+                        list(core) for core in sorted(self.edges[(device_id, core_id)])
+                    ],
+                }
+            )
+        return {
+            "reason": reason,
+            "timestamp": timestamp,
+            "events": events,
+            "pending_tasks": self.pending_tasks,
+            "blocked": blocked,
+            "unproduced": [list(output) for output in sorted(self.unproduced)],
+            "cycles": [[list(core) for core in cycle] for cycle in self.cycles()],
+        }
@@ -0,0 +1,141 @@
+"""_summary_
+@file       consumer_table.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Validates energy model devices and compiles their cores and
+            peripherals into an indexed consumer table.
+@version    0.0.0
+@date       2022-12-21
+"""
+
+from array import array
+from numbers import Number
+
+import numpy as np
+
+# Kinds of consumer.
+CORE = 0
+PERIPHERAL = 1
+
+
+class ConsumerTable:
+    """_summary_
+    ConsumerTable holds every consumer (core or peripheral) of the devices of an
+    energy model as a column: its device, kind, active energy and idle energy.
+    Devices are compiled into it once, when they are added, so that reading a
+    timeline entry only looks consumers up by index. The consumers of a device
+    are contiguous, cores first, each in the order the device declares them.
+
+    Each device also records the energy supply it draws from, if any, so that
+    usage can be summed per supply.
+
+    Devices are only ever appended, so the columns of a table stay valid for
+    anything that was built from it earlier.
+    """
+
+    def __init__(self) -> None:
+        self.devices = []
+        self.names = []
+        self._device_rows = {}
+        self._columns = {}
+        self._consumer_offsets = array("q", [0])
+        self._kind = array("B")
+        self._device = array("i")
+        # Supply of each device, as an index into supplies, or -1.
+        self.supplies = []
+        self._supply_rows = {}
+        self._device_supply = array("i")
+        # Energies as given, so that energy events round trip unchanged.
+        self.active_values = []
+        self.idle_values = []
+
+    def add_device(self, device_name, device) -> None:
+        """_summary_
+        Checks that a device has the fields the energy model reads, and appends
+        its consumers.
+
+        Args:
+            device_name (str): Name the device is added under.
+            device (dict): Device with cores and peripherals, each with an
+                active_energy and idle_energy.
+        """
+        consumers = []
+        for kind, field in [(CORE, "cores"), (PERIPHERAL, "peripherals")]:
+            if not isinstance(device.get(field), dict):
+                raise Exception(f"Device {device_name} has no {field} dict.")
+            for name, info in device[field].items():
+                for energy in ["active_energy", "idle_energy"]:
+                    if not isinstance(info.get(energy), Number):
+                        raise Exception(
+                            f"Consumer {name} of device {device_name} has no "
+                            f"numeric {energy}."
+                        )
+                consumers.append(
+                    (kind, name, info["active_energy"], info["idle_energy"])
+                )
+
+        row = len(self.devices)
+        self._device_rows[device_name] = row
+        self.devices.append(device_name)
+        supply_id = device.get("supply_id")
+        if supply_id is not None and supply_id not in self._supply_rows:
+            self._supply_rows[supply_id] = len(self.supplies)
+            self.supplies.append(supply_id)
+        self._device_supply.append(self._supply_rows.get(supply_id, -1))
+        for kind, name, active_energy, idle_energy in consumers:
+            self._columns[(device_name, kind, name)] = len(self.names)
+            self.names.append(name)
+            self._kind.append(kind)
+            self._device.append(row)
+            self.active_values.append(active_energy)
+            self.idle_values.append(idle_energy)
+        self._consumer_offsets.append(len(self.names))
+
+    def get_device_row(self, device_id) -> int:
+        """_summary_
+        Returns:
+            int: Index of the device, or -1 if it was never added.
+        """
+        return self._device_rows.get(device_id, -1)
+
+    def get_column(self, device_id, kind, name) -> int:
+        """_summary_
+        Args:
+            device_id (str): Device of the consumer.
+            kind (int): CORE or PERIPHERAL.
+            name (str): Core or peripheral id.
+
+        Returns:
+            int: Index of the consumer, or -1 if the device has no such
+                consumer.
+        """
+        return self._columns.get((device_id, kind, name), -1)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # NumPy views of the columns. Each call returns a fresh array so that the
+    # table can keep growing while earlier arrays are still held.
+
+    @property
+    def consumer_offsets(self) -> np.ndarray:
+        return np.array(self._consumer_offsets, dtype=np.int64)
+
+    @property
+    def device_supply(self) -> np.ndarray:
+        return np.array(self._device_supply, dtype=np.int64)
+
+    @property
+    def kind(self) -> np.ndarray:
+        return np.array(self._kind, dtype=np.uint8)
+
+    @property
+    def consumer_device(self) -> np.ndarray:
+        return np.array(self._device, dtype=np.int64)
+
+    @property
+    def active_energy(self) -> np.ndarray:
+        return np.array(self.active_values, dtype=np.float64)
+
+    @property
+    def idle_energy(self) -> np.ndarray:
+        return np.array(self.idle_values, dtype=np.float64)
@@ -7,20 +7,31 @@
 """
 
 import json
+import os
 import sys
 
-import matplotlib.pyplot as plt
 import numpy as np
-from colorhash import ColorHash
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from lazy_pyplot import import_pyplot
 
 
 class EnergyModelInterface:
-    def __init__(self, model_name) -> None:
+    # Bump when a change to the model changes its energy usage or the layout
+    # of the EnergyUsage it caches, so that cached results of older versions
+    # are not reused.
+    VERSION = "0.0.3"
+
+    def __init__(self, model_name, headless=False, cache=None) -> None:
         self._devices = {}
         self._energy_supplies = {}
         self._energy_usage = []
         self._fig, self._ax = None, None
         self._model_name = model_name
+        self._headless = headless
+        # Optional ResultCache of energy usages.
+        self._cache = cache
+        self._cache_key = None
 
     def add_device(self, device_name, device) -> bool:
         if device_name in self._devices:
@@ -35,6 +46,233 @@ class EnergyModelInterface:
         return True
 
     def generate_energy_usage(self) -> dict:
+        self._close_plot()
+        return self._energy_usage
+
+    def get_total_energy(self, hyperperiod=None) -> dict:
+        """_summary_
+        Sums the energy usage of each device, weighted by the duration of each
+        energy event.
+
+        Args:
+            hyperperiod (dict, optional): Hyperperiod of the event timeline the
+                energy usage was generated from, see
+                ApplicationModelInterface.get_hyperperiod(). The usage of its
+                cycle is counted once more for each repeat. Defaults to None.
+
+        Returns:
+            dict(float): Total energy of each device.
+        """
+        weights = self._get_weights(hyperperiod)
+        if hasattr(self._energy_usage, "get_device_energy"):
+            return dict(
+                zip(
+                    self._energy_usage.devices,
+                    self._energy_usage.get_device_energy(weights).tolist(),
+                )
+            )
+
+        totals = {device_id: 0.0 for device_id in self._devices}
+        for energy_event, weight in zip(self._energy_usage, weights.tolist()):
+            for device_id, consumers in energy_event["devices"].items():
+                for _, _, energy in consumers:
+                    totals[device_id] += energy * weight
+        return totals
+
+    def _get_weights(self, hyperperiod=None) -> np.ndarray:
+        """_summary_
+        Weights each energy event by its duration. The events of a skipped
+        hyperperiod count once more for each repeat.
+
+        Args:
+            hyperperiod (dict, optional): See get_total_energy().
+
+        Returns:
+            np.ndarray: Weight of each energy event.
+        """
+        if hasattr(self._energy_usage, "duration"):
+            weights = self._energy_usage.duration
+        else:
+            weights = np.array(
+                [energy_event["duration"] for energy_event in self._energy_usage],
+                dtype=np.float64,
+            )
+        if hyperperiod is not None:
+            weights[hyperperiod["start"] : hyperperiod["end"]] *= (
+                1 + hyperperiod["repeats"]
+            )
+        return weights
+
+    def get_energy(self, start, end, level="device", hyperperiod=None) -> dict:
+        """_summary_
+        Sums the energy used between two times: the draw of each consumer
+        times how long it lasts within the range. Each query is a binary search
+        on prefix sums of the energy usage, see EnergyUsage.get_energy().
+
+        Args:
+            start (float): Start of the range.
+            end (float): End of the range.
+            level (str, optional): Sum per "consumer" ((device id, consumer)
+                keys), "device" or "supply". Defaults to "device".
+            hyperperiod (dict, optional): See get_total_energy(). Times in its
+                repeats are mapped onto its cycle. Defaults to None.
+
+        Returns:
+            dict(float): Energy used in the range by each consumer, device or
+                supply.
+        """
+        energy = self._energy_usage.get_energy(start, end, level, hyperperiod)
+        return dict(zip(self._energy_usage.get_columns(level), energy.tolist()))
+
+    def get_supply_load(self) -> dict:
+        """_summary_
+        Sums the draw of every device on each energy supply.
+
+        Returns:
+            dict(np.ndarray): Load of each supply in each energy event.
+        """
+        load = self._energy_usage.get_supply_load()
+        return {
+            supply_id: load[:, supply]
+            for supply, supply_id in enumerate(self._energy_usage.supplies)
+        }
+
+    def get_overloads(self, hyperperiod=None) -> list:
+        """_summary_
+        Finds every interval in which the load of a supply is above its
+        supply_voltage * max_supply_current. Supplies that were never added,
+        and batteries without a maximum current, have no limit.
+
+        Args:
+            hyperperiod (dict, optional): See get_total_energy(). The overloads
+                of its cycle are reported again in each repeat. Defaults to
+                None.
+
+        Returns:
+            list(dict): Overload intervals, see EnergyUsage.get_overloads().
+        """
+        limits = []
+        for supply_id in self._energy_usage.supplies:
+            limit = self._get_power_limit(self._energy_supplies.get(supply_id))
+            limits.append(np.inf if limit is None else limit)
+        return self._energy_usage.get_overloads(limits, hyperperiod)
+
+    def _get_power_limit(self, supply):
+        # Supplies that were never added, and batteries without a maximum
+        # current, have no limit.
+        if supply is None or "max_supply_current" not in supply:
+            return None
+        return supply["supply_voltage"] * supply["max_supply_current"]
+
+    def get_battery_state(self, hyperperiod=None) -> dict:
+        """_summary_
+        Tracks the charge of each battery supply over the energy usage. The
+        charge only changes where the load does, so it is computed at those
+        breakpoints, and the time a battery runs out is solved for within the
+        entry it runs out in. The cost grows with the number of energy events,
+        not with the simulated time.
+
+        Args:
+            hyperperiod (dict, optional): See get_total_energy(). The usage of
+                its repeats is drawn from the batteries too, and a battery can
+                run out within one of them. Defaults to None.
+
+        Returns:
+            dict(dict): For each battery, the breakpoint "timestamp"s, the
+                "charge" and "state_of_charge" (charge / capacity) at each of
+                them, and the time it is "depleted_at", or None if it lasts.
+        """
+        batteries = [
+            (supply, supply_id, self._energy_supplies[supply_id])
+            for supply, supply_id in enumerate(self._energy_usage.supplies)
+            if self._energy_supplies.get(supply_id, {}).get("type") == "battery"
+        ]
+        initial_charge = np.zeros(len(self._energy_usage.supplies))
+        efficiency = np.ones(len(self._energy_usage.supplies))
+        for supply, _, battery in batteries:
+            initial_charge[supply] = battery.get("initial_charge", battery["capacity"])
+            efficiency[supply] = battery.get("efficiency", 1.0)
+
+        times, charge = self._energy_usage.get_charge(
+            initial_charge, efficiency, hyperperiod
+        )
+        depletion = self._energy_usage.get_depletion(
+            initial_charge, efficiency, hyperperiod
+        )
+        return {
+            supply_id: {
+                "timestamp": times,
+                "charge": charge[:, supply],
+                "state_of_charge": charge[:, supply] / battery["capacity"],
+                "depleted_at": (
+                    None if np.isnan(depletion[supply]) else float(depletion[supply])
+                ),
+            }
+            for supply, supply_id, battery in batteries
+        }
+
+    def _load_energy_usage(self, event_timeline) -> bool:
+        """_summary_
+        Looks the energy usage of the current devices, supplies and event
+        timeline up in the result cache. Timelines that are not stored (e.g.
+        iterators) are never cached.
+
+        Args:
+            event_timeline (list(dict) | EventTimeline): Application model
+                event timeline.
+
+        Returns:
+            bool: True if the energy usage was loaded.
+        """
+        self._cache_key = None
+        if self._cache is None:
+            return False
+        if hasattr(event_timeline, "digest"):
+            timeline_key = event_timeline.digest()
+        elif isinstance(event_timeline, list):
+            timeline_key = self._cache.get_key(event_timeline)
+        else:
+            return False
+
+        devices = {
+            device_id: {
+                "cores": device["cores"],
+                "peripherals": device["peripherals"],
+                "supply_id": device.get("supply_id"),
+            }
+            for device_id, device in self._devices.items()
+        }
+        self._cache_key = self._cache.get_key(
+            type(self).__name__,
+            self.VERSION,
+            devices,
+            self._energy_supplies,
+            timeline_key,
+        )
+        cached = self._cache.get(self._cache_key)
+        if cached is None:
+            return False
+        self._energy_usage = cached
+        return True
+
+    def _store_energy_usage(self) -> None:
+        if self._cache_key is not None:
+            self._cache.put(self._cache_key, self._energy_usage)
+
+    def _close_plot(self) -> None:
+        # The figure is only drawn once; drop it when the energy usage changes
+        # so that it is drawn again from the new energy usage.
+        if self._fig is not None:
+            import_pyplot(self._headless).close(self._fig)
+            self._fig, self._axs = None, None
+
+    def _plot_energy_usage(self) -> None:
+        if self._fig is not None:
+            return
+
+        plt = import_pyplot(self._headless)
+        from colorhash import ColorHash
+
         # Generate y components.
         self._fig, self._axs = plt.subplots(len(self._devices.keys()))
 
@@ -51,12 +289,10 @@ class EnergyModelInterface:
                     timestamps.append(event["timestamp"])
                     lastDuration = event["duration"]
                 timestamps.append(timestamps[-1] + lastDuration)
-                max_pwr = (
-                    self._devices[device_id]["supply"]["supply_voltage"]
-                    * self._devices[device_id]["supply"]["max_supply_current"]
-                )
-                max_pwr_list = np.full(len(self._energy_usage) + 1, max_pwr)
-                self._devices[device_id]["ax"].plot(timestamps, max_pwr_list)
+                max_pwr = self._get_power_limit(self._devices[device_id].get("supply"))
+                if max_pwr is not None:
+                    max_pwr_list = np.full(len(self._energy_usage) + 1, max_pwr)
+                    self._devices[device_id]["ax"].plot(timestamps, max_pwr_list)
         else:
             ax = self._axs
             device_id = list(self._devices.keys())[0]
@@ -72,12 +308,10 @@ class EnergyModelInterface:
                 timestamps.append(event["timestamp"])
                 last_duration = event["duration"]
             timestamps.append(timestamps[-1] + last_duration)
-            max_pwr = (
-                self._devices[device_id]["supply"]["supply_voltage"]
-                * self._devices[device_id]["supply"]["max_supply_current"]
-            )
-            max_pwr_list = np.full(len(self._energy_usage) + 1, max_pwr)
-            self._devices[device_id]["ax"].plot(timestamps, max_pwr_list)
+            max_pwr = self._get_power_limit(self._devices[device_id].get("supply"))
+            if max_pwr is not None:
+                max_pwr_list = np.full(len(self._energy_usage) + 1, max_pwr)
+                self._devices[device_id]["ax"].plot(timestamps, max_pwr_list)
 
         plt.get_current_fig_manager().set_window_title(self._model_name)
 
@@ -108,8 +342,6 @@ class EnergyModelInterface:
                     )
                     y += energy_usage
 
-        return self._energy_usage
-
     def get_energy_usage_step(self, step) -> (bool, dict):
         if step < 0 or step >= len(self._energy_usage):
             return (False, {})
@@ -132,17 +364,24 @@ class EnergyModelInterface:
             print()
 
     def visualize_energy_usage(self) -> None:
+        # Nothing can be shown without a GUI.
+        if self._headless:
+            return
+        self._plot_energy_usage()
+        plt = import_pyplot(self._headless)
+        plt.figure(self._fig.number)
         plt.tight_layout()
         plt.show()
 
     def save_outputs(self):
-        plt.tight_layout()
-        plt.savefig("output_energy_usage.jpg")
+        self._plot_energy_usage()
+        self._fig.tight_layout()
+        self._fig.savefig("output_energy_usage.jpg")
         with open("output_energy_usage.json", "w") as fp:
-            json.dump(self._energy_usage, fp)
+            json.dump(list(self._energy_usage), fp)
 
 
-def get_energy_model(name, cwd):
+def get_energy_model(name, cwd, **kwargs):
     try:
         sys.path.append(cwd + "src/energy_model/")
         from energy_model_v0_1 import EnergyModel_V0_1
@@ -151,6 +390,6 @@ def get_energy_model(name, cwd):
 
     match name:
         case "EnergyModel_V0_1":
-            return EnergyModel_V0_1()
+            return EnergyModel_V0_1(**kwargs)
         case _:
             raise Exception("No energy model specified.")
@@ -11,10 +11,17 @@
 >>>>>>> v0.2.0:src/energy_model/energy_model_v0_0.py
 """
 
-import copy
+import itertools
 import sys
+from numbers import Number
 
+import numpy as np
+from consumer_table import CORE, PERIPHERAL, ConsumerTable
 from energy_model_interface import EnergyModelInterface
+from energy_usage import EnergyUsage
+
+# Timeline entries read per block by the activity matrix engine.
+BLOCK_SIZE = 4096
 
 
 class EnergyModel_V0_1(EnergyModelInterface):
@@ -35,8 +42,10 @@ class EnergyModel_V0_1(EnergyModelInterface):
       distribution.
     """
 
-    def __init__(self) -> None:
-        super().__init__("V0_0 Energy Model")
+    def __init__(self, headless=False, cache=None) -> None:
+        super().__init__("V0_0 Energy Model", headless, cache)
+        # Cores and peripherals of every device, compiled by add_device.
+        self._consumers = ConsumerTable()
 
     def add_device(self, device_name, device) -> bool:
         """_summary_
@@ -46,6 +55,9 @@ class EnergyModel_V0_1(EnergyModelInterface):
         - a set of cores and hardware peripherals, each with:
             - a static idle and active energy consumption value (float, float)
 
+        The cores and peripherals are checked and compiled into the consumer
+        table once here. Later edits of their energies are not seen.
+
         Args:
             device_name (_type_): _description_
             device (_type_): _description_
@@ -53,7 +65,9 @@ class EnergyModel_V0_1(EnergyModelInterface):
         Returns:
             bool: _description_
         """
-
+        if device_name in self._devices:
+            return False
+        self._consumers.add_device(device_name, device)
         return super().add_device(device_name, device)
 
     def add_energy_supply(self, supply_name, supply) -> bool:
@@ -64,6 +78,13 @@ class EnergyModel_V0_1(EnergyModelInterface):
         - a supply energy characteristics, including supply voltage and maximum
           draw (float).
 
+        A supply with "type": "battery" stores energy instead:
+        - capacity (float), in the units of the device energies.
+        - initial_charge (float, optional), at most the capacity. Defaults to
+          the capacity.
+        - efficiency (float, optional), the fraction of the charge drawn that
+          reaches the devices, in (0, 1]. Defaults to 1.
+
         Args:
             supply_name (_type_): _description_
             supply (_type_): _description_
@@ -71,71 +92,225 @@ class EnergyModel_V0_1(EnergyModelInterface):
         Returns:
             bool: _description_
         """
+        if supply.get("type", "static") == "battery":
+            capacity = supply.get("capacity")
+            if not isinstance(capacity, Number) or capacity <= 0:
+                raise Exception(f"Battery {supply_name} has no positive capacity.")
+            initial_charge = supply.get("initial_charge", capacity)
+            if not isinstance(initial_charge, Number) or not (
+                0 <= initial_charge <= capacity
+            ):
+                raise Exception(
+                    f"The initial charge of battery {supply_name} is not between 0 "
+                    "and its capacity."
+                )
+            efficiency = supply.get("efficiency", 1.0)
+            if not isinstance(efficiency, Number) or not (0 < efficiency <= 1):
+                raise Exception(
+                    f"The efficiency of battery {supply_name} is not in (0, 1]."
+                )
+        elif supply.get("type", "static") != "static":
+            raise Exception(f"Supply {supply_name} has an unknown type.")
         return super().add_energy_supply(supply_name, supply)
 
+    def _iter_activity(self, event_timeline, energy_usage, start=0, block_size=None):
+        """_summary_
+        Yields the activity matrices of the timeline, a block of entries at a
+        time (see EnergyUsage). Columnar timelines (see EventTimeline in the
+        application model) are read from their arrays in a single block.
+
+        Args:
+            event_timeline (iterable(dict) | EventTimeline): Application model
+                event timeline.
+            energy_usage (EnergyUsage): Energy usage the blocks are for.
+            start (int, optional): Index of the first event. Defaults to 0.
+            block_size (int, optional): Entries per block. Defaults to
+                BLOCK_SIZE.
+
+        Yields:
+            (list(float), list(float), np.ndarray, np.ndarray): Timestamps,
+                durations, listed matrix and active matrix of each block.
+        """
+        if hasattr(event_timeline, "symbols"):
+            if start < len(event_timeline):
+                yield self._get_timeline_activity(event_timeline, energy_usage, start)
+            return
+
+        events = itertools.islice(event_timeline, start, None)
+        while True:
+            block = list(itertools.islice(events, block_size or BLOCK_SIZE))
+            if len(block) == 0:
+                return
+
+            listed = np.zeros((len(block), len(energy_usage.devices)), dtype=bool)
+            active = np.zeros((len(block), len(energy_usage.active_energy)), dtype=bool)
+            device_rows, device_cells, consumer_rows, consumer_cells = [], [], [], []
+            for step, event in enumerate(block):
+                for device_id, device in event["devices"].items():
+                    device_rows.append(step)
+                    device_cells.append(self._get_device_row(device_id))
+                    for core_id in device["cores"]:
+                        consumer_rows.append(step)
+                        consumer_cells.append(
+                            self._get_column(device_id, CORE, core_id)
+                        )
+                    for hw_id in device["hw"]:
+                        consumer_rows.append(step)
+                        consumer_cells.append(
+                            self._get_column(device_id, PERIPHERAL, hw_id)
+                        )
+            listed[device_rows, device_cells] = True
+            active[consumer_rows, consumer_cells] = True
+            yield (
+                [event["timestamp"] for event in block],
+                [event["duration"] for event in block],
+                listed,
+                active,
+            )
+
+    def _get_timeline_activity(self, event_timeline, energy_usage, start):
+        symbols = event_timeline.symbols
+        timestamps, durations = event_timeline.entry_times()
+        entry_devices = event_timeline.entry_device_offsets
+        first = int(entry_devices[start])
+        first_task = int(event_timeline.device_task_offsets[first])
+        first_hw = int(event_timeline.device_hw_offsets[first])
+
+        # Resolve each distinct device symbol to its row once.
+        devices = event_timeline.device[first:]
+        unique_devices, device_inverse = np.unique(devices, return_inverse=True)
+        device_cells = np.array(
+            [
+                self._get_device_row(symbols[device])
+                for device in unique_devices.tolist()
+            ],
+            dtype=np.int64,
+        )[device_inverse.reshape(-1)]
+
+        entries = np.concatenate(
+            [
+                event_timeline.task_entry[first_task:],
+                event_timeline.hw_entry[first_hw:],
+            ]
+        )
+        consumer_cells = np.concatenate(
+            [
+                self._get_timeline_columns(
+                    symbols,
+                    CORE,
+                    event_timeline.task_device[first_task:],
+                    event_timeline.task_core[first_task:],
+                ),
+                self._get_timeline_columns(
+                    symbols,
+                    PERIPHERAL,
+                    event_timeline.hw_device[first_hw:],
+                    event_timeline.hw[first_hw:],
+                ),
+            ]
+        )
+
+        length = len(timestamps) - start
+        listed = np.zeros((length, len(energy_usage.devices)), dtype=bool)
+        active = np.zeros((length, len(energy_usage.active_energy)), dtype=bool)
+        listed[event_timeline.device_entry[first:] - start, device_cells] = True
+        active[entries - start, consumer_cells] = True
+        return timestamps[start:], durations[start:], listed, active
+
+    def _get_timeline_columns(self, symbols, kind, devices, consumers) -> np.ndarray:
+        # Resolves each distinct (device, consumer) symbol pair once.
+        pairs = devices.astype(np.int64) * len(symbols) + consumers
+        unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+        return np.array(
+            [
+                self._get_column(
+                    symbols[pair // len(symbols)], kind, symbols[pair % len(symbols)]
+                )
+                for pair in unique_pairs.tolist()
+            ],
+            dtype=np.int64,
+        )[inverse.reshape(-1)]
+
+    def _get_device_row(self, device_id) -> int:
+        row = self._consumers.get_device_row(device_id)
+        if row < 0:
+            raise Exception(f"Device {device_id} is not in the energy model.")
+        return row
+
+    def _get_column(self, device_id, kind, name) -> int:
+        column = self._consumers.get_column(device_id, kind, name)
+        if column < 0:
+            kind_name = "core" if kind == CORE else "peripheral"
+            raise Exception(f"Device {device_id} has no {kind_name} {name}.")
+        return column
+
     def generate_energy_usage(self, event_timeline):
-        # Plot event energy usage on the timeline.
+        self._setup_devices()
+        if not self._load_energy_usage(event_timeline):
+            self._energy_usage = EnergyUsage(self._consumers)
+            for block in self._iter_activity(event_timeline, self._energy_usage):
+                self._energy_usage.append(*block)
+            self._store_energy_usage()
+
+        return super().generate_energy_usage()
+
+    def update_energy_usage(self, event_timeline, start):
+        """_summary_
+        Recomputes the energy usage after the event timeline was changed from
+        an entry on, e.g. by ApplicationModel_V0_1.update_event_timeline().
+        Energy events before that entry are kept.
+
+        Args:
+            event_timeline (list(dict) | EventTimeline): Updated application
+                model event timeline.
+            start (int): Index of the first timeline entry that changed.
+
+        Returns:
+            EnergyUsage: The energy usage.
+        """
+        self._energy_usage.truncate(start)
+        for block in self._iter_activity(event_timeline, self._energy_usage, start):
+            self._energy_usage.append(*block)
+        return super().generate_energy_usage()
+
+    def _setup_devices(self) -> None:
+        # Attach each device to its energy supply. Devices that are already
+        # attached are left as is.
         for device_id in self._devices.keys():
             self._devices[device_id]["events"] = []
-            if self._devices[device_id]["supply_id"] in self._energy_supplies:
+            if self._devices[device_id].get("supply_id") in self._energy_supplies:
                 self._devices[device_id]["supply"] = self._energy_supplies[
                     self._devices[device_id]["supply_id"]
                 ]
                 del self._devices[device_id]["supply_id"]
 
-        for event in event_timeline:
-            energy_event = {
-                "timestamp": event["timestamp"],
-                "duration": event["duration"],
-                "devices": {},
-            }
-            for device_id, device in event["devices"].items():
-                device_info = self._devices[device_id]
-                idle_consumers = [core for core in device_info["cores"]] + [
-                    peripheral for peripheral in device_info["peripherals"]
-                ]
-                active_consumers = []
-
-                for core_id in device["cores"].keys():
-                    idle_consumers.remove(core_id)
-                    active_consumers.append(core_id)
-
-                for hw_id in device["hw"]:
-                    idle_consumers.remove(hw_id)
-                    active_consumers.append(hw_id)
-
-                energy_event["devices"][device_id] = []
-
-                y = 0
-                # Calculate energy per consumer
-                for consumer in active_consumers:
-                    if "core" in consumer:
-                        energy_usage = device_info["cores"][consumer]["active_energy"]
-                    else:
-                        energy_usage = device_info["peripherals"][consumer][
-                            "active_energy"
-                        ]
-
-                    energy_event["devices"][device_id].append(
-                        [consumer, "active", energy_usage]
-                    )
-
-                # Calculate energy per consumer
-                for consumer in idle_consumers:
-                    if "core" in consumer:
-                        energy_usage = device_info["cores"][consumer]["idle_energy"]
-                    else:
-                        energy_usage = device_info["peripherals"][consumer][
-                            "idle_energy"
-                        ]
-
-                    energy_event["devices"][device_id].append(
-                        [consumer, "idle", energy_usage]
-                    )
-
-            self._energy_usage.append(energy_event)
+    def iter_energy_usage(self, event_timeline, start=0):
+        """_summary_
+        Yields the energy usage of each timeline entry as soon as it is read.
+        The event timeline may be any iterable of timeline entries, including
+        ApplicationModelInterface.iter_event_timeline(), and is consumed one
+        entry at a time. Stored timelines are read a block at a time instead.
+        Energy events are not stored by the model.
 
-        return super().generate_energy_usage()
+        Args:
+            event_timeline (iterable(dict) | EventTimeline): Application model
+                event timeline.
+            start (int, optional): Index of the first timeline entry to read.
+                Defaults to 0.
+
+        Yields:
+            dict: Energy usage of each device during the timeline entry.
+        """
+        self._setup_devices()
+
+        energy_usage = EnergyUsage(self._consumers)
+        block_size = None if hasattr(event_timeline, "__len__") else 1
+        for block in self._iter_activity(
+            event_timeline, energy_usage, start, block_size
+        ):
+            energy_usage.append(*block)
+            yield from energy_usage
+            energy_usage.truncate(0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,534 @@
+"""_summary_
+@file       energy_usage.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Compact, matrix storage for energy model energy usages.
+@version    0.0.0
+@date       2022-12-20
+"""
+
+import numpy as np
+
+# Columns that energy can be summed over, see get_energy().
+LEVELS = ["consumer", "device", "supply"]
+
+
+class EnergyUsage:
+    """_summary_
+    EnergyUsage stores the energy usage generated by an energy model as
+    activity matrices instead of a list of nested lists. Each row is a timeline
+    entry. The listed matrix has a column per device, True if the device is in
+    the entry, and the active matrix a column per consumer (core or
+    peripheral), True if the consumer is in use during the entry. Energy events
+    keep their usual shape:
+    {
+        "timestamp": 0,
+        "duration": 1,
+        "devices": {
+            "device_0": [["core_0", "active", 5], ["adc_0", "idle", 1], ...], ...
+        },
+    }
+    and are rebuilt on demand when the energy usage is indexed or iterated.
+    Within a device, active consumers come before idle ones, each in the order
+    the device declares its cores and then its peripherals.
+
+    The value listed for a consumer is its draw (power) during the entry. The
+    energy it uses is the draw times the entry duration; get_energy() sums it
+    over any time range from prefix sums built on first use. Entries are
+    expected in time order and not to overlap, as in application model event
+    timelines.
+    """
+
+    def __init__(self, consumers) -> None:
+        """_summary_
+        Args:
+            consumers (ConsumerTable): Consumers of the devices of the model.
+                Devices added to the table later are not part of this usage.
+        """
+        self.consumers = consumers
+        self.devices = consumers.devices[:]
+        self.active_energy = consumers.active_energy
+        self.idle_energy = consumers.idle_energy
+        self.consumer_device = consumers.consumer_device
+        self._consumer_offsets = consumers.consumer_offsets.tolist()
+        self.supplies = consumers.supplies[:]
+        self.device_supply = consumers.device_supply
+
+        # Rows are appended in blocks and joined on first read.
+        self._timestamps = []
+        self._durations = []
+        self._listed = [np.zeros((0, len(self.devices)), dtype=bool)]
+        self._active = [np.zeros((0, len(self.active_energy)), dtype=bool)]
+        # Power and cumulative energy of each level, built on first query.
+        self._integrals = {}
+        self._times = None
+
+    def append(self, timestamps, durations, listed, active) -> None:
+        """_summary_
+        Appends a block of rows.
+
+        Args:
+            timestamps (list(float)): Timestamp of each entry.
+            durations (list(float)): Duration of each entry.
+            listed (np.ndarray): Listed matrix of the block.
+            active (np.ndarray): Active matrix of the block.
+        """
+        self._timestamps.extend(timestamps)
+        self._durations.extend(durations)
+        self._listed.append(listed)
+        self._active.append(active)
+        self._integrals = {}
+        self._times = None
+
+    def _join(self) -> None:
+        if len(self._listed) > 1:
+            self._listed = [np.concatenate(self._listed)]
+            self._active = [np.concatenate(self._active)]
+
+    @property
+    def listed(self) -> np.ndarray:
+        self._join()
+        return self._listed[0]
+
+    @property
+    def active(self) -> np.ndarray:
+        self._join()
+        return self._active[0]
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return np.array(self._timestamps, dtype=np.float64)
+
+    @property
+    def duration(self) -> np.ndarray:
+        return np.array(self._durations, dtype=np.float64)
+
+    def power(self) -> np.ndarray:
+        """_summary_
+        Returns:
+            np.ndarray: Draw of every consumer in every entry (entries x
+                consumers). Consumers of devices that are not in an entry draw
+                nothing.
+        """
+        return (
+            np.where(self.active, self.active_energy, self.idle_energy)
+            * self.listed[:, self.consumer_device]
+        )
+
+    def get_device_energy(self, weights=None) -> np.ndarray:
+        """_summary_
+        Args:
+            weights (np.ndarray, optional): Weight of each entry, e.g. its
+                duration. Defaults to None, for a weight of 1.
+
+        Returns:
+            np.ndarray: Weighted sum of the draw of each device.
+        """
+        power = self.power()
+        if weights is not None:
+            power *= weights[:, np.newaxis]
+        return np.bincount(
+            self.consumer_device, weights=power.sum(axis=0), minlength=len(self.devices)
+        )
+
+    def get_columns(self, level) -> list:
+        """_summary_
+        Returns:
+            list: Columns of get_energy() for the level: (device id, consumer)
+                pairs, device ids or supply ids.
+        """
+        match level:
+            case "consumer":
+                return [
+                    (self.devices[device], self.consumers.names[column])
+                    for column, device in enumerate(self.consumer_device.tolist())
+                ]
+            case "device":
+                return self.devices[:]
+            case "supply":
+                return self.supplies[:]
+            case _:
+                raise Exception(f"Unknown energy level {level}.")
+
+    def _get_times(self) -> (np.ndarray, np.ndarray):
+        if self._times is None:
+            self._times = (self.timestamp, self.duration)
+        return self._times
+
+    def _get_integral(self, level) -> (np.ndarray, np.ndarray):
+        """_summary_
+        Returns:
+            (np.ndarray, np.ndarray): Power of each column of the level in each
+                entry (entries x columns), and the energy used before each entry
+                and after the last one (entries + 1 x columns).
+        """
+        if level not in self._integrals:
+            power = self.power()
+            if level != "consumer":
+                # Sum the consumers of each device, then the devices of each
+                # supply. Devices without a supply are dropped.
+                groups = self.consumer_device
+                if level == "supply":
+                    groups = self.device_supply[groups]
+                    power = power[:, groups >= 0]
+                    groups = groups[groups >= 0]
+                size = len(self.get_columns(level))
+                onehot = np.zeros((len(groups), size))
+                onehot[np.arange(len(groups)), groups] = 1.0
+                power = power @ onehot
+            cumulative = np.zeros((len(self) + 1, power.shape[1]))
+            _, durations = self._get_times()
+            np.cumsum(power * durations[:, np.newaxis], axis=0, out=cumulative[1:])
+            self._integrals[level] = (power, cumulative)
+        return self._integrals[level]
+
+    def _get_cycle(self, hyperperiod):
+        # First entry, stop entry, start time, duration and repeats of the
+        # cycle of a compressed hyperperiod, see
+        # ApplicationModelInterface.get_hyperperiod(). The repeats are not
+        # stored: they fill the gap between the end of the cycle and the entry
+        # after it, whose timestamp already accounts for them.
+        if hyperperiod is None or hyperperiod["repeats"] == 0 or len(self) == 0:
+            return None
+        starts, _ = self._get_times()
+        return (
+            hyperperiod["start"],
+            hyperperiod["end"],
+            float(starts[hyperperiod["start"]]),
+            float(hyperperiod["duration"]),
+            int(hyperperiod["repeats"]),
+        )
+
+    def _get_energy_at(self, times, level, hyperperiod=None) -> np.ndarray:
+        # Energy used from the start of the usage up to each time: the sum of
+        # the entries before it plus the elapsed part of the entry it is in.
+        power, cumulative = self._get_integral(level)
+        starts, durations = self._get_times()
+        steps = np.searchsorted(starts, times, side="right") - 1
+        entries = np.maximum(steps, 0)
+        elapsed = np.clip(times - starts[entries], 0, durations[entries])
+        energy = cumulative[entries] + power[entries] * elapsed[:, np.newaxis]
+        energy[steps < 0] = 0.0
+        cycle = self._get_cycle(hyperperiod)
+        if cycle is not None:
+            energy += self._get_repeat_energy(times, level, cycle)
+        return energy
+
+    def _get_repeat_energy(self, times, level, cycle) -> np.ndarray:
+        # Energy used by the repeats of a compressed hyperperiod up to each
+        # time: the whole repeats before it plus the elapsed part of the one
+        # it is in, which is measured on the stored cycle.
+        _, _, cycle_start, period, repeats = cycle
+        bounds = self._get_energy_at(
+            np.array([cycle_start, cycle_start + period]), level
+        )
+        into = np.clip(times - (cycle_start + period), 0, repeats * period)
+        cycles = np.minimum(np.floor(into / period), repeats)
+        partial = self._get_energy_at(cycle_start + into - cycles * period, level)
+        return cycles[:, np.newaxis] * (bounds[1] - bounds[0]) + partial - bounds[0]
+
+    def get_energy(self, start, end, level="device", hyperperiod=None) -> np.ndarray:
+        """_summary_
+        Sums the energy used between two times, in O(log n) per query by
+        binary search on the entry timestamps.
+
+        Args:
+            start (float | np.ndarray): Start of each range.
+            end (float | np.ndarray): End of each range.
+            level (str, optional): "consumer", "device" or "supply". Defaults
+                to "device".
+            hyperperiod (dict, optional): Hyperperiod compressed out of the
+                application model event timeline, see
+                ApplicationModelInterface.get_hyperperiod(). Times in its
+                repeats are mapped onto its stored cycle. Defaults to None.
+
+        Returns:
+            np.ndarray: Energy of each column of the level (see get_columns),
+                for a single range, or for each range (ranges x columns).
+        """
+        times = np.concatenate([np.atleast_1d(start), np.atleast_1d(end)]).astype(
+            np.float64
+        )
+        if len(self) == 0:
+            energy = np.zeros((len(times), len(self.get_columns(level))))
+        else:
+            energy = self._get_energy_at(times, level, hyperperiod)
+        ranges = len(times) // 2
+        energy = energy[ranges:] - energy[:ranges]
+        return energy[0] if np.ndim(start) == 0 and np.ndim(end) == 0 else energy
+
+    def get_supply_load(self) -> np.ndarray:
+        """_summary_
+        Returns:
+            np.ndarray: Summed draw of the devices on each supply in each entry
+                (entries x supplies), see get_columns("supply").
+        """
+        power, _ = self._get_integral("supply")
+        return power
+
+    def get_overloads(self, limits, hyperperiod=None) -> list:
+        """_summary_
+        Sweeps the entries in time order and reports every interval in which
+        the load of a supply is above its limit. Overloaded entries that follow
+        each other without a gap form one interval.
+
+        Args:
+            limits (np.ndarray): Largest draw of each supply.
+            hyperperiod (dict, optional): Hyperperiod compressed out of the
+                application model event timeline, see
+                ApplicationModelInterface.get_hyperperiod(). The overloads of
+                its stored cycle are reported again in each of its repeats.
+                Defaults to None.
+
+        Returns:
+            list(dict): Overload intervals ordered by start time, each with the
+                supply_id, start, end, peak load, limit, and the energy used in
+                the interval by each consumer on the supply that drew power
+                ({(device id, consumer): energy}).
+        """
+        if len(self) == 0:
+            return []
+        load = self.get_supply_load()
+        starts, durations = self._get_times()
+        ends = starts + durations
+        _, cumulative = self._get_integral("consumer")
+        consumers = self.get_columns("consumer")
+        consumer_supply = self.device_supply[self.consumer_device]
+        limits = np.asarray(limits, dtype=np.float64)
+
+        # An entry continues the interval of the one before it if both are
+        # overloaded and there is no gap between them.
+        follows = np.zeros(len(self), dtype=bool)
+        follows[1:] = starts[1:] <= ends[:-1]
+
+        # The entries are swept in pieces (first entry, stop entry, time shift,
+        # joins the piece before it): with a compressed hyperperiod, the
+        # entries before its cycle, the cycle once for itself and once per
+        # repeat, and the entries after it. Intervals are cut at the ends of
+        # the pieces, and joined again where the pieces meet.
+        cycle = self._get_cycle(hyperperiod)
+        if cycle is None:
+            pieces = [(0, len(self), 0.0, False)]
+        else:
+            first, stop, _, period, repeats = cycle
+            pieces = [(0, first, 0.0, False), (first, stop, 0.0, bool(follows[first]))]
+            pieces.extend(
+                (first, stop, repeat * period, True) for repeat in range(1, repeats + 1)
+            )
+            pieces.append((stop, len(self), 0.0, True))
+            follows[first] = False
+            if stop < len(self):
+                follows[stop] = False
+
+        overloaded = load > limits
+        continued = np.zeros_like(overloaded)
+        continued[1:] = overloaded[:-1] & follows[1:, np.newaxis]
+        continues = np.zeros_like(overloaded)
+        continues[:-1] = overloaded[1:] & follows[1:, np.newaxis]
+
+        overloads = []
+        for supply, supply_id in enumerate(self.supplies):
+            firsts = np.flatnonzero(overloaded[:, supply] & ~continued[:, supply])
+            if len(firsts) == 0:
+                continue
+            lasts = np.flatnonzero(overloaded[:, supply] & ~continues[:, supply])
+            # Entries between two intervals are under the limit, so the
+            # largest load from each first entry on is the peak of its interval.
+            peaks = np.maximum.reduceat(load[:, supply], firsts)
+            columns = np.flatnonzero(consumer_supply == supply)
+            energy = cumulative[lasts + 1][:, columns] - cumulative[firsts][:, columns]
+
+            # [start, end, peak, energy] of each interval, and the piece whose
+            # last entry ends the latest interval, if any.
+            intervals = []
+            tail = None
+            for piece, (first, stop, shift, joins) in enumerate(pieces):
+                runs = np.searchsorted(firsts, [first, stop]).tolist()
+                for run in range(*runs):
+                    if tail == piece - 1 and joins and firsts[run] == first:
+                        interval = intervals[-1]
+                        interval[1] = ends[lasts[run]] + shift
+                        interval[2] = max(interval[2], peaks[run])
+                        interval[3] = interval[3] + energy[run]
+                    else:
+                        intervals.append(
+                            [
+                                starts[firsts[run]] + shift,
+                                ends[lasts[run]] + shift,
+                                peaks[run],
+                                energy[run],
+                            ]
+                        )
+                    tail = piece if lasts[run] == stop - 1 else None
+
+            for start, end, peak, used in intervals:
+                overloads.append(
+                    {
+                        "supply_id": supply_id,
+                        "start": float(start),
+                        "end": float(end),
+                        "peak": float(peak),
+                        "limit": float(limits[supply]),
+                        "consumers": {
+                            consumers[column]: energy
+                            for column, energy in zip(columns.tolist(), used.tolist())
+                            if energy > 0
+                        },
+                    }
+                )
+        overloads.sort(key=lambda overload: overload["start"])
+        return overloads
+
+    def get_charge(
+        self, initial_charge, efficiency, hyperperiod=None
+    ) -> (np.ndarray, np.ndarray):
+        """_summary_
+        Integrates the charge of each supply at the power breakpoints, i.e. the
+        start of each entry and the end of the last one. The load is constant
+        in between, so no other time needs to be visited.
+
+        Args:
+            initial_charge (np.ndarray): Charge of each supply at the start.
+            efficiency (np.ndarray): Fraction of the charge drawn from each
+                supply that reaches its devices.
+            hyperperiod (dict, optional): Hyperperiod compressed out of the
+                application model event timeline, see
+                ApplicationModelInterface.get_hyperperiod(). The breakpoints of
+                its repeats are not listed, but the charge at the breakpoints
+                after them counts their usage. Defaults to None.
+
+        Returns:
+            (np.ndarray, np.ndarray): Breakpoint times, and the charge left in
+                each supply at each of them (breakpoints x supplies), never
+                below zero.
+        """
+        _, cumulative = self._get_integral("supply")
+        starts, durations = self._get_times()
+        times = (
+            np.append(starts, starts[-1] + durations[-1]) if len(self) else np.zeros(1)
+        )
+        used = cumulative
+        cycle = self._get_cycle(hyperperiod)
+        if cycle is not None:
+            used = cumulative + self._get_repeat_energy(times, "supply", cycle)
+        charge = np.asarray(initial_charge, dtype=np.float64) - used / efficiency
+        return times, np.maximum(charge, 0.0)
+
+    def get_depletion(self, initial_charge, efficiency, hyperperiod=None) -> np.ndarray:
+        """_summary_
+        Finds when each supply runs out of charge. The entry it runs out in is
+        found by binary search on the prefix sums, and the time within the
+        entry in closed form, since the load is constant over the entry.
+
+        Args:
+            initial_charge (np.ndarray): Charge of each supply at the start.
+            efficiency (np.ndarray): Fraction of the charge drawn from each
+                supply that reaches its devices.
+            hyperperiod (dict, optional): Hyperperiod compressed out of the
+                application model event timeline, see
+                ApplicationModelInterface.get_hyperperiod(). Supplies that run
+                out in one of its repeats are found in its stored cycle.
+                Defaults to None.
+
+        Returns:
+            np.ndarray: Time each supply is depleted, or NaN if it lasts until
+                the end of the energy usage.
+        """
+        power, cumulative = self._get_integral("supply")
+        starts, _ = self._get_times()
+        usable = np.asarray(initial_charge, dtype=np.float64) * efficiency
+        depletion = np.full(len(self.supplies), np.nan)
+        cycle = self._get_cycle(hyperperiod)
+        for supply in range(len(self.supplies)):
+            # Charge to spend, entries to search and time shift of the result.
+            target, first, stop, shift = usable[supply], 0, len(self), 0.0
+            if cycle is not None:
+                start, end, _, period, repeats = cycle
+                stored = cumulative[end, supply]
+                used = stored - cumulative[start, supply]
+                if stored < target <= stored + repeats * used:
+                    # Runs out in a repeat: skip the whole repeats before it,
+                    # and search the stored cycle for what is left.
+                    skipped = min(np.floor((target - stored) / used), repeats - 1)
+                    target = min(
+                        cumulative[start, supply] + target - stored - skipped * used,
+                        stored,
+                    )
+                    first, stop, shift = start, end, (skipped + 1) * period
+                elif target > stored:
+                    # The entries after the repeats already start after them.
+                    target -= repeats * used
+
+            # First entry by the end of which the usable charge is spent.
+            step = first + np.searchsorted(
+                cumulative[first + 1 : stop + 1, supply], target
+            )
+            if step == stop:
+                continue
+            left = target - cumulative[step, supply]
+            elapsed = left / power[step, supply] if left > 0 else 0.0
+            depletion[supply] = starts[step] + elapsed + shift
+        return depletion
+
+    def truncate(self, length) -> None:
+        """_summary_
+        Drops every entry from index length on.
+
+        Args:
+            length (int): Number of entries to keep.
+        """
+        if length >= len(self):
+            return
+        del self._timestamps[length:]
+        del self._durations[length:]
+        self._listed = [self.listed[:length]]
+        self._active = [self.active[:length]]
+        self._integrals = {}
+        self._times = None
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __getitem__(self, step) -> dict:
+        if step < 0:
+            step += len(self)
+        if step < 0 or step >= len(self):
+            raise IndexError("energy usage index out of range")
+
+        energy_event = {
+            "timestamp": self._timestamps[step],
+            "duration": self._durations[step],
+            "devices": {},
+        }
+        offsets = self._consumer_offsets
+        names = self.consumers.names
+        active_values = self.consumers.active_values
+        idle_values = self.consumers.idle_values
+        active = self.active[step].tolist()
+        for row in np.flatnonzero(self.listed[step]).tolist():
+            first, last = offsets[row], offsets[row + 1]
+            consumers = [
+                [names[column], "active", active_values[column]]
+                for column in range(first, last)
+                if active[column]
+            ]
+            consumers.extend(
+                [names[column], "idle", idle_values[column]]
+                for column in range(first, last)
+                if not active[column]
+            )
+            energy_event["devices"][self.devices[row]] = consumers
+        return energy_event
+
+    def __iter__(self):
+        for step in range(len(self)):
+            yield self[step]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (EnergyUsage, list)):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def to_list(self) -> list:
+        return list(self)
@@ -0,0 +1,20 @@
+"""_summary_
+@file       lazy_pyplot.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Loads matplotlib for the application, energy and network models
+            once they first plot something.
+@version    0.0.0
+@date       2022-12-06
+"""
+
+
+def import_pyplot(headless):
+    # matplotlib is only loaded once something is plotted. Headless models use
+    # a non-interactive backend so that no GUI is ever started.
+    import matplotlib
+
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
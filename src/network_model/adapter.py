@@ -1,5 +1,4 @@
-from src.network_model.grapher import Grapher, Node
-import matplotlib.pyplot as plt
+import numpy as np
 
 IMAGE_CACHE = "image-cache"
 
@@ -161,14 +160,15 @@ class Adapter:
         self.output_map = {}
         self.output_src_map = {}
         self.connected_devices = {}
-        self.node_list = []
 
         for device_name in self.device_list:
             device = self.device_list[device_name]
             connected_device_list = []
 
             for core in device["schedule"]:
-                for task in device["schedule"][core]:
+                # Every iteration of a PeriodicSchedule has the same outputs.
+                schedule = device["schedule"][core]
+                for task in getattr(schedule, "period", schedule):
                     for output in task["outputs"]:
                         self.output_src_map[output] = device_name
                         output_dst = []
@@ -182,13 +182,17 @@ class Adapter:
                         self.output_map[output] = output_dst
             self.connected_devices[device_name] = connected_device_list
 
-            # create nodes for each device
-            node = Node(device_name, connected_device_list)
-            self.node_list.append(node)
-
     def create_timeline(self, input):
-        timeline = []
+        # Columnar timelines (see EventTimeline in the application model) are
+        # read from their arrays instead of being expanded into dicts.
+        if hasattr(input, "symbols"):
+            return self.create_timeline_from_columns(input)
+
+        return list(self.iter_timeline(input))
 
+    def iter_timeline(self, input):
+        # Consumes any iterable of timeline entries, such as the application
+        # model's iter_event_timeline(), one entry at a time.
         for entry in input:
             timeline_entry = TimelineEntry(entry["timestamp"])
 
@@ -206,12 +210,52 @@ class Adapter:
                                 (src_device, connected_device)
                             )
 
-            timeline.append(timeline_entry)
+            yield timeline_entry
+
+    def create_timeline_from_columns(self, input):
+        names = input.symbols.names
+        timestamps, _ = input.entry_times()
+        timeline = [TimelineEntry(timestamp) for timestamp in timestamps]
+
+        # Task rows are ordered by entry then device, so each device running a
+        # task in an entry starts a new run of rows.
+        task_entry = input.task_entry
+        task_device = input.task_device
+        first_rows = np.ones(len(task_entry), dtype=bool)
+        first_rows[1:] = (task_entry[1:] != task_entry[:-1]) | (
+            task_device[1:] != task_device[:-1]
+        )
+        for entry, device in zip(
+            task_entry[first_rows].tolist(), task_device[first_rows].tolist()
+        ):
+            timeline[entry].active_device_list.append(names[device])
+
+        for entry, output in zip(input.output_entry.tolist(), input.output.tolist()):
+            output = names[output]
+            if output in self.output_map:
+                for connected_device in self.output_map[output]:
+                    src_device = self.output_src_map[output]
+                    timeline[entry].transaction_list.append(
+                        (src_device, connected_device)
+                    )
 
         return timeline
 
     def create_gif(self, input, gif_path):
-        timeline = self.create_timeline(input)
+        # Rendering libraries are only loaded when a gif is requested.
+        from src.network_model.grapher import Grapher, Node
+        import matplotlib.pyplot as plt
+
+        # create nodes for each device
+        self.node_list = [
+            Node(device_name, connected_device_list)
+            for device_name, connected_device_list in self.connected_devices.items()
+        ]
+
+        if hasattr(input, "symbols"):
+            timeline = self.create_timeline_from_columns(input)
+        else:
+            timeline = self.iter_timeline(input)
         plt.clf()
         grapher = Grapher(self.node_list)
         grapher.set_image_time(-1)
@@ -7,17 +7,19 @@
 @date       2022-11-28
 """
 
+import os
 import sys
 
-import matplotlib.pyplot as plt
-from colorhash import ColorHash
+sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/../")
+from lazy_pyplot import import_pyplot
 
 
 class NetworkModelInterface:
-    def __init__(self) -> None:
+    def __init__(self, headless=False) -> None:
         self._devices = {}
         self._network_graph = []
         self._fig, self._ax = None, None
+        self._headless = headless
 
     def add_device(self, device_name, device) -> bool:
         if device_name in self._devices:
@@ -38,5 +40,9 @@ class NetworkModelInterface:
         pass
 
     def visualize_network_graph(self) -> None:
+        # Nothing can be shown without a GUI.
+        if self._headless:
+            return
+        plt = import_pyplot(self._headless)
         plt.tight_layout()
         plt.show()
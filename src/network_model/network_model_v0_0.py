@@ -11,6 +11,7 @@ import sys
 
 from src.network_model.network_model_interface import NetworkModelInterface
 from src.network_model.adapter import Adapter
+from src.lazy_pyplot import import_pyplot
 
 
 class NetworkModel_V0_0(NetworkModelInterface):
@@ -26,8 +27,8 @@ class NetworkModel_V0_0(NetworkModelInterface):
     - devices have a communication range that determines who they can talk to.
     """
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, headless=False) -> None:
+        super().__init__(headless)
 
     def add_device(self, device_name, device) -> bool:
         """_summary_
@@ -49,6 +50,8 @@ class NetworkModel_V0_0(NetworkModelInterface):
     def generate_network_graph(self, event_timeline) -> dict:
         # Plot event network communication on the graph.
 
+        # The gif is drawn with pyplot, on the backend this model asks for.
+        import_pyplot(self._headless)
         adapter = Adapter(self._devices)
         adapter.create_gif(event_timeline, "network-graph.gif")
 
@@ -0,0 +1,281 @@
+"""_summary_
+@file       benchmark.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Times the application, energy and network models on synthetic
+            fleets of growing size.
+@version    0.0.0
+@date       2022-12-09
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+CWD = os.path.dirname(os.path.abspath(__file__)) + "/../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+from src.network_model.adapter import Adapter
+from src.simulator.workload_generator import generate_sized_workload
+
+MODELS = [
+    "ApplicationModel_V0_0",
+    "ApplicationModel_V0_1",
+    "ApplicationModel_V0_1_heap",
+    "ApplicationModel_V0_1_calendar",
+    "ApplicationModel_V0_1_components",
+    "EnergyModel_V0_1",
+    "NetworkModel_V0_0",
+]
+SIZES = [10, 100, 1000, 10000, 100000]
+# Options of the V0_1 application model, by the suffix of the model name.
+V0_1_OPTIONS = {
+    "heap": {"engine": "heap"},
+    "calendar": {"engine": "calendar"},
+    "components": {"engine": "calendar", "components": True},
+}
+
+
+def _get_workload(num_tasks, workload) -> (list, list):
+    return generate_sized_workload(num_tasks, **workload)
+
+
+def _simulate(devices, engine="heap"):
+    app_model = get_application_model(
+        "ApplicationModel_V0_1", CWD, engine=engine, headless=True
+    )
+    for device in devices:
+        app_model.add_device(device["device_name"], device)
+    return app_model, app_model.generate_event_timeline()
+
+
+def _prepare(model_name, size, workload):
+    """_summary_
+    Builds everything a model needs outside of the timed section.
+
+    Returns:
+        (int, function, function): Number of tasks in the fleet; runs the model
+            and returns the number of events it generated; returns the number
+            of tasks that were started.
+    """
+    devices, supplies = _get_workload(size, workload)
+    num_tasks = sum(
+        len(core) for device in devices for core in device["schedule"].values()
+    )
+
+    if model_name.startswith("ApplicationModel"):
+        if model_name == "ApplicationModel_V0_0":
+            app_model = get_application_model(model_name, CWD, headless=True)
+        else:
+            options = {}
+            for name, name_options in V0_1_OPTIONS.items():
+                if model_name.endswith("_" + name):
+                    options = name_options
+            app_model = get_application_model(
+                "ApplicationModel_V0_1", CWD, headless=True, **options
+            )
+        for device in devices:
+            app_model.add_device(device["device_name"], device)
+
+        def run():
+            return len(app_model.generate_event_timeline())
+
+        return num_tasks, run, lambda: _get_started_tasks(app_model, num_tasks)
+
+    # The other models read the timeline of the V0_1 application model.
+    app_model, event_timeline = _simulate(devices)
+    started_tasks = _get_started_tasks(app_model, num_tasks)
+
+    if model_name == "EnergyModel_V0_1":
+        # The energy model modifies its devices, so it gets its own copies.
+        devices, supplies = _get_workload(size, workload)
+        energy_model = get_energy_model(model_name, CWD, headless=True)
+        for device in devices:
+            energy_model.add_device(device["device_name"], device)
+        for supply in supplies:
+            energy_model.add_energy_supply(supply["supply_name"], supply)
+
+        def run():
+            return len(energy_model.generate_energy_usage(event_timeline))
+
+    elif model_name == "NetworkModel_V0_0":
+        # Only the network timeline is timed; rendering the gif is dominated by
+        # matplotlib and is not a property of the model.
+        def run():
+            adapter = Adapter({device["device_name"]: device for device in devices})
+            return len(adapter.create_timeline(event_timeline))
+
+    else:
+        raise Exception(f"Unknown model {model_name}.")
+
+    return num_tasks, run, lambda: started_tasks
+
+
+def _get_started_tasks(app_model, num_tasks) -> int:
+    report = app_model.get_stall_report()
+    if report is None:
+        return num_tasks
+    return num_tasks - report["pending_tasks"]
+
+
+def run_benchmark(
+    sizes=SIZES,
+    models=MODELS,
+    max_seconds=60.0,
+    measure_memory=True,
+    **workload,
+) -> list:
+    """_summary_
+    Times each model on fleets of about each size. Once a model takes more
+    than max_seconds, it is not run on larger fleets.
+
+    V0_1 discards tasks that start on a device that is still busy, so fleets
+    with several cores per device usually stall early in V0_1 and in the models
+    that read its timeline. started_tasks tells how many tasks were run, and
+    throughput is measured in started tasks. Against
+    ApplicationModel_V0_1_calendar on the same fleets, e.g. in clusters,
+    ApplicationModel_V0_1_components shows what the process pool costs or
+    saves over the calendar engine it runs in each component.
+
+    Args:
+        sizes (list(int), optional): Approximate number of tasks of each fleet.
+        models (list(str), optional): Models to time, from MODELS.
+        max_seconds (float, optional): Time budget of a single run. Defaults to
+            60.
+        measure_memory (bool, optional): Whether to run each model a second
+            time under tracemalloc to record its peak memory. Defaults to True.
+        **workload: Passed on to generate_sized_workload, e.g. topology,
+            cores_per_device or seed.
+
+    Returns:
+        list(dict): One result per model and size:
+            {
+                "model": "ApplicationModel_V0_0",
+                "tasks": 1000,
+                "started_tasks": 1000,
+                "events": 23,
+                "seconds": 0.01,
+                "tasks_per_second": 100000.0,
+                "peak_memory": 123456, <- bytes, None if not measured
+            }
+    """
+    results = []
+    for model_name in models:
+        for size in sizes:
+            num_tasks, run, get_started_tasks = _prepare(model_name, size, workload)
+            start = time.perf_counter()
+            events = run()
+            seconds = time.perf_counter() - start
+
+            peak_memory = None
+            if measure_memory:
+                _, run, _ = _prepare(model_name, size, workload)
+                tracemalloc.start()
+                run()
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            started_tasks = get_started_tasks()
+            results.append(
+                {
+                    "model": model_name,
+                    "tasks": num_tasks,
+                    "started_tasks": started_tasks,
+                    "events": events,
+                    "seconds": seconds,
+                    "tasks_per_second": (
+                        started_tasks / seconds if seconds > 0 else None
+                    ),
+                    "peak_memory": peak_memory,
+                }
+            )
+            if seconds > max_seconds:
+                break
+    return results
+
+
+def save_benchmark(results, history_path, **workload) -> dict:
+    """_summary_
+    Appends a benchmark run to a JSON history file, so that runs on different
+    commits or machines can be compared.
+
+    Args:
+        results (list(dict)): Results of run_benchmark.
+        history_path (str): Path of the history file. Created if missing.
+        **workload: Workload parameters the results were measured with.
+
+    Returns:
+        dict: The run that was appended.
+    """
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path) as fp:
+            history = json.load(fp)
+
+    run = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "workload": workload,
+        "results": results,
+    }
+    history.append(run)
+    with open(history_path, "w") as fp:
+        json.dump(history, fp, indent=4)
+    return run
+
+
+def print_benchmark(results) -> None:
+    print(
+        f"{'model':<34}{'tasks':>9}{'started':>9}{'events':>9}"
+        f"{'seconds':>10}{'tasks/s':>12}{'peak MiB':>10}"
+    )
+    for result in results:
+        peak_memory = result["peak_memory"]
+        peak_memory = "-" if peak_memory is None else f"{peak_memory / 2**20:.1f}"
+        tasks_per_second = result["tasks_per_second"]
+        tasks_per_second = (
+            "-" if tasks_per_second is None else f"{tasks_per_second:.0f}"
+        )
+        print(
+            f"{result['model']:<34}{result['tasks']:>9}{result['started_tasks']:>9}"
+            f"{result['events']:>9}{result['seconds']:>10.3f}{tasks_per_second:>12}"
+            f"{peak_memory:>10}"
+        )
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    parser = argparse.ArgumentParser(description="Benchmark the models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--topology", default="mesh")
+    parser.add_argument("--cores-per-device", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-seconds", type=float, default=60.0)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--history", default="benchmark_history.json")
+    args = parser.parse_args()
+
+    workload = {
+        "topology": args.topology,
+        "cores_per_device": args.cores_per_device,
+        "seed": args.seed,
+    }
+    results = run_benchmark(
+        args.sizes,
+        args.models,
+        args.max_seconds,
+        not args.no_memory,
+        **workload,
+    )
+    print_benchmark(results)
+    save_benchmark(results, args.history, **workload)
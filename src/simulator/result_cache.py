@@ -0,0 +1,134 @@
+"""_summary_
+@file       result_cache.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      On-disk, content-addressed cache of simulation results.
+@version    0.0.0
+@date       2022-12-11
+"""
+
+import gc
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+
+class ResultCache:
+    """_summary_
+    ResultCache stores the results of the application and energy models on
+    disk, keyed by a hash of everything the result depends on. Models take a
+    cache as the `cache` argument and look their result up before simulating.
+
+    Each result is a file in the cache directory. Reading a result refreshes
+    its modification time, and once the directory grows past max_bytes the
+    least recently used results are deleted. Results are written atomically, so
+    a cache directory can be shared by concurrent processes, such as the
+    workers of a sweep.
+    """
+
+    SUFFIX = ".pkl"
+
+    def __init__(self, directory, max_bytes=2**30) -> None:
+        self._directory = directory
+        self._max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, *parts) -> str:
+        """_summary_
+        Hashes the inputs of a result. Parts are serialized as JSON without
+        sorting keys, since the models iterate devices, cores and tasks in
+        insertion order and the order is part of the scenario.
+
+        Args:
+            *parts: JSON serializable inputs, e.g. model name, model version
+                and devices.
+
+        Returns:
+            str: Hex digest of the inputs.
+        """
+        serialized = json.dumps(parts, separators=(",", ":"), default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def _get_path(self, key) -> str:
+        return os.path.join(self._directory, key + self.SUFFIX)
+
+    def get(self, key):
+        """_summary_
+        Args:
+            key (str): Key from get_key.
+
+        Returns:
+            object: The cached result, or None on a miss.
+        """
+        path = self._get_path(key)
+        # Results hold many small containers; the garbage collector would
+        # rescan them over and over while they are loaded.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as fp:
+                result = pickle.load(fp)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return result
+
+    def put(self, key, result) -> bool:
+        """_summary_
+        Stores a result, then evicts the least recently used results until the
+        cache fits in max_bytes.
+
+        Args:
+            key (str): Key from get_key.
+            result (object): Picklable result.
+
+        Returns:
+            bool: False if the result alone is larger than the cache.
+        """
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._max_bytes:
+            return False
+
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(temp_path, self._get_path(key))
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self._directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self._directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, name, stat.st_size))
+            total_bytes += stat.st_size
+
+        entries.sort()
+        for _, name, size in entries:
+            if total_bytes <= self._max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self._directory, name))
+            except OSError:
+                pass
+            total_bytes -= size
+
+    def clear(self) -> None:
+        for name in os.listdir(self._directory):
+            if name.endswith(self.SUFFIX):
+                os.remove(os.path.join(self._directory, name))
+
+    def __len__(self) -> int:
+        return sum(
+            1 for name in os.listdir(self._directory) if name.endswith(self.SUFFIX)
+        )
@@ -0,0 +1,274 @@
+"""_summary_
+@file       sweep.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Runs variants of a scenario over a grid of parameters in a process
+            pool.
+@version    0.0.0
+@date       2022-12-10
+"""
+
+import concurrent.futures
+import copy
+import itertools
+import os
+import sys
+
+CWD = os.path.dirname(os.path.abspath(__file__)) + "/../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+
+# Parameters that can be swept, and the scenario values they replace:
+# - frequency: the frequency of every core.
+# - duration_scale: a factor applied to the duration of every task.
+# - max_supply_current: the maximum current of every energy supply.
+PARAMETERS = ["frequency", "duration_scale", "max_supply_current"]
+
+
+def apply_parameters(devices, supplies, parameters) -> (list, list):
+    """_summary_
+    Creates a variant of a scenario.
+
+    Args:
+        devices (list(dict)): Devices of the scenario.
+        supplies (list(dict)): Energy supplies of the scenario.
+        parameters (dict): Value of each swept parameter, see PARAMETERS.
+
+    Returns:
+        (list(dict), list(dict)): Copies of the devices and supplies with the
+            parameters applied.
+    """
+    devices = copy.deepcopy(devices)
+    supplies = copy.deepcopy(supplies)
+    for parameter, value in parameters.items():
+        match parameter:
+            case "frequency":
+                for device in devices:
+                    for core in device["cores"].values():
+                        core["frequency"] = value
+            case "duration_scale":
+                for device in devices:
+                    for core in device["schedule"].values():
+                        # Tasks of a periodic schedule are shared by all of
+                        # its iterations.
+                        for task in getattr(core, "period", core):
+                            task["duration"] = task["duration"] * value
+            case "max_supply_current":
+                for supply in supplies:
+                    supply["max_supply_current"] = value
+            case _:
+                raise Exception(f"Unknown sweep parameter {parameter}.")
+    return devices, supplies
+
+
+def summarize(app_model, energy_usage, energy_model) -> dict:
+    """_summary_
+    Reduces a simulation to the metrics reported by a sweep.
+
+    Args:
+        app_model (ApplicationModelInterface): Application model after
+            generate_event_timeline().
+        energy_usage (EnergyUsage): Energy usage of the same run.
+        energy_model (EnergyModelInterface): Energy model that generated it.
+
+    Returns:
+        dict: makespan (end of the last timeline entry), total_energy (energy
+            usage of every consumer weighted by entry duration, including
+            skipped hyperperiods), peak_power (largest summed usage of all
+            devices in a single entry), overload_time (time each supply spent
+            above supply_voltage * max_supply_current, summed over supplies,
+            see EnergyModelInterface.get_overloads()), utilization (mean core
+            utilization) and stall (reason the run stopped early, or None).
+    """
+    hyperperiod = app_model.get_hyperperiod()
+    total_energy = sum(energy_model.get_total_energy(hyperperiod).values())
+    power = energy_usage.power().sum(axis=1)
+    peak_power = float(power.max()) if len(power) > 0 else 0.0
+
+    overload_time = sum(
+        overload["end"] - overload["start"]
+        for overload in energy_model.get_overloads(hyperperiod)
+    )
+
+    core_utilization = app_model.core_utilization()
+    report = app_model.get_stall_report()
+    return {
+        "makespan": app_model.get_makespan(),
+        "total_energy": total_energy,
+        "peak_power": peak_power,
+        "overload_time": overload_time,
+        "utilization": (
+            float(core_utilization.mean()) if len(core_utilization) > 0 else 0.0
+        ),
+        "stall": None if report is None else report["reason"],
+    }
+
+
+def run_variant(
+    devices,
+    supplies,
+    parameters,
+    application_model="ApplicationModel_V0_1",
+    energy_model="EnergyModel_V0_1",
+    model_kwargs=None,
+    network_output=None,
+    cache=None,
+) -> dict:
+    """_summary_
+    Simulates one variant of a scenario headless: application model, then
+    energy model, then optionally the network model.
+
+    Args:
+        devices (list(dict)): Devices of the scenario.
+        supplies (list(dict)): Energy supplies of the scenario.
+        parameters (dict): Value of each swept parameter, see PARAMETERS.
+        application_model (str, optional): Application model name.
+        energy_model (str, optional): Energy model name.
+        model_kwargs (dict, optional): Extra arguments of the application
+            model, e.g. engine or max_time.
+        network_output (str, optional): Directory to render the network graph
+            gif to. The network model is skipped if None.
+        cache (ResultCache, optional): Result cache shared by the application
+            and energy models, e.g. across sweeps. Defaults to None.
+
+    Returns:
+        dict: The parameters followed by the metrics of summarize().
+    """
+    devices, supplies = apply_parameters(devices, supplies, parameters)
+
+    app_model = get_application_model(
+        application_model, CWD, headless=True, cache=cache, **(model_kwargs or {})
+    )
+    for device in devices:
+        app_model.add_device(device["device_name"], device)
+    event_timeline = app_model.generate_event_timeline()
+
+    # The energy model modifies its devices, so it gets its own copies.
+    energy = get_energy_model(energy_model, CWD, headless=True, cache=cache)
+    for device in copy.deepcopy(devices):
+        energy.add_device(device["device_name"], device)
+    for supply in supplies:
+        energy.add_energy_supply(supply["supply_name"], supply)
+    energy_usage = energy.generate_energy_usage(event_timeline)
+
+    row = dict(parameters)
+    row.update(summarize(app_model, energy_usage, energy))
+
+    row["network_output"] = None
+    if network_output is not None:
+        from src.network_model.network_model_v0_0 import NetworkModel_V0_0
+
+        network_model = NetworkModel_V0_0(headless=True)
+        for device in devices:
+            network_model.add_device(device["device_name"], device)
+
+        # The network model writes to the working directory.
+        os.makedirs(network_output, exist_ok=True)
+        cwd = os.getcwd()
+        os.chdir(network_output)
+        try:
+            network_model.generate_network_graph(event_timeline)
+        finally:
+            os.chdir(cwd)
+        row["network_output"] = os.path.join(network_output, "network-graph.gif")
+    return row
+
+
+def get_variants(grid) -> list:
+    """_summary_
+    Args:
+        grid (dict(list)): Values of each swept parameter.
+
+    Returns:
+        list(dict): Every combination of parameter values, the first parameter
+            of the grid changing slowest.
+    """
+    names = list(grid.keys())
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*[grid[name] for name in names])
+    ]
+
+
+def run_sweep(
+    devices,
+    supplies,
+    grid,
+    processes=None,
+    network=None,
+    output_dir="sweep",
+    **kwargs,
+) -> list:
+    """_summary_
+    Runs every variant of a scenario in a process pool.
+
+    Args:
+        devices (list(dict)): Devices of the base scenario.
+        supplies (list(dict)): Energy supplies of the base scenario.
+        grid (dict(list)): Values of each swept parameter, see PARAMETERS.
+        processes (int, optional): Number of worker processes. Defaults to the
+            number of CPUs. With 1, variants run in this process.
+        network (bool | function, optional): Which variants render the network
+            graph: all of them if True, none if None or False, or those for
+            which network(parameters) is True. Defaults to None.
+        output_dir (str, optional): Directory of the network outputs; each
+            variant renders to output_dir/variant_<index>. Defaults to "sweep".
+        **kwargs: Passed on to run_variant, e.g. application_model or
+            model_kwargs.
+
+    Returns:
+        list(dict): One row per variant, in grid order, with the variant index,
+            its parameters and its metrics.
+    """
+    variants = get_variants(grid)
+
+    jobs = []
+    for idx, parameters in enumerate(variants):
+        render = network(parameters) if callable(network) else bool(network)
+        network_output = None
+        if render:
+            network_output = os.path.abspath(os.path.join(output_dir, f"variant_{idx}"))
+        jobs.append((parameters, network_output))
+
+    if processes == 1:
+        rows = [
+            run_variant(devices, supplies, parameters, network_output=output, **kwargs)
+            for parameters, output in jobs
+        ]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            futures = [
+                executor.submit(
+                    run_variant,
+                    devices,
+                    supplies,
+                    parameters,
+                    network_output=output,
+                    **kwargs,
+                )
+                for parameters, output in jobs
+            ]
+            rows = [future.result() for future in futures]
+
+    return [{"variant": idx, **row} for idx, row in enumerate(rows)]
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    from src.simulator.workload_generator import generate_workload
+
+    devices, supplies = generate_workload(num_devices=8, cores_per_device=1)
+    rows = run_sweep(
+        devices,
+        supplies,
+        {
+            "frequency": [1, 2, 4],
+            "duration_scale": [1, 2],
+            "max_supply_current": [1.0, 5.0],
+        },
+    )
+    for row in rows:
+        print(row)
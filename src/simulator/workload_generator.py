@@ -0,0 +1,249 @@
+"""_summary_
+@file       workload_generator.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Generates synthetic device fleets for the application, energy and
+            network models.
+@version    0.0.0
+@date       2022-12-09
+"""
+
+import math
+import random
+import sys
+
+TOPOLOGIES = ["ring", "star", "mesh", "sensor_hub", "clusters"]
+
+# Tasks only consume outputs of tasks at most this many levels above them.
+DEPENDENCY_WINDOW = 4
+
+# Devices per ring of the clusters topology.
+CLUSTER_SIZE = 4
+
+
+def get_producers(topology, num_devices) -> list:
+    """_summary_
+    Lists, for each device, the other devices whose outputs it may consume.
+    - ring: each device consumes from the previous device.
+    - star: device 0 is the hub; the hub and the leaves consume from each
+      other.
+    - mesh: devices sit on a square grid and consume from their 4 neighbors.
+    - sensor_hub: device 0 consumes from every sensor; sensors only consume
+      their own outputs.
+    - clusters: independent rings of CLUSTER_SIZE devices (the last one may be
+      smaller) that never exchange outputs.
+
+    Args:
+        topology (str): One of TOPOLOGIES.
+        num_devices (int): Number of devices in the fleet.
+
+    Returns:
+        list(list(int)): Producer devices of each device.
+    """
+    match topology:
+        case "ring":
+            if num_devices == 1:
+                return [[]]
+            return [[(idx - 1) % num_devices] for idx in range(num_devices)]
+        case "star":
+            return [list(range(1, num_devices))] + [[0]] * (num_devices - 1)
+        case "mesh":
+            width = math.ceil(math.sqrt(num_devices))
+            producers = []
+            for idx in range(num_devices):
+                row, col = divmod(idx, width)
+                neighbors = []
+                if col > 0:
+                    neighbors.append(idx - 1)
+                if col < width - 1 and idx + 1 < num_devices:
+                    neighbors.append(idx + 1)
+                if row > 0:
+                    neighbors.append(idx - width)
+                if idx + width < num_devices:
+                    neighbors.append(idx + width)
+                producers.append(neighbors)
+            return producers
+        case "sensor_hub":
+            return [list(range(1, num_devices))] + [[]] * (num_devices - 1)
+        case "clusters":
+            producers = []
+            for idx in range(num_devices):
+                first = idx - idx % CLUSTER_SIZE
+                size = min(CLUSTER_SIZE, num_devices - first)
+                if size == 1:
+                    producers.append([])
+                else:
+                    producers.append([first + (idx - first - 1) % size])
+            return producers
+        case _:
+            raise Exception(f"Unknown topology {topology}.")
+
+
+def generate_workload(
+    num_devices=4,
+    cores_per_device=2,
+    tasks_per_core=8,
+    topology="ring",
+    fan_in=2,
+    fan_out=2,
+    cross_device_density=0.25,
+    max_duration=5,
+    frequencies=(1, 2),
+    peripherals_per_core=1,
+    num_supplies=1,
+    seed=0,
+) -> (list, list):
+    """_summary_
+    Generates a device fleet whose tasks form a DAG. Tasks are created level by
+    level (the n-th task of every core is on level n) and only depend on
+    outputs of tasks on earlier levels, so the schedule can always run to
+    completion (in V0_1, only with one core per device, since it discards tasks
+    that start on a busy device). Each output is sent to a device at most
+    once per consumer, so no two tasks compete for the same copy of an output.
+
+    Devices have the fields used by all three models: cores with a frequency
+    and active/idle energy, peripherals with active/idle energy, a schedule
+    and a supply id. Each core owns its peripherals, so two cores never use
+    the same hardware at the same time.
+
+    Args:
+        num_devices (int, optional): Number of devices. Defaults to 4.
+        cores_per_device (int, optional): Cores per device. Defaults to 2.
+        tasks_per_core (int, optional): Tasks per core. Defaults to 8.
+        topology (str, optional): Which devices exchange outputs, one of
+            TOPOLOGIES. Defaults to "ring".
+        fan_in (int, optional): Maximum dependencies per task. Defaults to 2.
+        fan_out (int, optional): Maximum devices each output is sent to.
+            Defaults to 2.
+        cross_device_density (float, optional): Probability that a dependency
+            comes from another device. Defaults to 0.25.
+        max_duration (int, optional): Maximum task duration in cycles.
+            Defaults to 5.
+        frequencies (tuple(int), optional): Core frequencies to pick from.
+            Defaults to (1, 2).
+        peripherals_per_core (int, optional): Peripherals owned by each core.
+            Defaults to 1.
+        num_supplies (int, optional): Energy supplies shared round robin by the
+            devices. Defaults to 1.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        (list(dict), list(dict)): Devices and energy supplies. Each call returns
+            new dicts, since the energy model modifies the devices it is given.
+    """
+    rng = random.Random(seed)
+    producers = get_producers(topology, num_devices)
+
+    devices = []
+    for device_idx in range(num_devices):
+        cores = {}
+        peripherals = {}
+        for core_idx in range(cores_per_device):
+            cores[f"core_{core_idx}"] = {
+                "frequency": rng.choice(frequencies),
+                "active_energy": rng.randint(10, 30),
+                "idle_energy": rng.randint(1, 5),
+            }
+            for peripheral_idx in range(peripherals_per_core):
+                peripherals[f"hw_{core_idx}_{peripheral_idx}"] = {
+                    "active_energy": rng.randint(1, 10),
+                    "idle_energy": rng.randint(0, 2),
+                }
+        devices.append(
+            {
+                "device_name": f"device_{device_idx}",
+                "cores": cores,
+                "peripherals": peripherals,
+                "schedule": {core_id: [] for core_id in cores},
+                "supply_id": f"supply_{device_idx % num_supplies}",
+            }
+        )
+
+    for level in range(tasks_per_core):
+        for device_idx, device in enumerate(devices):
+            for core_idx in range(cores_per_device):
+                task = {
+                    "task_name": f"task_{device_idx}_{core_idx}_{level}",
+                    "duration": rng.randint(1, max_duration),
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [
+                        f"hw_{core_idx}_{peripheral_idx}"
+                        for peripheral_idx in range(peripherals_per_core)
+                        if rng.random() < 0.5
+                    ],
+                }
+                if level > 0:
+                    for _ in range(rng.randint(0, fan_in)):
+                        source_idx = device_idx
+                        if (
+                            len(producers[device_idx]) > 0
+                            and rng.random() < cross_device_density
+                        ):
+                            source_idx = rng.choice(producers[device_idx])
+                        source_core = rng.randrange(cores_per_device)
+                        source_level = rng.randrange(
+                            max(0, level - DEPENDENCY_WINDOW), level
+                        )
+                        source = devices[source_idx]["schedule"][f"core_{source_core}"][
+                            source_level
+                        ]
+
+                        output_id = f"output_{source_idx}_{source_core}_{source_level}"
+                        output_targets = source["outputs"].get(output_id, [])
+                        if device["device_name"] in output_targets:
+                            continue
+                        if len(output_targets) >= fan_out:
+                            continue
+                        source["outputs"][output_id] = output_targets + [
+                            device["device_name"]
+                        ]
+                        task["dependencies"].append(output_id)
+                device["schedule"][f"core_{core_idx}"].append(task)
+
+    supplies = [
+        {
+            "supply_name": f"supply_{supply_idx}",
+            "supply_voltage": 5.0,
+            "max_supply_current": 5.0,
+        }
+        for supply_idx in range(num_supplies)
+    ]
+    return devices, supplies
+
+
+def generate_sized_workload(num_tasks, topology="mesh", seed=0, **kwargs):
+    """_summary_
+    Generates a fleet with about num_tasks tasks, growing the number of devices
+    and the number of tasks per core together.
+
+    Args:
+        num_tasks (int): Approximate number of tasks.
+        topology (str, optional): One of TOPOLOGIES. Defaults to "mesh".
+        seed (int, optional): Random seed. Defaults to 0.
+        **kwargs: Passed on to generate_workload.
+
+    Returns:
+        (list(dict), list(dict)): Devices and energy supplies.
+    """
+    cores_per_device = kwargs.pop("cores_per_device", 2)
+    num_devices = max(2, round(math.sqrt(num_tasks / cores_per_device)))
+    tasks_per_core = max(1, round(num_tasks / (num_devices * cores_per_device)))
+    return generate_workload(
+        num_devices=num_devices,
+        cores_per_device=cores_per_device,
+        tasks_per_core=tasks_per_core,
+        topology=topology,
+        seed=seed,
+        **kwargs,
+    )
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    import json
+
+    devices, supplies = generate_workload(num_devices=3, tasks_per_core=3)
+    print(json.dumps(devices, indent=4))
+    print(json.dumps(supplies, indent=4))
@@ -0,0 +1,100 @@
+"""_summary_
+@file       test_app_model_calendar_engine.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the V0_1 calendar engine and its calendar queue.
+@version    0.0.0
+@data       2022-12-16
+"""
+
+import heapq
+import random
+import sys
+
+sys.path.append("../../")
+
+from src.application_model.application_model_interface import get_application_model
+from src.application_model.calendar_queue import CalendarQueue
+from src.simulator.workload_generator import generate_workload
+
+
+def task(task_name, duration):
+    return {
+        "task_name": task_name,
+        "duration": duration,
+        "dependencies": [],
+        "outputs": {},
+        "hw": [],
+    }
+
+
+def generate(devices, engine, **kwargs):
+    model = get_application_model(
+        "ApplicationModel_V0_1", "../../", headless=True, engine=engine, **kwargs
+    )
+    for device in devices:
+        model.add_device(device["device_name"], device)
+    return model.generate_event_timeline()
+
+
+def test_calendar_queue():
+    rng = random.Random(0)
+    queue = CalendarQueue()
+    heap = []
+    now = 0
+    for _ in range(2000):
+        for _ in range(rng.randint(0, 3)):
+            tick = now + rng.choice([0, 1, 2, 50, 5000])
+            queue.push(tick, len(heap))
+            heapq.heappush(heap, (tick, len(heap)))
+        if len(heap) > 0:
+            now, items = queue.pop()
+            expected = []
+            while len(heap) > 0 and heap[0][0] == now:
+                expected.append(heapq.heappop(heap)[1])
+            assert sorted(items) == expected
+        assert len(queue) == len(heap)
+
+
+def test_calendar_engine_matches_step_engine():
+    for seed in range(5):
+        devices, _ = generate_workload(
+            num_devices=4, cores_per_device=2, frequencies=(1,), seed=seed
+        )
+        step_timeline = generate(devices, "step")
+        assert generate(devices, "calendar") == step_timeline
+
+
+def test_calendar_engine_ticks():
+    devices = [
+        {
+            "device_name": "device_0",
+            "cores": {"core_0": {"frequency": 2}},
+            "schedule": {"core_0": [task("task_A", 3)]},
+        },
+        {
+            "device_name": "device_1",
+            "cores": {"core_0": {"frequency": 3}},
+            "schedule": {"core_0": [task("task_B", 3), task("task_C", 3)]},
+        },
+    ]
+
+    # One tick is 1/6: task_A takes 9 ticks, task_B and task_C 6 each.
+    timeline = generate(devices, "calendar")
+    assert [entry["timestamp"] for entry in timeline] == [0, 1.0, 1.5]
+    assert [entry["duration"] for entry in timeline] == [1.0, 0.5, 0.5]
+    assert timeline[1]["devices"]["device_0"]["cores"] == {"core_0": "task_A"}
+    assert timeline[1]["devices"]["device_1"]["cores"] == {"core_0": "task_C"}
+
+    # A tick of 1 rounds task_A up to 2, so it ends with task_C.
+    timeline = generate(devices, "calendar", tick=1)
+    assert [entry["timestamp"] for entry in timeline] == [0, 1.0]
+    assert [entry["duration"] for entry in timeline] == [1.0, 1.0]
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_calendar_queue()
+    test_calendar_engine_matches_step_engine()
+    test_calendar_engine_ticks()
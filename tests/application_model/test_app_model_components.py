@@ -0,0 +1,156 @@
+"""_summary_
+@file       test_app_model_components.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that simulating independent device groups separately matches
+            a single run of the fleet.
+@version    0.0.0
+@data       2022-12-17
+"""
+
+import sys
+
+import numpy as np
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from device_components import get_components, merge_timelines
+from event_timeline import EventTimeline
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.workload_generator import generate_workload
+
+
+def generate(devices, **kwargs):
+    model = get_application_model(
+        "ApplicationModel_V0_1", "../../", headless=True, **kwargs
+    )
+    for device in devices:
+        model.add_device(device["device_name"], device)
+    return model, model.generate_event_timeline()
+
+
+def generate_fleet(seed, engine, max_duration):
+    # Lone devices, or clusters of them, of which a few keep a second core,
+    # which couples their component to the entries of the others. The step
+    # and heap engines only split the other components at a frequency of 1.
+    devices, _ = generate_workload(
+        num_devices=10 + seed,
+        cores_per_device=2,
+        tasks_per_core=12,
+        topology="clusters" if seed % 2 == 1 else "ring",
+        cross_device_density=0.25 if seed % 2 == 1 else 0.0,
+        max_duration=max_duration,
+        frequencies=(1,) if engine != "calendar" and seed < 3 else (1, 2, 3),
+        seed=seed,
+    )
+    removed = set()
+    for idx, device in enumerate(devices):
+        if idx not in [0, 2 + seed]:
+            removed.update(
+                output_id
+                for task in device["schedule"]["core_1"]
+                for output_id in task["outputs"]
+            )
+            device["schedule"]["core_1"] = []
+    for device in devices:
+        for task in device["schedule"]["core_0"] + device["schedule"]["core_1"]:
+            task["dependencies"] = [
+                output_id
+                for output_id in task["dependencies"]
+                if output_id not in removed
+            ]
+    return devices
+
+
+def test_get_components():
+    devices, _ = generate_workload(num_devices=10, topology="clusters")
+    components = get_components({device["device_name"]: device for device in devices})
+    assert components == [
+        ["device_0", "device_1", "device_2", "device_3"],
+        ["device_4", "device_5", "device_6", "device_7"],
+        ["device_8", "device_9"],
+    ]
+
+
+def test_merge_timelines():
+    def get_entry(timestamp, duration, device_id, task_name, outputs):
+        return {
+            "timestamp": timestamp,
+            "duration": duration,
+            "devices": {device_id: {"cores": {"core_0": task_name}, "hw": []}},
+            "cache": outputs,
+        }
+
+    timeline_0 = EventTimeline()
+    timeline_0.append(get_entry(0, 1.0, "a", "A0", [{"a0": ["a"]}]))
+    timeline_0.append(get_entry(1.0, 2.0, "a", "A1", [{"a1": []}]))
+    timeline_1 = EventTimeline()
+    timeline_1.append(get_entry(0, 3.0, "b", "B0", [{"b0": ["b"]}]))
+    timeline_1.append(get_entry(3.0, 1.0, "b", "B1", [{"b1": []}]))
+
+    event_timeline = EventTimeline()
+    merge_timelines(
+        event_timeline,
+        [timeline_0, timeline_1],
+        [np.array([1.0, 3.0]), np.array([3.0, 4.0])],
+        [
+            (np.array([0, 0]), np.array([0.0, 1.0])),
+            (np.array([1, 1]), np.array([0.0, 3.0])),
+        ],
+        [["a"], ["b"]],
+    )
+    assert [(event["timestamp"], event["duration"]) for event in event_timeline] == [
+        (0, 1.0),
+        (1.0, 2.0),
+        (3.0, 1.0),
+    ]
+    assert [event["devices"] for event in event_timeline] == [
+        {
+            "a": {"cores": {"core_0": "A0"}, "hw": []},
+            "b": {"cores": {"core_0": "B0"}, "hw": []},
+        },
+        {
+            "a": {"cores": {"core_0": "A1"}, "hw": []},
+            "b": {"cores": {"core_0": "B0"}, "hw": []},
+        },
+        {"a": {"cores": {}, "hw": []}, "b": {"cores": {"core_0": "B1"}, "hw": []}},
+    ]
+    # B0 started before A1, so a single run completes it first.
+    assert [event["cache"] for event in event_timeline] == [
+        [{"a0": ["a"]}],
+        [{"b0": ["b"]}, {"a1": []}],
+        [{"b1": []}],
+    ]
+
+
+def test_components_match_single_run():
+    for engine in ["step", "heap", "calendar"]:
+        for seed in range(4):
+            for max_duration in [3, 6]:
+                devices = generate_fleet(seed, engine, max_duration)
+                model, event_timeline = generate(devices, engine=engine)
+                component_model, component_timeline = generate(
+                    devices, engine=engine, components=True, processes=1
+                )
+                assert component_timeline == event_timeline
+                assert component_model.get_makespan() == model.get_makespan()
+                assert component_model.get_stall_report() == model.get_stall_report()
+
+    for engine in ["step", "calendar"]:
+        devices = generate_fleet(1, engine, 6)
+        for max_time in [None, 9, 17.5]:
+            model, event_timeline = generate(devices, engine=engine, max_time=max_time)
+            component_model, component_timeline = generate(
+                devices, engine=engine, max_time=max_time, components=True, processes=2
+            )
+            assert component_timeline == event_timeline
+            assert component_model.get_stall_report() == model.get_stall_report()
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_get_components()
+    test_merge_timelines()
+    test_components_match_single_run()
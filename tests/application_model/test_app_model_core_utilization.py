@@ -0,0 +1,79 @@
+"""_summary_
+@file       test_app_model_core_utilization.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that core utilization is weighted by the duration of each
+            timeline entry.
+@version    0.0.0
+@data       2022-12-07
+"""
+
+import sys
+
+sys.path.append("../../")
+
+import numpy as np
+
+from src.application_model.application_model_interface import get_application_model
+
+DEVICES = [
+    {
+        "device_name": "device_0",
+        "cores": {"core_0": {"frequency": 1}, "core_1": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "task_A",
+                    "duration": 1,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                },
+            ],
+            "core_1": [
+                {
+                    "task_name": "task_B",
+                    "duration": 4,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                },
+            ],
+        },
+    },
+]
+
+
+def generate(model_name):
+    app_model = get_application_model(model_name, "../../", headless=True)
+    for device in DEVICES:
+        app_model.add_device(device["device_name"], device)
+    app_model.generate_event_timeline()
+    return app_model
+
+
+def test_core_utilization_is_time_weighted():
+    app_model = generate("ApplicationModel_V0_1")
+    assert app_model.get_cores() == [("device_0", "core_0"), ("device_0", "core_1")]
+    assert np.allclose(app_model.core_utilization(), [0.25, 1.0])
+
+    core_utilization = app_model.get_devices()["device_0"]["core_utilization"]
+    assert core_utilization["core_0"] == [1.0, 4.0]
+
+    # V0_0 runs every task for a single cycle.
+    app_model = generate("ApplicationModel_V0_0")
+    assert np.allclose(app_model.core_utilization(), [1.0, 1.0])
+
+
+def test_core_utilization_window():
+    app_model = generate("ApplicationModel_V0_1")
+    assert np.allclose(app_model.core_utilization(0, 2), [0.5, 1.0])
+    assert np.allclose(app_model.core_utilization(1, 3), [0.0, 1.0])
+    assert np.allclose(app_model.core_utilization(5, 5), [0.0, 0.0])
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_core_utilization_is_time_weighted()
+    test_core_utilization_window()
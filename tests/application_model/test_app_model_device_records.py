@@ -0,0 +1,160 @@
+"""_summary_
+@file       test_app_model_device_records.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that V0_1 validates devices when they are added and runs on
+            their compiled records.
+@version    0.0.0
+@data       2022-12-19
+"""
+
+import copy
+import gc
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from device_records import compile_device
+from event_timeline import SymbolTable
+from periodic_schedule import PeriodicSchedule
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.result_cache import ResultCache
+from src.simulator.workload_generator import generate_sized_workload
+
+
+def task(task_name, duration, dependencies, outputs):
+    return {
+        "task_name": task_name,
+        "duration": duration,
+        "dependencies": dependencies,
+        "outputs": outputs,
+        "hw": ["adc_0"],
+    }
+
+
+def get_device():
+    return {
+        "cores": {"core_0": {"frequency": 2}, "core_1": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                task("task_A", 1, [], {"output_0": ["device_0", "device_0"]}),
+                task("task_B", 2, ["output_0", "output_0", "output_1"], {}),
+            ],
+            "core_1": PeriodicSchedule([task("task_C", 1, [], {})], 3),
+        },
+        "cache": ["output_1"],
+    }
+
+
+def test_compile_device():
+    symbols = SymbolTable()
+    device = compile_device(get_device(), symbols)
+    assert [core.id for core in device.cores] == ["core_0", "core_1"]
+    assert [core.frequency for core in device.cores] == [2, 1]
+    assert device.cache == [symbols.index("output_1")]
+
+    task_A, task_B = device.cores[0].tasks
+    output_0 = symbols.index("output_0")
+    output_1 = symbols.index("output_1")
+    assert task_A.sends == (("device_0", output_0), ("device_0", output_0))
+    assert task_B.dependencies == (output_0, output_0, output_1)
+    assert task_B.needs == ((output_0, 2), (output_1, 1))
+    assert task_B.outputs == {} and task_B.hw == ["adc_0"]
+
+    # The period is compiled once and repeated like the task dicts.
+    tasks = device.cores[1].tasks
+    assert len(tasks) == 3 and tasks[0] is tasks[2]
+
+
+def test_add_device_validates():
+    model = get_application_model("ApplicationModel_V0_1", "../../", headless=True)
+    for edit in [
+        lambda device: device.pop("schedule"),
+        lambda device: device["cores"]["core_1"].update(frequency=0),
+        lambda device: device["schedule"]["core_0"][0].pop("hw"),
+        lambda device: device["schedule"]["core_0"][1].update(duration=-1),
+    ]:
+        device = get_device()
+        edit(device)
+        try:
+            model.add_device("device_0", device)
+            assert False
+        except Exception as e:
+            assert "device_0" in str(e)
+    assert model.get_devices() == {}
+
+
+def test_edits_recompile():
+    def generate(device, **kwargs):
+        model = get_application_model(
+            "ApplicationModel_V0_1", "../../", headless=True, **kwargs
+        )
+        model.add_device("device_0", device)
+        return model, model.generate_event_timeline()
+
+    device = get_device()
+    model, event_timeline = generate(device, snapshot_interval=1)
+    assert [entry["duration"] for entry in event_timeline] == [0.5, 0.5, 1, 1]
+
+    # The records of the device are compiled again for the reported edit.
+    device["schedule"]["core_0"][0]["duration"] = 3
+    assert model.update_event_timeline([("device_0", "core_0", 0)]) == 0
+    _, edited_timeline = generate(copy.deepcopy(device))
+    assert [entry["duration"] for entry in event_timeline] == [1, 1, 1]
+    assert event_timeline == edited_timeline
+
+    # Edits made after the device was added take effect in the next run, and
+    # the timeline is cached under the edited schedule.
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(2):
+            model = get_application_model(
+                "ApplicationModel_V0_1",
+                "../../",
+                headless=True,
+                cache=ResultCache(directory),
+            )
+            device = get_device()
+            model.add_device("device_0", device)
+            device["schedule"]["core_0"][0]["duration"] = 3
+            assert model.generate_event_timeline() == edited_timeline
+
+
+def test_record_memory():
+    def get_allocated(function):
+        gc.collect()
+        tracemalloc.start()
+        result = function()
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, allocated
+
+    # Warm up the imports first.
+    compile_device(get_device(), SymbolTable())
+    (devices, _), dict_memory = get_allocated(
+        lambda: generate_sized_workload(10000, cores_per_device=1)
+    )
+    num_tasks = sum(
+        len(core) for device in devices for core in device["schedule"].values()
+    )
+
+    def compile_devices():
+        symbols = SymbolTable()
+        return [compile_device(device, symbols) for device in devices]
+
+    _, record_memory = get_allocated(compile_devices)
+    # The records come on top of the dicts, which the model keeps.
+    assert 0 < record_memory / num_tasks < 450
+    assert record_memory < dict_memory
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_compile_device()
+    test_add_device_validates()
+    test_edits_recompile()
+    test_record_memory()
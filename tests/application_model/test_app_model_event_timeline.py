@@ -0,0 +1,110 @@
+"""_summary_
+@file       test_app_model_event_timeline.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that the columnar event timeline round trips timeline entries
+            and exposes them as arrays.
+@version    0.0.0
+@data       2022-12-05
+"""
+
+import sys
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from event_timeline import EventTimeline
+
+EVENT_TIMELINE = [
+    {
+        "timestamp": 0,
+        "duration": 1.0,
+        "devices": {
+            "device_0": {"cores": {"core_0": "task_A"}, "hw": ["adc_0"]},
+            "device_1": {"cores": {"core_0": "task_AA"}, "hw": []},
+        },
+        "cache": [{"output_0": ["device_0"]}, {}],
+    },
+    {
+        "timestamp": 1.0,
+        "duration": 2.5,
+        "devices": {
+            "device_1": {"cores": {"core_0": "task_AA"}, "hw": []},
+            "device_0": {
+                "cores": {"core_0": "task_B", "core_1": "task_A"},
+                "hw": ["comm_0", "adc_0"],
+            },
+        },
+        "cache": [{"output_1": ["device_1", "device_0"], "output_2": []}],
+    },
+    {
+        "timestamp": 3.5,
+        "duration": 1.0,
+        "devices": {"device_0": {"cores": {}, "hw": []}},
+        "cache": [],
+    },
+]
+
+
+def test_event_timeline_round_trip():
+    timeline = EventTimeline()
+    for entry in EVENT_TIMELINE:
+        timeline.append(entry)
+
+    assert len(timeline) == len(EVENT_TIMELINE)
+    assert timeline == EVENT_TIMELINE
+    assert list(timeline) == EVENT_TIMELINE
+    assert timeline[-1] == EVENT_TIMELINE[-1]
+    assert isinstance(timeline[0]["timestamp"], int)
+    assert isinstance(timeline[1]["timestamp"], float)
+
+
+def test_event_timeline_columns():
+    timeline = EventTimeline()
+    for entry in EVENT_TIMELINE:
+        timeline.append(entry)
+    names = timeline.symbols
+
+    assert timeline.timestamp.tolist() == [0.0, 1.0, 3.5]
+    assert timeline.duration.tolist() == [1.0, 2.5, 1.0]
+    assert timeline.task_entry.tolist() == [0, 0, 1, 1, 1]
+    assert [names[idx] for idx in timeline.task_device] == [
+        "device_0",
+        "device_1",
+        "device_1",
+        "device_0",
+        "device_0",
+    ]
+    assert [names[idx] for idx in timeline.task] == [
+        "task_A",
+        "task_AA",
+        "task_AA",
+        "task_B",
+        "task_A",
+    ]
+    # Every name is stored once.
+    assert len(names) == len(set(names.names))
+    assert names.index("task_A") == timeline.task[0]
+
+
+def test_event_timeline_column_cache():
+    timeline = EventTimeline()
+    timeline.append(EVENT_TIMELINE[0])
+    task_entry = timeline.task_entry
+
+    # Columns are copied once, and copied again once the timeline changes.
+    assert timeline.task_entry is task_entry
+    assert not task_entry.flags.writeable
+    timeline.append(EVENT_TIMELINE[1])
+    assert task_entry.tolist() == [0, 0]
+    assert timeline.task_entry.tolist() == [0, 0, 1, 1, 1]
+    timeline.truncate(1)
+    assert timeline.task_entry.tolist() == [0, 0]
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_event_timeline_round_trip()
+    test_event_timeline_columns()
+    test_event_timeline_column_cache()
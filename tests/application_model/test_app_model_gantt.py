@@ -0,0 +1,131 @@
+"""_summary_
+@file       test_app_model_gantt.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the bars and labels of the event timeline Gantt chart.
+@version    0.0.0
+@data       2022-12-06
+"""
+
+import math
+import sys
+
+sys.path.append("../../")
+
+from src.application_model.application_model_interface import get_application_model
+
+DEVICES = [
+    {
+        "device_name": "device_0",
+        "cores": {"core_0": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "task_A",
+                    "duration": 1,
+                    "dependencies": [],
+                    "outputs": {"output_0": ["device_1"]},
+                    "hw": [],
+                },
+                {
+                    "task_name": "task_B",
+                    "duration": 3,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                },
+            ]
+        },
+    },
+    {
+        "device_name": "device_1",
+        "cores": {"core_0": {"frequency": 1}, "core_1": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "task_C",
+                    "duration": 2,
+                    "dependencies": ["output_0"],
+                    "outputs": {},
+                    "hw": [],
+                }
+            ],
+            # Too short to be labeled.
+            "core_1": [
+                {
+                    "task_name": "task_D",
+                    "duration": 0.01,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                }
+            ],
+        },
+    },
+]
+
+
+def plot(labels=True, max_labels=None):
+    model = get_application_model("ApplicationModel_V0_1", "../../", headless=True)
+    for device in DEVICES:
+        model.add_device(device["device_name"], dict(device))
+    model.generate_event_timeline()
+    if max_labels is not None:
+        model.MAX_LABELS = max_labels
+    model._plot_event_timeline(labels)
+    return model._ax
+
+
+def get_bars(collection):
+    # (start, duration, bottom) of each bar of a broken_barh collection.
+    bars = []
+    for path in collection.get_paths():
+        (x0, y0), (x1, _) = path.vertices[0], path.vertices[2]
+        bars.append((round(x0, 6), round(x1 - x0, 6), y0))
+    return bars
+
+
+def test_gantt_bars():
+    ax = plot()
+    labels = [label.get_text() for label in ax.get_yticklabels()]
+    assert labels == ["device_1_core_1", "device_1_core_0", "device_0_core_0"]
+
+    # One artist per core, with one bar per timeline entry the core was busy.
+    assert len(ax.collections) == 3
+    bars = [get_bars(collection) for collection in ax.collections]
+    assert bars[0] == [(0.0, 0.01, 2.0)]
+    assert bars[1] == [(1.0, 2.0, 12.0)]
+    assert bars[2] == [
+        (0.0, 0.01, 22.0),
+        (0.01, 0.99, 22.0),
+        (1.0, 2.0, 22.0),
+        (3.0, 1.0, 22.0),
+    ]
+
+    # Bars of the same task share a color.
+    colors = ax.collections[2].get_facecolors()
+    assert (colors[0] == colors[1]).all()
+    assert (colors[2] == colors[3]).all()
+    assert not (colors[1] == colors[2]).all()
+
+
+def test_gantt_labels():
+    ax = plot()
+    # task_D and the first bar of task_A are below MIN_LABEL_WIDTH.
+    assert [text.get_text() for text in ax.texts] == [
+        "task_A",
+        "task_B",
+        "task_C",
+        "task_B",
+    ]
+    assert math.isclose(ax.texts[0].get_position()[0], 0.505)
+
+    assert len(plot(max_labels=2).texts) == 2
+    assert len(plot(labels=False).texts) == 0
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_gantt_bars()
+    test_gantt_labels()
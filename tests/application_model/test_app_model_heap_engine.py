@@ -0,0 +1,192 @@
+"""_summary_
+@file       test_app_model_heap_engine.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that the V0_1 heap engine reproduces the step engine's event
+            timeline.
+@version    0.0.0
+@data       2022-12-04
+"""
+
+import copy
+import sys
+
+sys.path.append("../../")
+
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.workload_generator import generate_workload
+
+DEVICES = [
+    {
+        "device_name": "device_0",
+        "cores": {"core_0": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "task_A",
+                    "duration": 1,
+                    "dependencies": [],
+                    "outputs": {"output_0": ["device_0"]},
+                    "hw": ["adc_0"],
+                },
+                {
+                    "task_name": "task_B",
+                    "duration": 3,
+                    "dependencies": ["output_0"],
+                    "outputs": {"output_1": ["device_1"]},
+                    "hw": ["comm_0"],
+                },
+            ]
+        },
+    },
+    {
+        "device_name": "device_1",
+        "cores": {"core_0": {"frequency": 1}, "core_1": {"frequency": 2}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "task_AA",
+                    "duration": 2,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                },
+                {
+                    "task_name": "task_C",
+                    "duration": 1,
+                    "dependencies": ["output_1"],
+                    "outputs": {"output_2": ["device_1"]},
+                    "hw": ["comm_0"],
+                },
+                {
+                    "task_name": "task_D",
+                    "duration": 4,
+                    "dependencies": [],
+                    "outputs": {},
+                    "hw": [],
+                },
+            ],
+            "core_1": [
+                {
+                    "task_name": "task_F",
+                    "duration": 6,
+                    "dependencies": ["output_2"],
+                    "outputs": {"output_3": ["device_0", "device_1"]},
+                    "hw": [],
+                },
+                {
+                    "task_name": "task_G",
+                    "duration": 1,
+                    "dependencies": ["output_3"],
+                    "outputs": {},
+                    "hw": [],
+                },
+                {
+                    "task_name": "task_H",
+                    "duration": 3,
+                    "dependencies": [],
+                    "outputs": {"output_4": ["device_1"]},
+                    "hw": [],
+                },
+            ],
+        },
+    },
+]
+
+
+def generate(engine, devices=DEVICES):
+    model = get_application_model(
+        "ApplicationModel_V0_1", "../../", engine=engine, headless=True
+    )
+    for device in copy.deepcopy(devices):
+        model.add_device(device["device_name"], device)
+    return model.generate_event_timeline(), model.get_stall_report()
+
+
+def test_engines_leave_schedules_untouched():
+    for engine in ["step", "heap"]:
+        model = get_application_model("ApplicationModel_V0_1", "../../", engine=engine)
+        devices = copy.deepcopy(DEVICES)
+        for device in devices:
+            model.add_device(device["device_name"], device)
+        model.generate_event_timeline()
+        for device, original in zip(devices, DEVICES):
+            assert device["schedule"] == original["schedule"]
+            assert "cache" not in device
+
+
+def test_heap_engine_matches_step_engine():
+    step_timeline, _ = generate("step")
+    heap_timeline, _ = generate("heap")
+    assert len(step_timeline) > 0
+    assert heap_timeline == step_timeline
+
+    # Durations over frequencies that are not powers of two are not exact in
+    # binary, so both engines have to round them the same way.
+    for seed in range(20):
+        devices, _ = generate_workload(
+            num_devices=6,
+            cores_per_device=2,
+            tasks_per_core=10,
+            frequencies=(1, 3, 5, 7),
+            seed=seed,
+        )
+        assert generate("heap", devices) == generate("step", devices)
+
+
+def test_simultaneous_completions():
+    # task_A and task_C finish together, but 0.1 + 0.2 != 0.3 in floating
+    # point. The step engine completes task_C in an extra entry of about 1e-17,
+    # and so does the heap engine.
+    devices = [
+        {
+            "device_name": "device_0",
+            "cores": {"core_0": {"frequency": 1}},
+            "schedule": {
+                "core_0": [
+                    {
+                        "task_name": "task_A",
+                        "duration": 0.3,
+                        "dependencies": [],
+                        "outputs": {},
+                        "hw": [],
+                    }
+                ]
+            },
+        },
+        {
+            "device_name": "device_1",
+            "cores": {"core_0": {"frequency": 1}},
+            "schedule": {
+                "core_0": [
+                    {
+                        "task_name": "task_B",
+                        "duration": 0.1,
+                        "dependencies": [],
+                        "outputs": {},
+                        "hw": [],
+                    },
+                    {
+                        "task_name": "task_C",
+                        "duration": 0.2,
+                        "dependencies": [],
+                        "outputs": {},
+                        "hw": [],
+                    },
+                ]
+            },
+        },
+    ]
+    step_timeline, _ = generate("step", devices)
+    heap_timeline, _ = generate("heap", devices)
+    assert len(step_timeline) == 3
+    assert step_timeline[2]["duration"] < 1e-9
+    assert heap_timeline == step_timeline
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_engines_leave_schedules_untouched()
+    test_heap_engine_matches_step_engine()
+    test_simultaneous_completions()
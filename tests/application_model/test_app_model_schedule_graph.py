@@ -0,0 +1,112 @@
+"""_summary_
+@file       test_app_model_schedule_graph.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the analytical makespan, critical path and slack against the
+            V0_1 application model.
+@version    0.0.0
+@data       2022-12-14
+"""
+
+import sys
+
+sys.path.append("../../")
+
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.workload_generator import generate_workload
+
+
+def task(task_name, duration, dependencies, outputs):
+    return {
+        "task_name": task_name,
+        "duration": duration,
+        "dependencies": dependencies,
+        "outputs": outputs,
+        "hw": [],
+    }
+
+
+def get_model(devices):
+    model = get_application_model("ApplicationModel_V0_1", "../../", headless=True)
+    for device in devices:
+        model.add_device(device["device_name"], device)
+    return model
+
+
+def test_critical_path():
+    device_0 = {
+        "device_name": "device_0",
+        "cores": {"core_0": {"frequency": 2}},
+        "schedule": {
+            "core_0": [
+                task("task_A", 4, [], {"output_0": ["device_1"]}),
+                task("task_B", 2, [], {}),
+            ]
+        },
+    }
+    device_1 = {
+        "device_name": "device_1",
+        "cores": {"core_0": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                task("task_C", 1, [], {}),
+                task("task_D", 3, ["output_0"], {}),
+            ]
+        },
+    }
+    graph = get_model([device_0, device_1]).get_schedule_graph()
+
+    # task_A (2) -> task_D (3) is the longest chain.
+    assert graph.get_makespan() == 5.0
+    assert [task["task_name"] for task in graph.get_critical_path()] == [
+        "task_A",
+        "task_D",
+    ]
+    slack = {task["task_name"]: task["slack"] for task in graph.get_tasks()}
+    assert slack == {"task_A": 0.0, "task_B": 2.0, "task_C": 1.0, "task_D": 0.0}
+
+
+def test_matches_simulation():
+    # V0_1 starts every task as soon as it can on single core devices.
+    for seed in range(10):
+        devices, _ = generate_workload(
+            num_devices=5,
+            cores_per_device=1,
+            tasks_per_core=12,
+            topology="mesh",
+            frequencies=(1,),
+            seed=seed,
+        )
+        model = get_model(devices)
+        model.generate_event_timeline()
+        graph = model.get_schedule_graph()
+        assert graph.get_makespan() == model.get_makespan()
+        for task in graph.get_critical_path():
+            assert task["slack"] == 0.0
+
+
+def test_deadlock():
+    device_0 = {
+        "device_name": "device_0",
+        "cores": {"core_0": {"frequency": 1}},
+        "schedule": {
+            "core_0": [
+                task("task_A", 1, ["output_1"], {"output_0": ["device_0"]}),
+                task("task_B", 1, ["output_0"], {"output_1": ["device_0"]}),
+            ]
+        },
+    }
+    try:
+        get_model([device_0]).get_schedule_graph()
+    except Exception as e:
+        assert "deadlocks" in str(e)
+    else:
+        raise Exception("The cycle was not detected.")
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_critical_path()
+    test_matches_simulation()
+    test_deadlock()
@@ -0,0 +1,121 @@
+"""_summary_
+@file       test_app_model_stall.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that the application models stop on a stalled schedule or an
+            exhausted budget and report why.
+@version    0.0.0
+@data       2022-12-08
+"""
+
+import sys
+
+sys.path.append("../../")
+
+from src.application_model.application_model_interface import get_application_model
+
+MODELS = [
+    ("ApplicationModel_V0_0", {}),
+    ("ApplicationModel_V0_1", {"engine": "step"}),
+    ("ApplicationModel_V0_1", {"engine": "heap"}),
+]
+
+
+def task(task_name, dependencies, outputs):
+    return {
+        "task_name": task_name,
+        "duration": 1,
+        "dependencies": dependencies,
+        "outputs": outputs,
+        "hw": [],
+    }
+
+
+def generate(model_name, devices, **kwargs):
+    model = get_application_model(model_name, "../../", headless=True, **kwargs)
+    for device_id, schedule in devices.items():
+        cores = {core_id: {"frequency": 1} for core_id in schedule}
+        model.add_device(device_id, {"cores": cores, "schedule": schedule})
+    event_timeline = model.generate_event_timeline()
+    return event_timeline, model.get_stall_report()
+
+
+def test_stall_on_cycle():
+    # Each device waits on an output the other produces afterwards.
+    devices = {
+        "device_0": {
+            "core_0": [
+                task("task_A", [], {}),
+                task("task_B", ["output_1"], {}),
+                task("task_C", [], {"output_0": ["device_1"]}),
+            ]
+        },
+        "device_1": {
+            "core_0": [
+                task("task_D", ["output_0"], {}),
+                task("task_E", [], {"output_1": ["device_0"]}),
+            ]
+        },
+    }
+    for model_name, kwargs in MODELS:
+        event_timeline, report = generate(model_name, devices, **kwargs)
+        assert len(event_timeline) == 1
+        assert report["reason"] == "deadlock"
+        assert report["pending_tasks"] == 4
+        assert report["unproduced"] == []
+        assert report["cycles"] == [[["device_0", "core_0"], ["device_1", "core_0"]]]
+        assert report["blocked"][0] == {
+            "device_id": "device_0",
+            "core_id": "core_0",
+            "task_name": "task_B",
+            "missing": ["output_1"],
+            "waits_on": [["device_1", "core_0"]],
+        }
+
+
+def test_stall_on_missing_output():
+    # Like the temperature sensor scenarios, without anyone sending the data.
+    devices = {
+        "device_0": {
+            "core_0": [task("Read Sensors", ["temperature", "motion"], {})],
+            "core_1": [task("Idle", [], {"motion": ["device_0"]})],
+        },
+    }
+    for model_name, kwargs in MODELS:
+        event_timeline, report = generate(model_name, devices, **kwargs)
+        assert len(event_timeline) == 1
+        assert report["reason"] == "deadlock"
+        assert report["blocked"][0]["missing"] == ["temperature"]
+        assert report["unproduced"] == [["device_0", "temperature"]]
+        assert report["cycles"] == []
+
+
+def test_budget():
+    devices = {
+        "device_0": {"core_0": [task(f"task_{idx}", [], {}) for idx in range(5)]}
+    }
+    for model_name, kwargs in MODELS:
+        event_timeline, report = generate(model_name, devices, **kwargs)
+        assert len(event_timeline) == 5
+        assert report is None
+
+        event_timeline, report = generate(model_name, devices, max_events=5, **kwargs)
+        assert len(event_timeline) == 5
+        assert report is None
+
+        event_timeline, report = generate(model_name, devices, max_events=2, **kwargs)
+        assert len(event_timeline) == 2
+        assert report["reason"] == "max_events"
+
+        event_timeline, report = generate(model_name, devices, max_time=3, **kwargs)
+        assert len(event_timeline) == 3
+        assert report["reason"] == "max_time"
+        assert report["timestamp"] == 3
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_stall_on_cycle()
+    test_stall_on_missing_output()
+    test_budget()
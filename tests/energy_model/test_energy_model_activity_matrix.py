@@ -0,0 +1,157 @@
+"""_summary_
+@file       test_energy_model_activity_matrix.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the activity matrix energy engine against hand computed
+            energy events, for dict and columnar event timelines.
+@version    0.0.0
+@data       2022-12-20
+"""
+
+import sys
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from event_timeline import EventTimeline
+from src.energy_model.energy_model_interface import get_energy_model
+
+DEVICES = {
+    "device_0": {
+        "cores": {"core_0": {"active_energy": 5, "idle_energy": 1}},
+        "peripherals": {
+            "comm_0": {"active_energy": 3, "idle_energy": 1},
+            "adc_0": {"active_energy": 2, "idle_energy": 1},
+        },
+        "supply_id": "supply_0",
+    },
+    "device_1": {
+        "cores": {
+            "core_0": {"active_energy": 5, "idle_energy": 2},
+            "core_1": {"active_energy": 4, "idle_energy": 1},
+        },
+        "peripherals": {},
+        "supply_id": "supply_0",
+    },
+}
+
+EVENT_TIMELINE = [
+    {
+        "timestamp": 0,
+        "duration": 2,
+        "devices": {
+            "device_0": {"cores": {"core_0": "task_A"}, "hw": ["adc_0"]},
+            "device_1": {"cores": {"core_1": "task_B"}, "hw": []},
+        },
+        "cache": [],
+    },
+    {
+        "timestamp": 2,
+        "duration": 0.5,
+        "devices": {"device_1": {"cores": {}, "hw": []}},
+        "cache": [],
+    },
+]
+
+
+def get_model():
+    model = get_energy_model("EnergyModel_V0_1", "../../", headless=True)
+    for device_id, device in DEVICES.items():
+        model.add_device(device_id, dict(device))
+    model.add_energy_supply(
+        "supply_0", {"supply_voltage": 5.0, "max_supply_current": 5.0}
+    )
+    return model
+
+
+def test_energy_events():
+    expected = [
+        {
+            "timestamp": 0,
+            "duration": 2,
+            "devices": {
+                "device_0": [
+                    ["core_0", "active", 5],
+                    ["adc_0", "active", 2],
+                    ["comm_0", "idle", 1],
+                ],
+                "device_1": [["core_1", "active", 4], ["core_0", "idle", 2]],
+            },
+        },
+        {
+            "timestamp": 2,
+            "duration": 0.5,
+            "devices": {"device_1": [["core_0", "idle", 2], ["core_1", "idle", 1]]},
+        },
+    ]
+
+    columnar = EventTimeline()
+    for entry in EVENT_TIMELINE:
+        columnar.append(entry)
+    for event_timeline in [EVENT_TIMELINE, columnar, iter(EVENT_TIMELINE)]:
+        model = get_model()
+        assert model.generate_energy_usage(event_timeline) == expected
+        assert model.get_total_energy() == {"device_0": 16.0, "device_1": 13.5}
+    for event_timeline in [EVENT_TIMELINE, columnar]:
+        assert list(get_model().iter_energy_usage(event_timeline, 1)) == expected[1:]
+
+
+def test_consumer_kinds():
+    # A peripheral whose name contains "core", and a peripheral named like a
+    # core, are still peripherals.
+    model = get_energy_model("EnergyModel_V0_1", "../../", headless=True)
+    model.add_device(
+        "device_0",
+        {
+            "cores": {"core_0": {"active_energy": 5, "idle_energy": 1}},
+            "peripherals": {
+                "score_adc": {"active_energy": 2, "idle_energy": 0},
+                "core_0": {"active_energy": 7, "idle_energy": 3},
+            },
+        },
+    )
+    energy_usage = model.generate_energy_usage(
+        [
+            {
+                "timestamp": 0,
+                "duration": 1,
+                "devices": {"device_0": {"cores": {}, "hw": ["score_adc", "core_0"]}},
+                "cache": [],
+            }
+        ]
+    )
+    assert energy_usage[0]["devices"]["device_0"] == [
+        ["score_adc", "active", 2],
+        ["core_0", "active", 7],
+        ["core_0", "idle", 1],
+    ]
+
+    for device in [
+        {"cores": {}},
+        {"cores": {"core_0": {"active_energy": 5}}, "peripherals": {}},
+    ]:
+        try:
+            model.add_device("device_1", device)
+            assert False
+        except Exception as e:
+            assert "device_1" in str(e)
+    assert list(model._devices) == ["device_0"]
+
+
+def test_unknown_consumer():
+    model = get_model()
+    event_timeline = [dict(EVENT_TIMELINE[1])]
+    event_timeline[0]["devices"] = {"device_1": {"cores": {}, "hw": ["adc_0"]}}
+    try:
+        model.generate_energy_usage(event_timeline)
+        assert False
+    except Exception as e:
+        assert "adc_0" in str(e)
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_energy_events()
+    test_consumer_kinds()
+    test_unknown_consumer()
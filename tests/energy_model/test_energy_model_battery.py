@@ -0,0 +1,85 @@
+"""_summary_
+@file       test_energy_model_battery.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the state of charge and depletion time of a battery supply.
+@version    0.0.0
+@data       2022-12-22
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from src.energy_model.energy_model_interface import get_energy_model
+from test_energy_model_activity_matrix import DEVICES, EVENT_TIMELINE
+
+
+def get_model(battery):
+    model = get_energy_model("EnergyModel_V0_1", "../../", headless=True)
+    for device_id, device in DEVICES.items():
+        model.add_device(device_id, dict(device, supply_id="battery_0"))
+    model.add_energy_supply("battery_0", battery)
+    return model
+
+
+def test_battery_state():
+    # The devices draw 14 over [0, 2) and 3 over [2, 2.5), 29.5 in all. At 80%
+    # efficiency, that takes 36.875 of the 40 of charge.
+    model = get_model(
+        {"type": "battery", "capacity": 50, "initial_charge": 40, "efficiency": 0.8}
+    )
+    model.generate_energy_usage(EVENT_TIMELINE)
+    battery = model.get_battery_state()["battery_0"]
+    assert np.array_equal(battery["timestamp"], [0, 2, 2.5])
+    assert np.allclose(battery["charge"], [40, 5, 3.125])
+    assert np.allclose(battery["state_of_charge"], [0.8, 0.1, 0.0625])
+    assert battery["depleted_at"] is None
+
+    model = get_model({"type": "battery", "capacity": 30, "efficiency": 0.8})
+    model.generate_energy_usage(EVENT_TIMELINE)
+    battery = model.get_battery_state()["battery_0"]
+    # 24 is delivered during the first entry, at t = 24 / 14.
+    assert np.isclose(battery["depleted_at"], 24 / 14)
+    assert np.allclose(battery["charge"], [30, 0, 0])
+
+    # Batteries are not static supplies and are checked when they are added.
+    assert model.get_overloads() == []
+    for battery in [
+        {"type": "battery"},
+        {"type": "battery", "capacity": 10, "initial_charge": 11},
+        {"type": "battery", "capacity": 10, "efficiency": 0},
+        {"type": "flywheel"},
+    ]:
+        try:
+            model.add_energy_supply("battery_1", battery)
+            assert False
+        except Exception as e:
+            assert "battery_1" in str(e)
+
+
+def test_battery_save_outputs():
+    # A battery without a maximum current has no power limit line to draw.
+    model = get_model({"type": "battery", "capacity": 100, "supply_voltage": 3.7})
+    model.generate_energy_usage(EVENT_TIMELINE)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            model.save_outputs()
+            assert os.path.exists("output_energy_usage.jpg")
+        finally:
+            os.chdir(cwd)
+    assert all(len(ax.get_lines()) == 0 for ax in np.atleast_1d(model._axs))
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_battery_state()
+    test_battery_save_outputs()
@@ -0,0 +1,75 @@
+"""_summary_
+@file       test_energy_model_overloads.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the per-supply load and the overload intervals of two
+            devices sharing a supply.
+@version    0.0.0
+@data       2022-12-22
+"""
+
+import sys
+
+import numpy as np
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from test_energy_model_activity_matrix import get_model
+
+
+def entry(timestamp, duration, device_0, device_1):
+    devices = {}
+    if device_0 is not None:
+        devices["device_0"] = {"cores": device_0[0], "hw": device_0[1]}
+    if device_1 is not None:
+        devices["device_1"] = {"cores": device_1, "hw": []}
+    return {
+        "timestamp": timestamp,
+        "duration": duration,
+        "devices": devices,
+        "cache": [],
+    }
+
+
+def test_overloads():
+    busy_0 = ({"core_0": "task_A"}, ["comm_0", "adc_0"])
+    busy_1 = {"core_0": "task_B", "core_1": "task_C"}
+    event_timeline = [
+        entry(0, 2, ({"core_0": "task_A"}, ["adc_0"]), {"core_1": "task_C"}),
+        entry(2, 1, busy_0, {}),
+        entry(3, 1, None, {}),
+        # Nothing runs from 4 to 5, nor from 6 to 7.
+        entry(5, 1, busy_0, busy_1),
+        entry(7, 1, busy_0, busy_1),
+    ]
+
+    # Both devices share a 12.5 W supply.
+    model = get_model()
+    model._energy_supplies["supply_0"]["max_supply_current"] = 2.5
+    model.generate_energy_usage(event_timeline)
+    assert np.array_equal(model.get_supply_load()["supply_0"], [14, 13, 3, 19, 19])
+
+    overloads = model.get_overloads()
+    assert [(o["start"], o["end"], o["peak"]) for o in overloads] == [
+        (0, 3, 14),
+        (5, 6, 19),
+        (7, 8, 19),
+    ]
+    assert overloads[0]["limit"] == 12.5
+    assert overloads[0]["consumers"] == {
+        ("device_0", "core_0"): 15,
+        ("device_0", "comm_0"): 5,
+        ("device_0", "adc_0"): 6,
+        ("device_1", "core_0"): 6,
+        ("device_1", "core_1"): 9,
+    }
+
+    model._energy_supplies["supply_0"]["max_supply_current"] = 5.0
+    assert model.get_overloads() == []
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_overloads()
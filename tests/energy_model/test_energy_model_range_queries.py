@@ -0,0 +1,50 @@
+"""_summary_
+@file       test_energy_model_range_queries.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the energy used between two times per consumer, device and
+            supply.
+@version    0.0.0
+@data       2022-12-21
+"""
+
+import sys
+
+import numpy as np
+
+sys.path.append("../../")
+sys.path.append("../../src/application_model/")
+
+from test_energy_model_activity_matrix import EVENT_TIMELINE, get_model
+
+
+def test_energy_ranges():
+    model = get_model()
+    energy_usage = model.generate_energy_usage(EVENT_TIMELINE)
+
+    # device_0 draws 8 over [0, 2) and is not in the entry over [2, 2.5).
+    # device_1 draws 6, then 3.
+    assert model.get_energy(1, 2.25) == {"device_0": 8.0, "device_1": 6.75}
+    assert model.get_energy(1, 2.25, "supply") == {"supply_0": 14.75}
+    assert model.get_energy(0.5, 1, "consumer")[("device_0", "core_0")] == 2.5
+    assert model.get_energy(-5, 100) == model.get_total_energy()
+    assert model.get_energy(3, 4) == {"device_0": 0.0, "device_1": 0.0}
+
+    energy = energy_usage.get_energy([0, 1], [2.5, 2.25])
+    assert np.array_equal(energy, [[16.0, 13.5], [8.0, 6.75]])
+
+    # Updating the usage rebuilds the prefix sums.
+    energy_usage = model.update_energy_usage(EVENT_TIMELINE[:1], 1)
+    assert model.get_energy(0, 10) == {"device_0": 16.0, "device_1": 12.0}
+
+    try:
+        model.get_energy(0, 1, "core")
+        assert False
+    except Exception as e:
+        assert "core" in str(e)
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_energy_ranges()
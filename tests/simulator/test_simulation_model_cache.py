@@ -0,0 +1,108 @@
+"""_summary_
+@file       test_simulation_model_cache.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that unchanged scenarios are served from the result cache.
+@version    0.0.0
+@data       2022-12-11
+"""
+
+import copy
+import sys
+import tempfile
+import time
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+from src.simulator.result_cache import ResultCache
+from src.simulator.workload_generator import generate_workload
+
+
+def simulate(devices, supplies, cache, **kwargs):
+    devices = copy.deepcopy(devices)
+    app_model = get_application_model(
+        "ApplicationModel_V0_1", CWD, cache=cache, **kwargs
+    )
+    energy_model = get_energy_model("EnergyModel_V0_1", CWD, cache=cache)
+    for device in devices:
+        app_model.add_device(device["device_name"], device)
+        energy_model.add_device(device["device_name"], copy.deepcopy(device))
+    for supply in supplies:
+        energy_model.add_energy_supply(supply["supply_name"], supply)
+    return app_model, energy_model
+
+
+def fail():
+    raise Exception("The cached result was not used.")
+
+
+def test_cached_scenario():
+    devices, supplies = generate_workload(num_devices=4, cores_per_device=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(directory)
+
+        app_model, energy_model = simulate(devices, supplies, cache)
+        event_timeline = app_model.generate_event_timeline()
+        energy_usage = energy_model.generate_energy_usage(event_timeline)
+        assert len(cache) == 2
+
+        # Neither model simulates again for the same scenario.
+        app_model, energy_model = simulate(devices, supplies, cache)
+        app_model.iter_event_timeline = fail
+        energy_model.iter_energy_usage = fail
+        cached_timeline = app_model.generate_event_timeline()
+        assert cached_timeline == event_timeline
+        assert energy_model.generate_energy_usage(cached_timeline) == energy_usage
+        assert app_model.get_devices()["device_0"]["core_utilization"] is not None
+        assert len(cache) == 2
+
+        # Any change to the scenario is a new result.
+        devices[0]["schedule"]["core_0"][0]["duration"] += 1
+        app_model, energy_model = simulate(devices, supplies, cache)
+        changed_timeline = app_model.generate_event_timeline()
+        assert changed_timeline != event_timeline
+        energy_model.generate_energy_usage(changed_timeline)
+        assert len(cache) == 4
+
+
+def test_cached_engines():
+    devices, supplies = generate_workload(num_devices=4, frequencies=(1, 3))
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(directory)
+        for kwargs in [{}, {"engine": "heap"}, {"engine": "calendar"}]:
+            app_model, _ = simulate(devices, supplies, cache, **kwargs)
+            app_model.generate_event_timeline()
+        # Every engine and mode simulates its own result.
+        assert len(cache) == 3
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(directory, max_bytes=2500)
+        for key in ["a", "b"]:
+            assert cache.put(key, b"x" * 1000)
+            time.sleep(0.01)
+        assert cache.get("a") is not None
+        time.sleep(0.01)
+
+        # "b" is the least recently used result.
+        assert cache.put("c", b"x" * 1000)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+        assert not cache.put("d", b"x" * 3000)
+        assert len(cache) == 2
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_cached_scenario()
+    test_cached_engines()
+    test_lru_eviction()
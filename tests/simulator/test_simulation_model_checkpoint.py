@@ -0,0 +1,71 @@
+"""_summary_
+@file       test_simulation_model_checkpoint.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that runs resumed from a checkpoint match uninterrupted runs.
+@version    0.0.0
+@data       2022-12-13
+"""
+
+import copy
+import os
+import sys
+import tempfile
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.workload_generator import generate_workload
+
+
+def get_model(devices=None):
+    app_model = get_application_model("ApplicationModel_V0_1", CWD, headless=True)
+    for device in devices or []:
+        app_model.add_device(device["device_name"], device)
+    return app_model
+
+
+def test_checkpoint():
+    devices, _ = generate_workload(
+        num_devices=6, cores_per_device=1, tasks_per_core=20, max_duration=7
+    )
+    full_model = get_model(copy.deepcopy(devices))
+    full_timeline = full_model.generate_event_timeline()
+    makespan = full_model.get_makespan()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "warmup.ckpt.gz")
+        warmup_model = get_model(copy.deepcopy(devices))
+        warmup_timeline = warmup_model.generate_event_timeline(until=makespan / 2)
+        assert warmup_model.is_paused()
+        assert 0 < len(warmup_timeline) < len(full_timeline)
+        warmup_model.save_checkpoint(path)
+
+        # Resuming the paused run and a restored copy of it both finish the
+        # same way as the uninterrupted run.
+        assert warmup_model.generate_event_timeline() == full_timeline
+        assert not warmup_model.is_paused()
+
+        branch_model = get_model()
+        branch_model.load_checkpoint(path)
+        branch_timeline = branch_model.generate_event_timeline()
+        assert branch_timeline == full_timeline
+        assert list(branch_timeline.timestamp) == list(full_timeline.timestamp)
+        assert branch_model.get_stall_report() == full_model.get_stall_report()
+
+        # A branch may edit the tasks that have not started yet.
+        branch_model = get_model()
+        branch_model.load_checkpoint(path)
+        for device in branch_model.get_devices().values():
+            device["schedule"]["core_0"][-1]["duration"] += 5
+        edited_devices = copy.deepcopy(list(branch_model.get_devices().values()))
+        branch_timeline = branch_model.generate_event_timeline()
+        assert branch_timeline == get_model(edited_devices).generate_event_timeline()
+        assert branch_model.get_makespan() > makespan
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_checkpoint()
@@ -0,0 +1,124 @@
+"""_summary_
+@file       test_simulation_model_headless.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that building and simulating models in headless mode never
+            loads matplotlib.
+@version    0.0.0
+@data       2022-12-06
+"""
+
+import copy
+import subprocess
+import sys
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+
+DEVICE = {
+    "device_name": "TM4C",
+    "cores": {"core_0": {"frequency": 1, "active_energy": 5, "idle_energy": 1}},
+    "peripherals": {"adc_0": {"active_energy": 3, "idle_energy": 1}},
+    "schedule": {
+        "core_0": [
+            {
+                "task_name": "Sample ADC",
+                "duration": 15,
+                "dependencies": [],
+                "outputs": {},
+                "hw": ["adc_0"],
+            },
+        ]
+    },
+    "supply_id": "supply_0",
+}
+SUPPLY = {"supply_voltage": 5.0, "max_supply_current": 5.0}
+
+SCRIPT = """
+import sys
+
+sys.path.append("{cwd}")
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+from src.network_model.network_model_v0_0 import NetworkModel_V0_0
+
+device = {{
+    "device_name": "TM4C",
+    "cores": {{"core_0": {{"frequency": 1, "active_energy": 5, "idle_energy": 1}}}},
+    "peripherals": {{"adc_0": {{"active_energy": 3, "idle_energy": 1}}}},
+    "schedule": {{
+        "core_0": [
+            {{
+                "task_name": "Sample ADC",
+                "duration": 15,
+                "dependencies": [],
+                "outputs": {{"adc_measurement": ["TM4C"]}},
+                "hw": ["adc_0"],
+            }},
+        ]
+    }},
+    "supply_id": "supply_0",
+}}
+
+app_model = get_application_model("ApplicationModel_V0_1", "{cwd}", headless=True)
+energy_model = get_energy_model("EnergyModel_V0_1", "{cwd}", headless=True)
+network_model = NetworkModel_V0_0(headless=True)
+app_model.add_device("TM4C", dict(device))
+energy_model.add_device("TM4C", dict(device))
+network_model.add_device("TM4C", dict(device))
+energy_model.add_energy_supply(
+    "supply_0", {{"supply_voltage": 5.0, "max_supply_current": 5.0}}
+)
+
+event_timeline = app_model.generate_event_timeline()
+energy_model.generate_energy_usage(event_timeline)
+app_model.print_event_timeline()
+app_model.visualize_event_timeline()
+energy_model.visualize_energy_usage()
+assert len(event_timeline) == 1
+assert "matplotlib" not in sys.modules
+assert "colorhash" not in sys.modules
+"""
+
+
+def test_headless_simulation():
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(cwd=CWD)],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_figures_follow_data():
+    app_model = get_application_model("ApplicationModel_V0_1", CWD, headless=True)
+    energy_model = get_energy_model("EnergyModel_V0_1", CWD, headless=True)
+    device = copy.deepcopy(DEVICE)
+    app_model.add_device("TM4C", device)
+    energy_model.add_device("TM4C", copy.deepcopy(DEVICE))
+    energy_model.add_energy_supply("supply_0", dict(SUPPLY))
+    event_timeline = app_model.generate_event_timeline()
+    energy_model.generate_energy_usage(event_timeline)
+    app_model._plot_event_timeline()
+    energy_model._plot_energy_usage()
+    assert app_model._ax.get_xlim()[1] >= 15
+
+    # Figures are drawn again once the data they show changed.
+    device["schedule"]["core_0"][0]["duration"] = 30
+    app_model.update_event_timeline([("TM4C", "core_0", 0)])
+    assert app_model._fig is None
+    energy_model.generate_energy_usage(event_timeline)
+    assert energy_model._fig is None
+    app_model._plot_event_timeline()
+    assert app_model._ax.get_xlim()[1] >= 30
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_headless_simulation()
+    test_figures_follow_data()
@@ -0,0 +1,167 @@
+"""_summary_
+@file       test_simulation_model_incremental.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that re-simulating after a schedule edit matches a full run.
+@version    0.0.0
+@data       2022-12-12
+"""
+
+import copy
+import random
+import sys
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.energy_model.energy_model_interface import get_energy_model
+from src.simulator.workload_generator import generate_workload
+
+
+def simulate(devices, supplies, **kwargs):
+    app_model = get_application_model(
+        "ApplicationModel_V0_1", CWD, headless=True, **kwargs
+    )
+    energy_model = get_energy_model("EnergyModel_V0_1", CWD, headless=True)
+    for device in devices:
+        app_model.add_device(device["device_name"], device)
+        energy_model.add_device(device["device_name"], copy.deepcopy(device))
+    for supply in supplies:
+        energy_model.add_energy_supply(supply["supply_name"], supply)
+    event_timeline = app_model.generate_event_timeline()
+    energy_usage = energy_model.generate_energy_usage(event_timeline)
+    return app_model, energy_model, event_timeline, energy_usage
+
+
+def test_incremental_update():
+    devices, supplies = generate_workload(
+        num_devices=4, cores_per_device=1, tasks_per_core=12
+    )
+    app_model, energy_model, event_timeline, energy_usage = simulate(
+        copy.deepcopy(devices), supplies, snapshot_interval=4
+    )
+    length = len(event_timeline)
+    schedules = {
+        device_id: device["schedule"]
+        for device_id, device in app_model.get_devices().items()
+    }
+
+    # Make a late task longer.
+    schedules["device_1"]["core_0"][9]["duration"] += 3
+    start = app_model.update_event_timeline([("device_1", "core_0", 9)])
+    assert 0 < start < length
+    energy_usage = energy_model.update_energy_usage(event_timeline, start)
+
+    # Drop the dependencies of another late task, then append a new task.
+    schedules["device_2"]["core_0"][10]["dependencies"] = []
+    schedules["device_3"]["core_0"].append(
+        {
+            "task_name": "task_extra",
+            "duration": 2,
+            "dependencies": [],
+            "outputs": {},
+            "hw": [],
+        }
+    )
+    start = app_model.update_event_timeline(
+        [("device_2", "core_0", 10), ("device_3", "core_0", 12)]
+    )
+    assert 0 < start
+    energy_usage = energy_model.update_energy_usage(event_timeline, start)
+
+    # The result matches a full run of the edited schedules.
+    edited = [copy.deepcopy(device) for device in app_model.get_devices().values()]
+    full_model, _, full_timeline, full_energy_usage = simulate(edited, supplies)
+    assert event_timeline == full_timeline
+    assert energy_usage == full_energy_usage
+    assert app_model.get_stall_report() == full_model.get_stall_report()
+    assert app_model.get_makespan() == full_model.get_makespan()
+
+    # An edit of the first task has to start over.
+    schedules["device_0"]["core_0"][0]["duration"] += 1
+    assert app_model.update_event_timeline([("device_0", "core_0", 0)]) == 0
+
+
+def edit_schedules(rng, schedules) -> list:
+    # Changes the duration or the dependencies of a random task, or removes
+    # it, or moves it to a random position. Returns the edited positions.
+    device_id = rng.choice(sorted(schedules))
+    core_id = rng.choice(sorted(schedules[device_id]))
+    core = schedules[device_id][core_id]
+    idx = rng.randrange(len(core))
+    match rng.choice(["duration", "dependencies", "remove", "move"]):
+        case "duration":
+            core[idx]["duration"] = max(1, core[idx]["duration"] + rng.choice([-1, 3]))
+        case "dependencies":
+            core[idx]["dependencies"] = []
+        case "remove":
+            core.pop(idx)
+        case "move":
+            task = core.pop(idx)
+            target_device = rng.choice(sorted(schedules))
+            target_core = rng.choice(sorted(schedules[target_device]))
+            target = schedules[target_device][target_core]
+            target_idx = rng.randrange(len(target) + 1)
+            target.insert(target_idx, task)
+            return [(device_id, core_id, idx), (target_device, target_core, target_idx)]
+    return [(device_id, core_id, idx)]
+
+
+def test_random_edits():
+    # Any kept prefix of the timeline matches a full run of the edited
+    # schedules, including edits of head tasks that were already read.
+    for seed in range(30):
+        for cores_per_device in [1, 2]:
+            devices, supplies = generate_workload(
+                num_devices=5,
+                cores_per_device=cores_per_device,
+                tasks_per_core=8,
+                seed=seed,
+            )
+            for run in range(4):
+                rng = random.Random(seed * 10 + run)
+                app_model, energy_model, event_timeline, energy_usage = simulate(
+                    copy.deepcopy(devices), supplies, snapshot_interval=2
+                )
+                schedules = {
+                    device_id: device["schedule"]
+                    for device_id, device in app_model.get_devices().items()
+                }
+                start = app_model.update_event_timeline(edit_schedules(rng, schedules))
+                energy_usage = energy_model.update_energy_usage(event_timeline, start)
+
+                edited = [
+                    copy.deepcopy(device) for device in app_model.get_devices().values()
+                ]
+                full_model, _, full_timeline, full_energy_usage = simulate(
+                    edited, supplies
+                )
+                assert event_timeline == full_timeline
+                assert energy_usage == full_energy_usage
+                assert app_model.get_stall_report() == full_model.get_stall_report()
+
+
+def test_incremental_update_engines():
+    devices, supplies = generate_workload(
+        num_devices=2, cores_per_device=1, tasks_per_core=4
+    )
+    for kwargs in [
+        {"engine": "heap"},
+        {"engine": "calendar"},
+        {"components": True},
+    ]:
+        app_model, _, _, _ = simulate(copy.deepcopy(devices), supplies, **kwargs)
+        try:
+            app_model.update_event_timeline([("device_0", "core_0", 0)])
+            assert False
+        except Exception as e:
+            assert "step engine" in str(e)
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_incremental_update()
+    test_random_edits()
+    test_incremental_update_engines()
@@ -0,0 +1,195 @@
+"""_summary_
+@file       test_simulation_model_periodic.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that periodic schedules compressed to a hyperperiod give the
+            same totals as their unrolled schedules.
+@version    0.0.0
+@data       2022-12-15
+"""
+
+import copy
+import sys
+
+import numpy as np
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.application_model.periodic_schedule import PeriodicSchedule
+from src.energy_model.energy_model_interface import get_energy_model
+from src.simulator.sweep import summarize
+
+
+def task(task_name, duration, dependencies, outputs, hw):
+    return {
+        "task_name": task_name,
+        "duration": duration,
+        "dependencies": dependencies,
+        "outputs": outputs,
+        "hw": hw,
+    }
+
+
+def get_devices(iterations, periodic, read_duration=3):
+    # Temperature sensor -> hub -> AC, repeated forever.
+    periods = {
+        "sensor": [
+            task("read_temp", read_duration, [], {}, ["adc_0"]),
+            task("send_temp", 1, [], {"temp": ["hub"]}, ["comm_0"]),
+        ],
+        "hub": [
+            task("recv_temp", 1, ["temp"], {}, ["comm_0"]),
+            task("decide", 3, [], {"command": ["ac"]}, []),
+        ],
+        "ac": [
+            task("apply", 2, ["command"], {}, ["relay_0"]),
+            task("wait", 2, [], {}, []),
+        ],
+    }
+    devices = []
+    for device_name, period in periods.items():
+        if periodic:
+            schedule = PeriodicSchedule(period, iterations)
+        else:
+            schedule = [copy.deepcopy(t) for _ in range(iterations) for t in period]
+        hw = {hw_id for t in period for hw_id in t["hw"]}
+        devices.append(
+            {
+                "device_name": device_name,
+                "cores": {
+                    "core_0": {"frequency": 1, "active_energy": 10, "idle_energy": 1}
+                },
+                "peripherals": {
+                    hw_id: {"active_energy": 3, "idle_energy": 1} for hw_id in hw
+                },
+                "schedule": {"core_0": schedule},
+                "supply_id": "supply_0",
+            }
+        )
+    return devices
+
+
+def simulate(devices, **kwargs):
+    app_model = get_application_model(
+        "ApplicationModel_V0_1", CWD, headless=True, **kwargs
+    )
+    energy_model = get_energy_model("EnergyModel_V0_1", CWD, headless=True)
+    for device in devices:
+        app_model.add_device(device["device_name"], device)
+        energy_model.add_device(device["device_name"], copy.deepcopy(device))
+    energy_model.add_energy_supply(
+        "supply_0",
+        {"supply_name": "supply_0", "supply_voltage": 5.0, "max_supply_current": 5.0},
+    )
+    event_timeline = app_model.generate_event_timeline()
+    energy_usage = energy_model.generate_energy_usage(event_timeline)
+    return app_model, energy_model, energy_usage, event_timeline
+
+
+def test_hyperperiod():
+    unrolled = simulate(get_devices(500, False))
+    compressed = simulate(get_devices(500, True), hyperperiod_search=10)
+    hyperperiod = compressed[0].get_hyperperiod()
+    assert hyperperiod is not None
+    assert hyperperiod["repeats"] > 400
+    assert len(compressed[3]) < 50
+
+    assert summarize(unrolled[0], unrolled[2], unrolled[1]) == summarize(
+        compressed[0], compressed[2], compressed[1]
+    )
+    assert unrolled[1].get_total_energy() == compressed[1].get_total_energy(hyperperiod)
+    makespan = unrolled[0].get_makespan()
+    for start, end in [(0, makespan), (1.5, makespan / 3), (makespan / 2, makespan)]:
+        assert np.allclose(
+            unrolled[0].core_utilization(start, end),
+            compressed[0].core_utilization(start, end),
+        )
+
+
+def test_range_queries():
+    # Queries past the stored cycle are mapped onto its repeats.
+    unrolled = simulate(get_devices(500, False))
+    compressed = simulate(get_devices(500, True), hyperperiod_search=10)
+    hyperperiod = compressed[0].get_hyperperiod()
+    makespan = unrolled[0].get_makespan()
+    times = np.linspace(0, makespan, 97).tolist() + [9.5, 1999.5]
+    for start in times:
+        for end in times[::7]:
+            expected = unrolled[1].get_energy(start, end, "consumer")
+            energy = compressed[1].get_energy(start, end, "consumer", hyperperiod)
+            assert expected.keys() == energy.keys()
+            assert np.allclose(list(expected.values()), list(energy.values()))
+
+    # Overloads across the whole run, and one in each repeat.
+    for current in [5.0, 5.5, 7.5]:
+        for _, energy_model, _, _ in [unrolled, compressed]:
+            energy_model._energy_supplies["supply_0"]["max_supply_current"] = current
+        expected = unrolled[1].get_overloads()
+        assert compressed[1].get_overloads(hyperperiod) == expected
+    assert len(expected) > 400
+
+
+def test_battery():
+    # The repeats drain the battery too, and it can run out within one.
+    unrolled = simulate(get_devices(500, False))
+    compressed = simulate(get_devices(500, True), hyperperiod_search=10)
+    hyperperiod = compressed[0].get_hyperperiod()
+    for capacity, efficiency in [
+        (656, 1.0),
+        (50000, 1.0),
+        (60000.3, 0.9),
+        (75056, 1.0),
+    ]:
+        for _, energy_model, _, _ in [unrolled, compressed]:
+            energy_model._energy_supplies["supply_0"] = {
+                "supply_name": "supply_0",
+                "type": "battery",
+                "capacity": capacity,
+                "efficiency": efficiency,
+            }
+        expected = unrolled[1].get_battery_state()["supply_0"]
+        state = compressed[1].get_battery_state(hyperperiod)["supply_0"]
+        assert np.isclose(state["depleted_at"], expected["depleted_at"])
+        charge = np.interp(
+            state["timestamp"], expected["timestamp"], expected["charge"]
+        )
+        assert np.allclose(state["charge"], charge)
+    assert compressed[1].get_battery_state()["supply_0"]["depleted_at"] is None
+    assert state["depleted_at"] == 2008.0
+
+
+def test_max_events():
+    # Skipped repeats count towards max_events, so both runs stop together.
+    unrolled = simulate(get_devices(500, False), max_events=1000)
+    compressed = simulate(
+        get_devices(500, True), hyperperiod_search=10, max_events=1000
+    )
+    assert compressed[0].get_hyperperiod() is not None
+    report = compressed[0].get_stall_report()
+    assert report["reason"] == "max_events"
+    assert report == unrolled[0].get_stall_report()
+    assert summarize(unrolled[0], unrolled[2], unrolled[1]) == summarize(
+        compressed[0], compressed[2], compressed[1]
+    )
+
+
+def test_no_steady_state():
+    # The sensor outruns the hub, so its outputs pile up and no state repeats.
+    unrolled = simulate(get_devices(50, False, read_duration=1))
+    compressed = simulate(get_devices(50, True, read_duration=1), hyperperiod_search=10)
+    assert compressed[0].get_hyperperiod() is None
+    assert summarize(unrolled[0], unrolled[2], unrolled[1]) == summarize(
+        compressed[0], compressed[2], compressed[1]
+    )
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_hyperperiod()
+    test_range_queries()
+    test_battery()
+    test_max_events()
+    test_no_steady_state()
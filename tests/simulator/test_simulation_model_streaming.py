@@ -0,0 +1,159 @@
+"""_summary_
+@file       test_simulation_model_streaming.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Streams a temperature sensor application through the application,
+            energy and network models one timeline entry at a time.
+@version    0.0.0
+@data       2022-12-06
+"""
+
+import copy
+import itertools
+import sys
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import (
+    ApplicationModelInterface,
+    get_application_model,
+)
+from src.energy_model.energy_model_interface import get_energy_model
+from src.network_model.adapter import Adapter
+
+DEVICES = [
+    {
+        "device_name": "TS1",
+        "cores": {"core_0": {"frequency": 1, "active_energy": 20, "idle_energy": 3}},
+        "peripherals": {"adc": {"active_energy": 5, "idle_energy": 3}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "Sense Temperature",
+                    "duration": 2,
+                    "dependencies": [],
+                    "outputs": {"temperature": ["Hub"]},
+                    "hw": ["adc"],
+                },
+                {
+                    "task_name": "Sense Temperature",
+                    "duration": 2,
+                    "dependencies": [],
+                    "outputs": {"temperature": ["Hub"]},
+                    "hw": ["adc"],
+                },
+            ]
+        },
+        "supply_id": "supply_0",
+    },
+    {
+        "device_name": "Hub",
+        "cores": {"core_0": {"frequency": 2, "active_energy": 20, "idle_energy": 3}},
+        "peripherals": {"modem": {"active_energy": 10, "idle_energy": 1}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "Read Sensors",
+                    "duration": 3,
+                    "dependencies": ["temperature"],
+                    "outputs": {"ac_on": ["AC"]},
+                    "hw": ["modem"],
+                },
+                {
+                    "task_name": "Read Sensors",
+                    "duration": 3,
+                    "dependencies": ["temperature"],
+                    "outputs": {"ac_off": ["AC"]},
+                    "hw": ["modem"],
+                },
+            ]
+        },
+        "supply_id": "supply_0",
+    },
+    {
+        "device_name": "AC",
+        "cores": {"core_0": {"frequency": 1, "active_energy": 20, "idle_energy": 3}},
+        "peripherals": {"hvac": {"active_energy": 30, "idle_energy": 0}},
+        "schedule": {
+            "core_0": [
+                {
+                    "task_name": "AC_Running",
+                    "duration": 5,
+                    "dependencies": ["ac_on"],
+                    "outputs": {},
+                    "hw": ["hvac"],
+                },
+                {
+                    "task_name": "Stopped",
+                    "duration": 1,
+                    "dependencies": ["ac_off"],
+                    "outputs": {},
+                    "hw": [],
+                },
+            ]
+        },
+        "supply_id": "supply_0",
+    },
+]
+
+SUPPLY = {"supply_name": "supply_0", "supply_voltage": 5.0, "max_supply_current": 5.0}
+
+
+def build_models(engine):
+    app_model = get_application_model("ApplicationModel_V0_1", CWD, engine=engine)
+    energy_model = get_energy_model("EnergyModel_V0_1", CWD)
+    devices = {}
+    for device in copy.deepcopy(DEVICES):
+        app_model.add_device(device["device_name"], device)
+        energy_model.add_device(device["device_name"], copy.deepcopy(device))
+        devices[device["device_name"]] = device
+    energy_model.add_energy_supply(SUPPLY["supply_name"], dict(SUPPLY))
+    return app_model, energy_model, Adapter(devices)
+
+
+def test_streaming_pipeline():
+    app_model, energy_model, adapter = build_models("step")
+    event_timeline = list(app_model.generate_event_timeline())
+    energy_usage = energy_model.generate_energy_usage(event_timeline)
+    network_timeline = [str(entry) for entry in adapter.create_timeline(event_timeline)]
+
+    for engine in ["step", "heap"]:
+        app_model, energy_model, adapter = build_models(engine)
+
+        # Each entry is handed to both consumers before the next one is
+        # generated, so only one entry is alive at a time.
+        for_energy, for_network = itertools.tee(app_model.iter_event_timeline())
+        streamed = list(
+            zip(
+                energy_model.iter_energy_usage(for_energy),
+                adapter.iter_timeline(for_network),
+            )
+        )
+
+        assert [energy_event for energy_event, _ in streamed] == energy_usage
+        assert [str(entry) for _, entry in streamed] == network_timeline
+        assert len(app_model._event_timeline) == 0
+
+
+def test_whole_timeline_model_streams():
+    app_model, _, _ = build_models("step")
+    event_timeline = list(app_model.generate_event_timeline())
+
+    # A model that only generates its timeline as a whole.
+    class WholeTimelineModel(ApplicationModelInterface):
+        def generate_event_timeline(self) -> dict:
+            self._event_timeline = list(event_timeline)
+            return super().generate_event_timeline()
+
+    model = WholeTimelineModel("WholeTimelineModel", headless=True)
+    for device in copy.deepcopy(DEVICES):
+        model.add_device(device["device_name"], device)
+    assert list(model.iter_event_timeline()) == event_timeline
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_streaming_pipeline()
+    test_whole_timeline_model_streams()
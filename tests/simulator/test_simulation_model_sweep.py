@@ -0,0 +1,77 @@
+"""_summary_
+@file       test_simulation_model_sweep.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks that parameter sweeps give the same results in a process pool
+            and in a single process.
+@version    0.0.0
+@data       2022-12-10
+"""
+
+import os
+import sys
+import tempfile
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.simulator.sweep import run_sweep
+from src.simulator.workload_generator import generate_workload
+
+GRID = {
+    "frequency": [1, 2],
+    "duration_scale": [1, 3],
+    "max_supply_current": [1.0, 20.0],
+}
+
+
+def test_sweep():
+    devices, supplies = generate_workload(
+        num_devices=3, cores_per_device=1, tasks_per_core=3
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        rows = run_sweep(
+            devices,
+            supplies,
+            GRID,
+            processes=2,
+            network=lambda parameters: parameters["frequency"] == 2
+            and parameters["duration_scale"] == 1
+            and parameters["max_supply_current"] == 1.0,
+            output_dir=directory,
+        )
+        assert len(rows) == 8
+        assert [row["variant"] for row in rows] == list(range(8))
+
+        # Only the requested variant renders the network graph.
+        rendered = [row for row in rows if row["network_output"] is not None]
+        assert [row["variant"] for row in rendered] == [4]
+        assert os.path.exists(rendered[0]["network_output"])
+
+    serial_rows = run_sweep(devices, supplies, GRID, processes=1)
+    for row, serial_row in zip(rows, serial_rows):
+        row["network_output"] = None
+        assert row == serial_row
+
+    for row in rows:
+        assert row["stall"] is None
+        assert row["total_energy"] > 0
+        assert 0 < row["utilization"] <= 1
+
+    # Only the lower current limit is exceeded, and then for the whole run.
+    for row in rows:
+        if row["max_supply_current"] == 1.0:
+            assert row["overload_time"] == row["makespan"]
+        else:
+            assert row["overload_time"] == 0
+
+    # Scaling every duration scales the timeline.
+    assert rows[2]["makespan"] == 3 * rows[0]["makespan"]
+    assert rows[2]["total_energy"] == 3 * rows[0]["total_energy"]
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_sweep()
@@ -0,0 +1,76 @@
+"""_summary_
+@file       test_simulation_model_workload.py
+@author     Matthew Yu (matthewjkyu@gmail.com)
+@brief      Checks the synthetic workload generator and the benchmark suite.
+@version    0.0.0
+@data       2022-12-09
+"""
+
+import os
+import sys
+import tempfile
+
+CWD = "../../"
+sys.path.append(CWD)
+
+from src.application_model.application_model_interface import get_application_model
+from src.simulator.benchmark import MODELS, run_benchmark, save_benchmark
+from src.simulator.workload_generator import TOPOLOGIES, generate_workload
+
+
+def test_workload_runs_to_completion():
+    for topology in TOPOLOGIES:
+        devices, supplies = generate_workload(
+            num_devices=5, tasks_per_core=10, topology=topology, seed=1
+        )
+        assert (
+            devices
+            == generate_workload(
+                num_devices=5, tasks_per_core=10, topology=topology, seed=1
+            )[0]
+        )
+        assert len(supplies) == 1
+
+        # Every output is consumed at most once by each device it is sent to.
+        consumed = set()
+        for device in devices:
+            for core in device["schedule"].values():
+                assert len(core) == 10
+                for task in core:
+                    for output_id in task["dependencies"]:
+                        assert (device["device_name"], output_id) not in consumed
+                        consumed.add((device["device_name"], output_id))
+                    for output_targets in task["outputs"].values():
+                        assert 0 < len(output_targets) <= 2
+
+        app_model = get_application_model("ApplicationModel_V0_0", CWD, headless=True)
+        for device in devices:
+            app_model.add_device(device["device_name"], device)
+        app_model.generate_event_timeline()
+        assert app_model.get_stall_report() is None
+
+
+def test_benchmark_history():
+    results = run_benchmark(sizes=[10, 40], topology="sensor_hub")
+    assert [result["model"] for result in results] == [
+        model for model in MODELS for _ in range(2)
+    ]
+    for result in results:
+        assert result["events"] > 0
+        assert result["peak_memory"] > 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        history_path = os.path.join(directory, "history.json")
+        save_benchmark(results, history_path, topology="sensor_hub")
+        run = save_benchmark(results, history_path, topology="sensor_hub")
+        assert run["workload"] == {"topology": "sensor_hub"}
+        with open(history_path) as fp:
+            assert fp.read().count('"results"') == 2
+
+
+if __name__ == "__main__":
+    if sys.version_info[0] < 3:
+        raise Exception("This program only supports Python 3.")
+
+    test_workload_runs_to_completion()
+    test_benchmark_history()